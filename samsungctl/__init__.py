@@ -3,6 +3,7 @@
 """Remote control Samsung televisions via TCP/IP connection"""
 
 import logging
+import sys
 from logging import NullHandler
 
 logger = logging.getLogger('samsungctl')
@@ -21,5 +22,13 @@ __author__ = "Lauri Niskanen, Kevin Schlosser"
 __author_email__ = "kevin.g.schlosser@gmail.com"
 __license__ = "MIT"
 
-from .remote import Remote # NOQA
+from .remote import Remote, ControlResult # NOQA
 from .config import Config # NOQA
+
+if sys.version_info[:2] >= (3, 5):
+    try:
+        from .remote_async import AsyncRemote # NOQA
+    except ImportError:
+        AsyncRemote = None
+else:
+    AsyncRemote = None
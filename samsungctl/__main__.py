@@ -17,6 +17,7 @@ try:
     from . import exceptions
     from . import Remote
     from . import key_mappings
+    from . import calibrate
     from .config import Config
 
 except ValueError:
@@ -35,6 +36,7 @@ except ValueError:
     from samsungctl import exceptions
     from samsungctl import Remote
     from samsungctl import key_mappings
+    from samsungctl import calibrate
     from samsungctl.config import Config
 
 
@@ -129,8 +131,28 @@ def get_key(key):
         logging.warning("Warning: Key {0} not found.".format(key))
 
 
+def bench(argv):
+    try:
+        from . import bench as benchmarks
+    except ValueError:
+        from samsungctl import bench as benchmarks
+    except ImportError:
+        logging.error("Error: The benchmarks need Python 3.")
+        return 1
+
+    return benchmarks.main(argv)
+
+
 def main():
-    epilog = "E.g. %(prog)s --host 192.168.0.10 --name myremote KEY_VOLDOWN"
+    import sys
+
+    if sys.argv[1:2] == ["bench"]:
+        sys.exit(bench(sys.argv[2:]))
+
+    epilog = (
+        "E.g. %(prog)s --host 192.168.0.10 --name myremote KEY_VOLDOWN. "
+        "Run %(prog)s bench --help for the benchmarks."
+    )
     parser = argparse.ArgumentParser(
         prog=title,
         description=doc,
@@ -216,6 +238,14 @@ def main():
             "error."
         )
     )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help=(
+            "find the shortest time between keys the TV accepts and store "
+            "it in the file given with --config-file"
+        )
+    )
     parser.add_argument(
         "--key-help",
         action="store_true",
@@ -277,6 +307,16 @@ def main():
                 logging.getLogger().setLevel(logging.ERROR)
                 from . import interactive
                 interactive.run(remote)
+            elif args.calibrate:
+                interval = calibrate.calibrate(remote)
+                if interval is None:
+                    logging.error("Error: The TV did not accept the keys.")
+                else:
+                    print("key_interval = {0}".format(interval))
+                    if not args.config_file:
+                        logging.warning(
+                            "Warning: Use --config-file to keep the result."
+                        )
             elif config.method == 'websocket' and args.start_app:
                 app = remote.get_application(args.start_app)
                 if args.app_metadata:
@@ -286,15 +326,19 @@ def main():
             elif len(args.key) == 0:
                 logging.warning("Warning: No keys specified.")
             else:
-                for key in args.key:
-                    if key is None:
-                        continue
-                    key(remote)
+                timings = remote.control_many(
+                    list(key.key for key in args.key if key is not None)
+                )
+                errors = list(t.error for t in timings if t.error)
+                if errors:
+                    raise errors[0]
 
     except exceptions.ConnectionClosed:
         logging.error("Error: Connection closed!")
     except exceptions.AccessDenied:
         logging.error("Error: Access denied!")
+    except exceptions.CalibrationNotSupported as err:
+        logging.error("Error: " + str(err))
     except exceptions.ConfigUnknownMethod:
         logging.error("Error: Unknown method '{}'".format(config.method))
     except socket.timeout:
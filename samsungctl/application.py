@@ -1,11 +1,27 @@
 # -*- coding: utf-8 -*-
-import threading
 import base64
+import functools
+import json
+import logging
+import threading
 import requests
+from collections import OrderedDict
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from . import exceptions
+from . import http_session
+from .pacing import monotonic
 from .utils import LogIt, LogItWithReturn
 
+logger = logging.getLogger('samsungctl')
+
 
 class Application(object):
+    # seconds the result of status() is reused for
+    status_max_age = 1.0
 
     @LogIt
     def __init__(
@@ -46,6 +62,9 @@ class Application(object):
         self.mbr_source = mbrSource
 
         self._kwargs = kwargs
+        self._status = None
+        self._status_time = 0.0
+        self._status_lock = threading.Lock()
 
     def __getitem__(self, item):
         if item in self._kwargs:
@@ -53,6 +72,10 @@ class Application(object):
 
         raise KeyError(item)
 
+    def _update(self, **data):
+        """Replaces the application data with updated data from the TV."""
+        self.__init__(self._remote, **data)
+
     @property
     @LogItWithReturn
     def action_type(self):
@@ -61,62 +84,59 @@ class Application(object):
         else:
             return 'NATIVE_LAUNCH'
 
-    @property
     @LogItWithReturn
-    def version(self):
-        url = 'http://{0}:8001/api/v2/applications/{1}'.format(
-            self._remote.config.host,
-            self.app_id
-        )
+    def status(self, max_age=None):
+        """
+        Fetches the version and the visible and running state of the
+        application in a single request.
+
+        The result is reused for max_age seconds (status_max_age by
+        default).
+
+        :return: the data the TV returned, empty if the request failed.
+        """
+        if max_age is None:
+            max_age = self.status_max_age
+
+        with self._status_lock:
+            if (
+                self._status is not None and
+                monotonic() - self._status_time < max_age
+            ):
+                return self._status
+
+            url = 'http://{0}:8001/api/v2/applications/{1}'.format(
+                self._remote.config.host,
+                self.app_id
+            )
 
-        response = requests.get(url)
-        try:
-            response = response.json()
-        except:
-            return 'Unknown'
+            try:
+                response = http_session.get(self._remote.config.host, url)
+                status = response.json()
+            except (requests.RequestException, ValueError):
+                status = {}
 
-        if 'version' not in response:
-            return 'Unknown'
+            if not isinstance(status, dict):
+                status = {}
 
-        return response['version']
+            self._status = status
+            self._status_time = monotonic()
+            return status
 
     @property
     @LogItWithReturn
-    def is_visible(self):
-        url = 'http://{0}:8001/api/v2/applications/{1}'.format(
-            self._remote.config.host,
-            self.app_id
-        )
-
-        response = requests.get(url)
-        try:
-            response = response.json()
-        except:
-            return None
-
-        if 'visible' not in response:
-            return None
+    def version(self):
+        return self.status().get('version', 'Unknown')
 
-        return response['visible']
+    @property
+    @LogItWithReturn
+    def is_visible(self):
+        return self.status().get('visible', None)
 
     @property
     @LogItWithReturn
     def is_running(self):
-        url = 'http://{0}:8001/api/v2/applications/{1}'.format(
-            self._remote.config.host,
-            self.app_id
-        )
-
-        response = requests.get(url)
-        try:
-            response = response.json()
-        except:
-            return None
-
-        if 'running' not in response:
-            return None
-
-        return response['running']
+        return self.status().get('running', None)
 
     def get_category(self, title):
         for group in self:
@@ -137,7 +157,7 @@ class Application(object):
         if meta_tag is not None:
             params['data']['metaTag'] = meta_tag
 
-        self._remote.send('ms.channel.emit', **params)
+        return self._remote.send('ms.channel.emit', **params)
 
     @property
     @LogItWithReturn
@@ -154,38 +174,15 @@ class Application(object):
         for accelerator_name in sorted(list(accelerators.keys())):
             yield Accelerator(self, **accelerators[accelerator_name])
 
+    def create_app_data(self, **data):
+        """:return: AppData for an entry of an accelerator."""
+        return AppData(self, **data)
+
     @property
     @LogIt
     def icon(self):
         if self._icon:
-            params = dict(
-                event="ed.apps.icon",
-                to="host",
-                data=dict(iconPath=self._icon)
-
-            )
-
-            icon = [None]
-            event = threading.Event()
-
-            @LogIt
-            def app_icon_callback(data):
-                data = data['imageBase64']
-                if data is not None:
-                    data = base64.decodebytes(data)
-                icon[0] = data
-                event.set()
-
-            self._remote.register_receive_callback(
-                app_icon_callback,
-                'event',
-                'ed.apps.icon'
-            )
-
-            self._remote.send("ms.channel.emit", **params)
-
-            event.wait(3.0)
-            return icon[0]
+            return get_icon(self._remote, self._icon)
 
 
 class Accelerator(object):
@@ -215,7 +212,7 @@ class Accelerator(object):
         )
 
         for content_name in sorted(list(content.keys())):
-            yield AppData(self.application, **content[content_name])
+            yield self.application.create_app_data(**content[content_name])
 
 
 class AppData(object):
@@ -291,37 +288,364 @@ class AppData(object):
             else:
                 meta_tag = None
 
-            self.application.run(meta_tag)
+            return self.application.run(meta_tag)
 
     @property
     def icon(self):
         if self._icon:
-            params = dict(
-                event="ed.apps.icon",
-                to="host",
-                data=dict(iconPath=self._icon)
+            return get_icon(self.application._remote, self._icon)
+
+
+@LogIt
+def get_icon(remote, icon_path):
+    """
+    Retrieves the image data for an icon from the TV.
+
+    If the remote has an icon cache (remote.icon_cache) the cache is
+    checked first and the data received from the TV is stored in it.
+
+    :return: the decoded image data or None if the TV did not reply.
+    """
+    cache = getattr(remote, 'icon_cache', None)
+
+    if cache is not None:
+        data = cache.get(remote.config.host, icon_path)
+        if data is not None:
+            return data
+
+    future = remote.request(
+        "ms.channel.emit",
+        "ed.apps.icon",
+        timeout=3.0,
+        match=functools.partial(is_icon_reply, icon_path),
+        event="ed.apps.icon",
+        to="host",
+        data=dict(iconPath=icon_path)
+    )
+
+    try:
+        response = future.result()
+    except exceptions.ResponseTimeout as err:
+        logger.debug(str(err))
+        return None
+
+    return store_icon(remote, icon_path, response)
+
+
+def is_icon_reply(icon_path, response):
+    """:return: True if response is the ed.apps.icon reply for icon_path."""
+    data = response.get('data', response)
+    return isinstance(data, dict) and data.get('iconPath') == icon_path
+
+
+def store_icon(remote, icon_path, response):
+    """
+    Decodes the ed.apps.icon reply of the TV and stores it in the icon
+    cache of the remote, if it has one.
+
+    :return: the decoded image data or None if the reply has no image or is
+        for another icon.
+    """
+    if not is_icon_reply(icon_path, response):
+        logger.debug('icon reply is not for ' + icon_path)
+        return None
+
+    data = response.get('data', response)
+    if data.get('imageBase64') is None:
+        return None
 
+    data = base64.b64decode(data['imageBase64'])
+
+    cache = getattr(remote, 'icon_cache', None)
+    if cache is not None:
+        cache.put(remote.config.host, icon_path, data)
+
+    return data
+
+
+def merge_app_data(eden_data, installed_data):
+    """
+    Combines the eden and installed application lists. Entries that show up
+    in both lists are merged into a single entry with the installed data
+    taking precedence. The installed list is indexed by appId so this is a
+    single pass over each list.
+
+    :return: list of application data dicts.
+    """
+    installed = OrderedDict()
+    duplicates = []
+
+    for installed_app in installed_data:
+        app_id = installed_app.get('appId')
+        if app_id in installed:
+            duplicates += [installed_app]
+        else:
+            installed[app_id] = installed_app
+
+    merged = []
+    eden_only = []
+
+    for eden_app in eden_data:
+        installed_app = installed.pop(eden_app.get('appId'), None)
+
+        if installed_app is None:
+            eden_only += [eden_app]
+        else:
+            eden_app = dict(eden_app)
+            eden_app.update(installed_app)
+            merged += [eden_app]
+
+    return merged + eden_only + list(installed.values()) + duplicates
+
+
+@LogItWithReturn
+def merge_applications(
+    remote,
+    eden_data,
+    installed_data,
+    application_class=Application
+):
+    """
+    Combines the eden and installed application lists into Application
+    (or application_class) instances. See merge_app_data.
+    """
+    return list(
+        application_class(remote, **app)
+        for app in merge_app_data(eden_data, installed_data)
+    )
+
+
+class ApplicationCatalog(object):
+    """
+    Cached list of the applications on a TV.
+
+    The list is fetched from the TV the first time it is needed and again
+    once it is older than ttl seconds, or when refresh is called. A refresh
+    keeps the Application instances of applications that have not changed.
+    Applications are indexed by app id and by name, the TV can list an
+    application more than once and those are all kept like merge_app_data
+    does.
+
+    Looking up an application that is not in the list refreshes the list,
+    at most once every miss_interval seconds.
+    """
+
+    def __init__(self, remote, ttl=60.0, miss_interval=10.0):
+        self._remote = remote
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self._lock = threading.RLock()
+        self._updated = None
+        self._miss_refreshed = None
+        # [(application data, Application), ...]
+        self._apps = []
+        self._ids = {}
+        self._names = {}
+
+    def __iter__(self):
+        return iter(self.applications)
+
+    def __len__(self):
+        return len(self.applications)
+
+    @property
+    def is_stale(self):
+        return (
+            self._updated is None or
+            monotonic() - self._updated > self.ttl
+        )
+
+    @property
+    def applications(self):
+        with self._lock:
+            if self.is_stale:
+                self.refresh()
+
+            return list(app for _, app in self._apps)
+
+    def invalidate(self):
+        with self._lock:
+            self._updated = None
+
+    def _request(self):
+        return list(
+            self._remote.request(
+                'ms.channel.emit',
+                event,
+                timeout=2.0,
+                data='',
+                event=event,
+                to='host'
             )
-            icon = [None]
-            event = threading.Event()
-
-            @LogIt
-            def content_icon_callback(data):
-                data = data['imageBase64']
-                if data is not None:
-                    data = base64.decodestring(data)
-                icon[0] = data
-                event.set()
-
-            self.application._remote.register_receive_callback(
-                content_icon_callback,
-                'event',
-                'ed.apps.icon'
+            for event in ('ed.edenApp.get', 'ed.installedApp.get')
+        )
+
+    @staticmethod
+    def _response_data(future):
+        try:
+            response = future.result()
+        except exceptions.ResponseTimeout as err:
+            logger.debug(str(err))
+            return None
+
+        logger.debug('{0}: {1}'.format(response['event'], response))
+        if 'data' in response:
+            return response['data']['data']
+
+        return []
+
+    @LogIt
+    def refresh(self):
+        with self._lock:
+            eden_data, installed_data = list(
+                self._response_data(future) for future in self._request()
             )
+            self._store(eden_data, installed_data)
+
+    def _store(self, eden_data, installed_data, streamed=None):
+        if eden_data is None and installed_data is None:
+            # keep what we have, the TV did not answer.
+            return
+
+        if streamed is None:
+            streamed = []
 
-            self.application._remote.send("ms.channel.emit", **params)
+        with self._lock:
+            # app id -> [(data, Application), ...] that can be kept
+            unchanged = {}
+            for old in self._apps + streamed:
+                unchanged.setdefault(old[0].get('appId'), []).append(old)
 
-            event.wait(3.0)
-            return icon[0]
+            apps = []
 
+            for data in merge_app_data(eden_data or [], installed_data or []):
+                candidates = unchanged.get(data.get('appId'), [])
 
+                for old in candidates:
+                    if old[0] == data:
+                        candidates.remove(old)
+                        apps += [old]
+                        break
+                else:
+                    apps += [(data, Application(self._remote, **data))]
+
+            self._apps = apps
+            # the first of the applications with the same id or name wins
+            self._ids = dict(
+                (data.get('appId'), app) for data, app in reversed(apps)
+            )
+            self._names = dict(
+                (app.name, app) for _, app in reversed(apps)
+            )
+
+            if eden_data is None or installed_data is None:
+                # one of the lists is missing, the next call tries again
+                self._updated = None
+            else:
+                self._updated = monotonic()
+
+            logger.debug(
+                'applications returned: ' +
+                str(list(app for _, app in apps))
+            )
+
+    def iter_applications(self):
+        """
+        Yields the applications as soon as the TV sends them.
+
+        Each of the 2 application lists is processed as soon as it arrives.
+        An application that is in both lists is only yielded once, the data
+        from the second list is merged into the Application that has already
+        been yielded. If the catalog is not stale the cached applications are
+        yielded. Once both lists have been received the catalog is updated.
+        """
+        if not self.is_stale:
+            for app in self.applications:
+                yield app
+            return
+
+        results = queue.Queue()
+        eden_future, installed_future = pending = self._request()
+
+        for future in pending:
+            future.add_done_callback(results.put)
+
+        received = {}
+        # [(data, Application), ...] in the order they were yielded
+        streamed = []
+        # app id -> index in streamed of the first application with that id
+        indexes = {}
+
+        for _ in pending:
+            future = results.get()
+            received[future] = app_list = self._response_data(future)
+            seen = set()
+
+            for data in app_list or []:
+                app_id = data.get('appId')
+
+                # an id the list has already had is a duplicate and gets an
+                # Application of its own
+                if app_id in seen or app_id not in indexes:
+                    seen.add(app_id)
+                    indexes.setdefault(app_id, len(streamed))
+                    app = Application(self._remote, **data)
+                    streamed += [(data, app)]
+                    yield app
+                    continue
+
+                seen.add(app_id)
+                index = indexes[app_id]
+                old_data, app = streamed[index]
+
+                # the installed data takes precedence
+                if future is installed_future:
+                    merged = dict(old_data)
+                    merged.update(data)
+                else:
+                    merged = dict(data)
+                    merged.update(old_data)
+
+                app._update(**merged)
+                streamed[index] = (merged, app)
+
+        self._store(
+            received[eden_future],
+            received[installed_future],
+            streamed
+        )
+
+    def get_by_id(self, app_id):
+        with self._lock:
+            return self._ids.get(app_id, None)
+
+    def get_by_name(self, name):
+        with self._lock:
+            return self._names.get(name, None)
+
+    @LogItWithReturn
+    def get(self, pattern):
+        """
+        Looks up an application by app id or name.
+
+        A miss on a cached list refreshes the list once in case the
+        application has been installed since it was fetched. Misses do that
+        at most once every miss_interval seconds, looking up an application
+        that is not installed over and over does not keep fetching the list.
+        """
+        with self._lock:
+            refreshed = self.is_stale
+            if refreshed:
+                self.refresh()
+
+            app = self.get_by_id(pattern) or self.get_by_name(pattern)
+
+            if app is None and not refreshed and (
+                self._miss_refreshed is None or
+                monotonic() - self._miss_refreshed > self.miss_interval
+            ):
+                self._miss_refreshed = monotonic()
+                self.refresh()
+                app = self.get_by_id(pattern) or self.get_by_name(pattern)
+
+            return app
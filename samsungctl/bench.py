@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the connections against the fake TV's from samsungctl.testing.
+
+For every connection method this measures
+
+* connect: seconds it takes to open the connection (median).
+* latency_p50, latency_p90, latency_p99: seconds it takes to send a key,
+  keys are sent back to back.
+* keys_per_second: keys sent back to back per second (median).
+* catalog: seconds it takes to fetch the application list (median),
+  websocket only.
+* pacing_error: how far the time between two keys is off from the
+  interval they were sent with (median), the keys are sent PACED_INTERVAL
+  seconds apart.
+* memory_peak: peak bytes allocated while connecting, sending the keys and
+  fetching the application list.
+
+The fake TV's run in a process of their own so they do not compete with
+the remote for the GIL.
+
+The results can be written as JSON and compared to an earlier run, a
+metric that got worse by more than the tolerance is reported as a
+regression. The numbers only mean something on the machine they were
+taken on, a baseline from another machine (tests/bench_baseline.json
+included) is not a fair comparison and is not used by the CI build.
+
+    samsungctl bench --output results.json
+    samsungctl bench --baseline tests/bench_baseline.json
+
+python -m samsungctl.bench does the same. This module requires Python 3.
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import sys
+import tracemalloc
+from collections import namedtuple
+
+from . import __version__ as version
+from . import exceptions
+from . import testing
+from .config import Config
+from .pacing import monotonic
+from .remote import Remote
+
+logger = logging.getLogger('samsungctl')
+
+METHODS = ('legacy', 'websocket', 'encrypted')
+
+METRICS = (
+    'connect',
+    'latency_p50',
+    'latency_p90',
+    'latency_p99',
+    'keys_per_second',
+    'catalog',
+    'pacing_error',
+    'memory_peak'
+)
+
+# metrics where a larger number is better, smaller is better for the rest
+HIGHER_IS_BETTER = ('keys_per_second',)
+
+# differences smaller than these are noise on a loaded machine, they are
+# never reported no matter what the tolerance is.
+NOISE = dict(
+    connect=0.002,
+    latency_p50=0.0002,
+    latency_p90=0.0005,
+    latency_p99=0.001,
+    catalog=0.002,
+    pacing_error=0.001,
+    memory_peak=64 * 1024
+)
+
+# number of keys sent back to back
+KEY_COUNT = 200
+# number of times the connection is opened, the keys are sent and the
+# catalog fetched
+ROUNDS = 5
+# number of keys sent PACED_INTERVAL seconds apart
+PACED_KEYS = 20
+PACED_INTERVAL = 0.02
+# seconds a fake TV gets to start
+STARTUP_TIMEOUT = 30.0
+# 0.5 means a metric has to get 50% worse to count as a regression, timings
+# on a busy machine easily move 25% from one run to the next
+TOLERANCE = 0.5
+
+BENCH_KEYS = ('KEY_VOLUP', 'KEY_VOLDOWN')
+
+# metric is the name of the metric, change is how much worse it got (0.5
+# is 50% worse)
+Regression = namedtuple(
+    'Regression',
+    ['method', 'metric', 'baseline', 'value', 'change']
+)
+
+
+def percentile(values, percent):
+    """:return: the nearest rank percentile of values, None if empty."""
+    if not values:
+        return None
+
+    values = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(0, min(rank, len(values)) - 1)]
+
+
+def _median(values):
+    return percentile(values, 50)
+
+
+def _create_tv(method):
+    if method == 'legacy':
+        return testing.FakeLegacyTV(port=0)
+
+    if method == 'websocket':
+        # RemoteWebsocket only knows port 8001
+        return testing.FakeWebsocketTV()
+
+    if method == 'encrypted':
+        if testing.FakeEncryptedTV is None:
+            return None
+
+        return testing.FakeEncryptedTV(port=0)
+
+    raise exceptions.ConfigUnknownMethod()
+
+
+def _serve(method, connection):
+    # runs in the process of the fake TV
+    try:
+        tv = _create_tv(method)
+        if tv is None:
+            connection.send(None)
+            return
+
+        tv.start()
+    except (IOError, OSError) as err:
+        connection.send(dict(error=repr(err)))
+        return
+
+    try:
+        token = tv.create_token() if method == 'encrypted' else None
+        connection.send(
+            dict(host=tv.host, port=tv.server_port(), token=token)
+        )
+        # anything sent back means stop
+        connection.recv()
+    except EOFError:
+        pass
+    finally:
+        tv.stop()
+
+
+class FakeTVProcess(object):
+    """
+    Runs the fake TV for a connection method in a process of its own.
+
+    info is None if the method is not available, otherwise a dict with the
+    host and port the TV listens on and the token to use.
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.info = None
+        self._connection = None
+        self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        self._connection, child = context.Pipe()
+        self._process = context.Process(
+            target=_serve,
+            args=(self.method, child),
+            name='samsungctl fake ' + self.method + ' tv'
+        )
+        self._process.daemon = True
+        self._process.start()
+        child.close()
+
+        try:
+            if not self._connection.poll(STARTUP_TIMEOUT):
+                raise EOFError
+
+            self.info = self._connection.recv()
+        except EOFError:
+            self.stop()
+            raise OSError('the fake ' + self.method + ' TV did not start')
+
+        if self.info is not None and 'error' in self.info:
+            error = self.info['error']
+            self.stop()
+            raise OSError(error)
+
+    def stop(self):
+        if self._process is None:
+            return
+
+        try:
+            self._connection.send(None)
+        except (IOError, OSError):
+            pass
+
+        self._process.join(5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+
+        self._connection.close()
+        self._process = None
+
+
+def _create_config(method, info):
+    config = Config(host=info['host'], method=method, timeout=5)
+
+    if method in ('legacy', 'encrypted'):
+        config.port = info['port']
+
+    if info['token']:
+        config.token = info['token']
+
+    return config
+
+
+def _keys(count):
+    return list(BENCH_KEYS) * (count // len(BENCH_KEYS)) + (
+        list(BENCH_KEYS[:count % len(BENCH_KEYS)])
+    )
+
+
+def _connect(config, rounds):
+    times = []
+
+    for _ in range(rounds):
+        remote = Remote(config)
+        start = monotonic()
+        remote.open()
+        times += [monotonic() - start]
+        remote.close()
+
+    return _median(times)
+
+
+def _raise_error(timings):
+    errors = list(timing.error for timing in timings if timing.error)
+    if errors:
+        raise errors[0]
+
+
+def _send_keys(remote, count):
+    keys = _keys(count)
+    start = monotonic()
+    timings = remote.control_many(keys, 0.0)
+    elapsed = monotonic() - start
+
+    _raise_error(timings)
+    return list(timing.duration for timing in timings), len(timings) / elapsed
+
+
+def _pacing_error(remote, count, interval):
+    timings = remote.control_many(_keys(count), interval)
+    _raise_error(timings)
+
+    return _median(list(
+        abs(timing.offset - previous.offset - interval)
+        for previous, timing in zip(timings, timings[1:])
+    ))
+
+
+def _catalog(remote, rounds):
+    catalog = getattr(remote.remote, 'catalog', None)
+    if catalog is None:
+        return None
+
+    times = []
+
+    for _ in range(rounds):
+        start = monotonic()
+        catalog.refresh()
+        times += [monotonic() - start]
+
+    return _median(times)
+
+
+def _memory_peak(config, count):
+    tracemalloc.start()
+
+    try:
+        with Remote(config) as remote:
+            _send_keys(remote, count)
+            _catalog(remote, 1)
+
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_method(method, count=KEY_COUNT, rounds=ROUNDS):
+    """
+    Benchmarks one connection method.
+
+    :return: dict of metric -> value, None if the method is not available.
+    """
+    with FakeTVProcess(method) as tv:
+        if tv.info is None:
+            return None
+
+        config = _create_config(method, tv.info)
+        result = dict(connect=_connect(config, rounds))
+
+        with Remote(config) as remote:
+            # the first keys warm up the connection
+            _send_keys(remote, min(count, 10))
+            batches = list(_send_keys(remote, count) for _ in range(rounds))
+            result['catalog'] = _catalog(remote, rounds)
+            result['pacing_error'] = _pacing_error(
+                remote,
+                PACED_KEYS,
+                PACED_INTERVAL
+            )
+
+        # the percentiles are taken over the keys of all of the rounds, a
+        # single round has too few keys for a steady p99
+        durations = list(d for batch, _ in batches for d in batch)
+        for percent in (50, 90, 99):
+            result['latency_p' + str(percent)] = percentile(
+                durations,
+                percent
+            )
+
+        result['keys_per_second'] = _median(list(kps for _, kps in batches))
+        result['memory_peak'] = _memory_peak(config, count)
+
+    return result
+
+
+def run(methods=METHODS, count=KEY_COUNT, rounds=ROUNDS):
+    """
+    Benchmarks the connection methods.
+
+    A method that can not be benchmarked (missing dependencies, the port is
+    taken) is left out, the reason is logged.
+
+    :return: dict that can be saved as JSON.
+    """
+    results = dict(
+        samsungctl=version,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        keys=count,
+        rounds=rounds,
+        methods={}
+    )
+
+    for method in methods:
+        try:
+            result = bench_method(method, count, rounds)
+        except (exceptions.SamsungTVError, IOError, OSError) as err:
+            logger.error(method + ' benchmark failed: ' + repr(err))
+            continue
+
+        if result is None:
+            logger.warning(method + ' is not available, skipped')
+            continue
+
+        results['methods'][method] = result
+
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Compares results to the results of an earlier run.
+
+    Metrics that are missing from either of them are skipped.
+
+    :return: list of Regression
+    """
+    regressions = []
+
+    for method, result in sorted(results['methods'].items()):
+        base = baseline.get('methods', {}).get(method)
+        if not base:
+            continue
+
+        for metric in METRICS:
+            value = result.get(metric)
+            base_value = base.get(metric)
+
+            if value is None or not base_value:
+                continue
+
+            if metric in HIGHER_IS_BETTER:
+                worse = base_value - value
+            else:
+                worse = value - base_value
+
+            if worse <= NOISE.get(metric, 0):
+                continue
+
+            change = worse / float(base_value)
+            if change > tolerance:
+                regressions += [
+                    Regression(method, metric, base_value, value, change)
+                ]
+
+    return regressions
+
+
+def _format(metric, value):
+    if value is None:
+        return '-'
+
+    if metric == 'memory_peak':
+        return '{0:.1f} KiB'.format(value / 1024.0)
+
+    if metric == 'keys_per_second':
+        return '{0:.0f}'.format(value)
+
+    return '{0:.3f} ms'.format(value * 1000)
+
+
+def print_results(results, regressions=()):
+    methods = sorted(results['methods'])
+
+    print('{0:<16}'.format('') + ''.join(
+        '{0:>16}'.format(method) for method in methods
+    ))
+
+    for metric in METRICS:
+        print('{0:<16}'.format(metric) + ''.join(
+            '{0:>16}'.format(
+                _format(metric, results['methods'][method].get(metric))
+            )
+            for method in methods
+        ))
+
+    for regression in regressions:
+        print(
+            'REGRESSION {0} {1}: {2} -> {3} ({4:+.0%})'.format(
+                regression.method,
+                regression.metric,
+                _format(regression.metric, regression.baseline),
+                _format(regression.metric, regression.value),
+                regression.change
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='samsungctl bench',
+        description=(
+            'Benchmarks the connection methods against fake TV\'s running '
+            'on this machine.'
+        )
+    )
+    parser.add_argument(
+        '--method',
+        action='append',
+        choices=METHODS,
+        help='connection method to benchmark, can be repeated (default: all)'
+    )
+    parser.add_argument(
+        '--keys',
+        type=int,
+        default=KEY_COUNT,
+        help='number of keys sent back to back'
+    )
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=ROUNDS,
+        help='number of times the connection is opened and the catalog fetched'
+    )
+    parser.add_argument(
+        '--output',
+        help='file the results are written to as JSON'
+    )
+    parser.add_argument(
+        '--baseline',
+        help='JSON file of an earlier run to compare the results to'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=TOLERANCE,
+        help='how much worse a metric may get, 0.5 is 50%%'
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(args.method or METHODS, args.keys, args.rounds)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+        if baseline.get('platform') != results['platform']:
+            logger.warning(
+                'the baseline was made on ' + str(baseline.get('platform')) +
+                ', timings of another machine can not be compared'
+            )
+
+        regressions = compare(results, baseline, args.tolerance)
+
+    print_results(results, regressions)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+            f.write('\n')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Finds the shortest time between keys a TV reliably accepts.
+
+Sequences of keys are sent with shorter and shorter gaps between them. A
+gap passes when every key of every round is acknowledged, the shortest gap
+that passes ends up in config.key_interval.
+
+* legacy: every key is acknowledged by the TV, a key that is not accepted
+  shows up as an error reading the reply.
+* websocket: keys are not acknowledged, the voice recognition key is used
+  instead because the TV sends an event for each press and release of it.
+  Every press and release waits for its event before the next one goes
+  out, so a late event can not stand in for one that never came.
+* encrypted: there are no replies at all, nothing can be checked so these
+  TV's can not be calibrated.
+
+The volume up and down keys are sent in pairs on the legacy connection so
+the volume ends up where it was.
+"""
+
+import logging
+
+from . import exceptions
+from .pacing import KeyPacer
+
+logger = logging.getLogger('samsungctl')
+
+# seconds, tried from the longest to the shortest
+PROBE_INTERVALS = (0.35, 0.3, 0.25, 0.2, 0.15, 0.1, 0.075, 0.05)
+# number of keys in a probe sequence
+PROBE_LENGTH = 6
+# number of times a sequence has to pass for a gap to count as safe
+PROBE_ROUNDS = 2
+
+
+def _probe_keys(length):
+    return ['KEY_VOLUP', 'KEY_VOLDOWN'] * (length // 2)
+
+
+def _probe_websocket(remote, interval, length):
+    pacer = KeyPacer(interval)
+    # keep the first press interval seconds away from the previous probe
+    pacer.reserve()
+
+    for i in range(length // 2):
+        for cmd, event in (
+            ('Press', 'ms.voiceApp.standby'),
+            ('Release', 'ms.voiceApp.hide')
+        ):
+            pacer.wait()
+            future = remote.request(
+                'ms.remote.control',
+                event,
+                timeout=interval + 2.0,
+                Cmd=cmd,
+                DataOfCmd='KEY_BT_VOICE',
+                Option='false',
+                TypeOfRemote='SendRemoteKey'
+            )
+
+            try:
+                future.result()
+            except exceptions.ResponseTimeout:
+                return False
+
+    return True
+
+
+def probe(remote, interval, length=PROBE_LENGTH):
+    """
+    Sends one probe sequence.
+
+    :param remote: the connection, RemoteLegacy or RemoteWebsocket. Not
+        samsungctl.Remote, the rate limit would get in the way.
+    :raises exceptions.CalibrationNotSupported: for an encrypted connection.
+    :return: True if the TV accepted all of the keys.
+    """
+    if remote.config.method == 'encrypted':
+        raise exceptions.CalibrationNotSupported(remote.config.method)
+
+    if hasattr(remote, 'request'):
+        return _probe_websocket(remote, interval, length)
+
+    keys = _probe_keys(length)
+    try:
+        timings = remote.control_many(keys, interval)
+    except (exceptions.SamsungTVError, IOError, OSError) as err:
+        logger.debug('probe failed: ' + str(err))
+        return False
+
+    return (
+        len(timings) == len(keys) and
+        all(timing.error is None for timing in timings)
+    )
+
+
+def calibrate(
+    remote,
+    intervals=PROBE_INTERVALS,
+    length=PROBE_LENGTH,
+    rounds=PROBE_ROUNDS
+):
+    """
+    Finds the shortest gap between keys that the TV accepts.
+
+    The result is stored in remote.config.key_interval, save the config to
+    keep it.
+
+    :param remote: samsungctl.Remote
+    :raises exceptions.CalibrationNotSupported: for the encrypted method.
+    :return: the interval in seconds or None if not even the longest one
+        worked.
+    """
+    if remote.config.method == 'encrypted':
+        raise exceptions.CalibrationNotSupported(remote.config.method)
+
+    best = None
+
+    for interval in sorted(intervals, reverse=True):
+        logger.info('Probing ' + str(interval) + ' seconds between keys')
+
+        if not all(
+            probe(remote.remote, interval, length) for _ in range(rounds)
+        ):
+            break
+
+        best = interval
+
+    if best is not None:
+        remote.config.key_interval = best
+
+    return best
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+from . import codec
+from .pacing import monotonic
+from .utils import LogIt
+
+logger = logging.getLogger('samsungctl')
+
+
+class _Reaper(object):
+    """
+    Reaps the expired callbacks of every registry from a single daemon
+    thread, so a callback times out even if nothing else is happening on
+    the connection.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._deadlines = []
+        self._thread = None
+
+    def schedule(self, registry, deadline):
+        with self._condition:
+            heapq.heappush(
+                self._deadlines,
+                (deadline, next(self._counter), weakref.ref(registry))
+            )
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='samsungctl callback reaper'
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+
+                delay = self._deadlines[0][0] - monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                now = monotonic()
+                due = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    due += [heapq.heappop(self._deadlines)[2]]
+
+            for ref in due:
+                registry = ref()
+                if registry is not None:
+                    try:
+                        registry.reap()
+                    except Exception:
+                        logger.exception('error in receive timeout callback')
+
+
+_reaper = _Reaper()
+
+
+class _Entry(object):
+    __slots__ = ('sequence', 'callback', 'key', 'data', 'on_timeout')
+
+    def __init__(self, sequence, callback, key, data, on_timeout):
+        self.sequence = sequence
+        self.callback = callback
+        self.key = key
+        self.data = data
+        self.on_timeout = on_timeout
+
+
+class CallbackRegistry(object):
+    """
+    One shot receive callbacks for the websocket connections.
+
+    A callback is registered for a message key and the value that key has to
+    have in order for the callback to be called. A value of None matches any
+    value. Callbacks are stored in buckets indexed by (key, value) so
+    registering, unregistering and finding the callbacks for an incoming
+    message does not depend on how many callbacks are waiting.
+
+    A callback can be given a timeout. Once it expires the callback is
+    removed and on_timeout (if given) is called. Expired callbacks are reaped
+    by a shared reaper thread as well as every time a callback is registered
+    or a message is dispatched. The number of pending callbacks is also
+    capped at max_pending, the oldest callbacks are dropped when the cap is
+    reached.
+    """
+
+    def __init__(self, max_pending=10000):
+        self.max_pending = max_pending
+        self.expired_count = 0
+        self.evicted_count = 0
+
+        self._lock = threading.RLock()
+        self._counter = itertools.count()
+        # sequence -> _Entry, in registration order
+        self._entries = OrderedDict()
+        # (key, data) -> OrderedDict(sequence -> _Entry)
+        self._buckets = {}
+        # key -> number of buckets for that key
+        self._key_counts = {}
+        # (callback, key, data) -> [sequence, ...]
+        self._index = {}
+        # [(deadline, sequence), ...]
+        self._deadlines = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        with self._lock:
+            return tuple(item) in self._index
+
+    @property
+    def stats(self):
+        return dict(
+            pending=len(self._entries),
+            expired=self.expired_count,
+            evicted=self.evicted_count
+        )
+
+    def register(self, callback, key, data, timeout=None, on_timeout=None):
+        with self._lock:
+            dropped = self._reap()
+
+            while self.max_pending and len(self._entries) >= self.max_pending:
+                entry = self._entries[next(iter(self._entries))]
+                self._remove(entry)
+                self.evicted_count += 1
+                dropped += [entry]
+                logger.warning(
+                    'Too many pending receive callbacks, dropping the '
+                    'callback for {0} {1}'.format(entry.key, entry.data)
+                )
+
+            sequence = next(self._counter)
+            entry = _Entry(sequence, callback, key, data, on_timeout)
+
+            self._entries[sequence] = entry
+            bucket = self._buckets.get((key, data), None)
+            if bucket is None:
+                bucket = self._buckets[(key, data)] = OrderedDict()
+                self._key_counts[key] = self._key_counts.get(key, 0) + 1
+
+            bucket[sequence] = entry
+            self._index.setdefault((callback, key, data), []).append(sequence)
+
+            if timeout is not None:
+                deadline = monotonic() + timeout
+                heapq.heappush(self._deadlines, (deadline, sequence))
+
+        if timeout is not None:
+            _reaper.schedule(self, deadline)
+
+        self._timed_out(dropped)
+        return sequence
+
+    def unregister(self, callback, key, data):
+        with self._lock:
+            sequences = self._index.get((callback, key, data))
+            if not sequences:
+                return False
+
+            self._remove(self._entries[sequences[0]])
+            return True
+
+    def _remove(self, entry):
+        del self._entries[entry.sequence]
+
+        bucket = self._buckets[(entry.key, entry.data)]
+        del bucket[entry.sequence]
+        if not bucket:
+            del self._buckets[(entry.key, entry.data)]
+
+            self._key_counts[entry.key] -= 1
+            if not self._key_counts[entry.key]:
+                del self._key_counts[entry.key]
+
+        sequences = self._index[(entry.callback, entry.key, entry.data)]
+        sequences.remove(entry.sequence)
+        if not sequences:
+            del self._index[(entry.callback, entry.key, entry.data)]
+
+    def _reap(self):
+        expired = []
+        now = monotonic()
+        deadlines = self._deadlines
+
+        while deadlines and deadlines[0][0] <= now:
+            _, sequence = heapq.heappop(deadlines)
+            entry = self._entries.get(sequence, None)
+
+            if entry is not None:
+                self._remove(entry)
+                self.expired_count += 1
+                expired += [entry]
+
+        # deadlines of callbacks that have already been called stay in the
+        # heap until they expire, keep the heap from outgrowing the entries.
+        if len(deadlines) > 2 * len(self._entries) + 64:
+            self._deadlines = list(
+                item for item in deadlines if item[1] in self._entries
+            )
+            heapq.heapify(self._deadlines)
+
+        return expired
+
+    @staticmethod
+    def _timed_out(entries):
+        for entry in entries:
+            logger.debug(
+                'receive callback for {0} {1} timed out'.format(
+                    entry.key,
+                    entry.data
+                )
+            )
+            if entry.on_timeout is not None:
+                entry.on_timeout()
+
+    def reap(self):
+        """
+        Removes the callbacks whose timeout has expired.
+
+        :return: number of callbacks that were removed.
+        """
+        with self._lock:
+            expired = self._reap()
+
+        self._timed_out(expired)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._key_counts.clear()
+            self._index.clear()
+            del self._deadlines[:]
+
+    def wants(self, key, values):
+        """
+        Tells if a message could match one of the callbacks without having
+        to decode the message.
+
+        :param key: a key that is in the message.
+        :param values: all of the values for key found in the message.
+        :return: False if none of the callbacks can match the message.
+        """
+        key_counts = self._key_counts
+
+        # there is no telling what callbacks for other keys match
+        if len(key_counts) > (key in key_counts):
+            return True
+
+        if not values:
+            return False
+
+        buckets = self._buckets
+        if (key, None) in buckets:
+            return True
+
+        for value in values:
+            if (key, value) in buckets:
+                return True
+
+        return False
+
+    def _matches(self, response):
+        matched = []
+
+        for key, value in response.items():
+            bucket = self._buckets.get((key, None))
+            if bucket:
+                matched.extend(bucket.values())
+
+            if value is None:
+                continue
+
+            try:
+                bucket = self._buckets.get((key, value))
+            except TypeError:
+                # unhashable values (dicts, lists) can only match None
+                continue
+
+            if bucket:
+                matched.extend(bucket.values())
+
+        matched.sort(key=lambda item: item.sequence)
+        return matched
+
+    def dispatch(self, response):
+        """
+        Calls and removes every callback that matches the response.
+
+        The callbacks are called in the order they were registered, outside
+        of the registry lock so they are able to register new callbacks.
+
+        :return: number of callbacks that were called.
+        """
+        if not isinstance(response, dict):
+            return 0
+
+        with self._lock:
+            expired = self._reap()
+            matched = self._matches(response)
+
+            for entry in matched:
+                self._remove(entry)
+
+        self._timed_out(expired)
+
+        for entry in matched:
+            entry.callback(response)
+
+        return len(matched)
+
+
+class MessageDispatcher(object):
+    """
+    Hands the incoming websocket messages to the receive callbacks.
+
+    Shared by the sync and the asyncio websocket connections. The class it
+    is mixed into provides _registered_callbacks (CallbackRegistry),
+    tracked_events (set of event names that are always decoded) and
+    event_states (event name -> last message received for it).
+    """
+
+    def _is_wanted(self, message):
+        names = codec.event_names(message)
+        if names is None:
+            return True
+
+        for name in names:
+            if name in self.tracked_events:
+                return True
+
+        return self._registered_callbacks.wants('event', names)
+
+    @LogIt
+    def on_message(self, message):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('incoming message: ' + message)
+
+        # only decode the messages something is waiting for
+        if not self._is_wanted(message):
+            return
+
+        response = codec.loads(message)
+
+        if isinstance(response, dict):
+            event = response.get('event', None)
+            if event in self.tracked_events:
+                self.event_states[event] = response
+
+        self._registered_callbacks.dispatch(response)
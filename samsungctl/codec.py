@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+JSON encoding and decoding of the websocket messages.
+
+orjson or ujson is used when it is installed, otherwise the json module
+from the standard library. dumps always returns text so the result can be
+sent as a websocket text frame.
+"""
+
+import json
+import logging
+import re
+
+logger = logging.getLogger('samsungctl')
+
+
+class Codec(object):
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<Codec ' + self.name + '>'
+
+
+def _stdlib_codec():
+    return Codec('json', json.dumps, json.loads)
+
+
+def _orjson_codec():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    return Codec('orjson', dumps, orjson.loads)
+
+
+def _ujson_codec():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(
+            obj,
+            ensure_ascii=False,
+            escape_forward_slashes=False
+        )
+
+    return Codec('ujson', dumps, ujson.loads)
+
+
+CODECS = dict(
+    json=_stdlib_codec,
+    orjson=_orjson_codec,
+    ujson=_ujson_codec
+)
+
+_codec = None
+
+
+def get_codec(name):
+    """
+    :param name: one of 'orjson', 'ujson' or 'json'
+    :raises ImportError: if the library for the codec is not installed.
+    """
+    if name not in CODECS:
+        raise ValueError('unknown codec: ' + repr(name))
+
+    return CODECS[name]()
+
+
+def set_codec(codec):
+    """
+    Selects the codec that is used for all of the websocket messages.
+
+    :param codec: a Codec instance or the name of one.
+    """
+    global _codec
+
+    if not isinstance(codec, Codec):
+        codec = get_codec(codec)
+
+    logger.debug('using json codec: ' + codec.name)
+    _codec = codec
+
+
+def current_codec():
+    return _codec
+
+
+def dumps(obj):
+    return _codec.dumps(obj)
+
+
+def loads(data):
+    return _codec.loads(data)
+
+
+_EVENT_RE = re.compile(r'"event"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def event_names(message):
+    """
+    Finds the values of the "event" keys in a message without decoding the
+    whole message.
+
+    Every "event" key in the message is found, not only the one at the top
+    level, so the result can hold more names than the message really has.
+
+    :return: list of event names or None if they could not be found.
+    """
+    try:
+        matches = _EVENT_RE.findall(message)
+        if len(matches) != message.count('"event"'):
+            return None
+    except TypeError:
+        return None
+
+    return list(json.loads(match) for match in matches)
+
+
+for _name in ('orjson', 'ujson', 'json'):
+    try:
+        _codec = get_codec(_name)
+        break
+    except ImportError:
+        continue
+
+del _name
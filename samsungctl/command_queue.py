@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Ordering of the commands that are waiting to be sent to a TV.
+
+* The power keys go ahead of everything else that is waiting.
+* Repeated presses of the same key (volume, channel, arrows) that are
+  queued one after the other are merged into a single burst.
+* A key that does the same thing no matter how many times it is pressed
+  is only queued once when it is pressed a number of times in a row.
+* When more than max_depth commands are waiting the oldest command with
+  the lowest priority is dropped.
+"""
+
+import logging
+from collections import deque
+
+logger = logging.getLogger('samsungctl')
+
+HIGH = 0
+NORMAL = 1
+
+PRIORITY_KEYS = frozenset([
+    'KEY_POWER',
+    'KEY_POWEROFF',
+    'KEY_POWERON',
+])
+
+REPEATABLE_KEYS = frozenset([
+    'KEY_VOLUP',
+    'KEY_VOLDOWN',
+    'KEY_CHUP',
+    'KEY_CHDOWN',
+    'KEY_UP',
+    'KEY_DOWN',
+    'KEY_LEFT',
+    'KEY_RIGHT',
+    'KEY_FF',
+    'KEY_REWIND',
+])
+
+IDEMPOTENT_KEYS = frozenset([
+    'KEY_POWEROFF',
+    'KEY_POWERON',
+    'KEY_HOME',
+    'KEY_EXIT',
+])
+
+
+class Command(object):
+    """
+    A queued function call.
+
+    count is the number of times func is called, futures holds a
+    concurrent.futures.Future for every time the command was queued.
+    """
+    __slots__ = (
+        'futures',
+        'func',
+        'args',
+        'delay',
+        'key',
+        'count'
+    )
+
+    def __init__(self, future, func, args, delay=0.0, key=None):
+        self.futures = [future]
+        self.func = func
+        self.args = args
+        self.delay = delay
+        self.key = key
+        self.count = 1
+
+    @property
+    def priority(self):
+        if self.key in PRIORITY_KEYS:
+            return HIGH
+
+        return NORMAL
+
+    def same_as(self, other):
+        return (
+            self.key is not None and
+            self.key == other.key and
+            self.func == other.func and
+            self.args == other.args
+        )
+
+
+class CommandQueue(object):
+
+    def __init__(self, max_depth=100, max_burst=50):
+        self.max_depth = max_depth
+        self.max_burst = max_burst
+        self.dropped_count = 0
+        self.coalesced_count = 0
+
+        self._queues = (deque(), deque())
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues)
+
+    def __bool__(self):
+        return any(self._queues)
+
+    __nonzero__ = __bool__
+
+    @property
+    def stats(self):
+        return dict(
+            queued=len(self),
+            dropped=self.dropped_count,
+            coalesced=self.coalesced_count
+        )
+
+    def _merge(self, command, queue):
+        # only the last command is looked at, merging with a command that
+        # has other keys queued after it would change what the TV ends up
+        # doing
+        if not queue or not queue[-1].same_as(command):
+            return False
+
+        last = queue[-1]
+
+        if command.key in IDEMPOTENT_KEYS:
+            last.futures += command.futures
+            return True
+
+        if command.key in REPEATABLE_KEYS and last.count < self.max_burst:
+            last.count += 1
+            last.futures += command.futures
+            return True
+
+        return False
+
+    def push(self, command):
+        """
+        :return: list of the commands that had to be dropped.
+        """
+        queue = self._queues[command.priority]
+
+        if self._merge(command, queue):
+            self.coalesced_count += 1
+            return []
+
+        queue.append(command)
+
+        dropped = []
+        while self.max_depth and len(self) > self.max_depth:
+            for queue in reversed(self._queues):
+                if queue:
+                    dropped += [queue.popleft()]
+                    break
+
+        if dropped:
+            self.dropped_count += len(dropped)
+            logger.warning(
+                'Too many queued commands, dropped ' + str(len(dropped))
+            )
+
+        return dropped
+
+    def pop(self):
+        for queue in self._queues:
+            if queue:
+                return queue.popleft()
+
+        return None
+
+    def clear(self):
+        """
+        :return: list of the commands that were waiting.
+        """
+        commands = []
+        for queue in self._queues:
+            commands.extend(queue)
+            queue.clear()
+
+        return commands
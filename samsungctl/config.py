@@ -21,6 +21,9 @@ DEFAULT_CONFIG = dict(
     token=None,
     device_id=None,
     upnp_locations=None,
+    key_interval=None,
+    key_rate=None,
+    key_burst=None,
 )
 
 
@@ -44,6 +47,9 @@ class Config(object):
         token=None,
         device_id=None,
         upnp_locations=None,
+        key_interval=None,
+        key_rate=None,
+        key_burst=None,
         **_
     ):
         if name is None:
@@ -87,6 +93,9 @@ class Config(object):
         self.path = None
         self.device_id = device_id
         self.upnp_locations = upnp_locations
+        self.key_interval = key_interval
+        self.key_rate = key_rate
+        self.key_burst = key_burst
         self.app_id = ''.join(sorted(list(id)[1:]))
 
     @property
@@ -152,18 +161,25 @@ class Config(object):
                         elif not value:
                             value = None
 
-                        elif key in ('port', 'timeout'):
+                        elif key in ('port', 'timeout', 'key_burst'):
                             try:
                                 value = int(value)
                             except ValueError:
                                 raise exceptions.ConfigParameterError(key)
 
+                        elif key in ('key_interval', 'key_rate'):
+                            try:
+                                value = float(value)
+                            except ValueError:
+                                raise exceptions.ConfigParameterError(key)
+
                         config[key] = value
         else:
             raise exceptions.ConfigLoadError
 
-        self = super(Config, cls).__new__(cls, **config)
+        self = cls(**config)
         self.path = path
+        return self
 
     def save(self, path=None):
         if path is None:
@@ -222,6 +238,9 @@ class Config(object):
         yield 'token', self.token
         yield 'device_id', self.device_id
         yield 'upnp_locations', self.upnp_locations
+        yield 'key_interval', self.key_interval
+        yield 'key_rate', self.key_rate
+        yield 'key_burst', self.key_burst
 
     def __str__(self):
         return TEMPLATE.format(
@@ -235,6 +254,9 @@ class Config(object):
             token=self.token,
             device_id=self.device_id,
             upnp_locations=self.upnp_locations,
+            key_interval=self.key_interval,
+            key_rate=self.key_rate,
+            key_burst=self.key_burst,
         )
 
 
@@ -248,5 +270,8 @@ timeout = {timeout}
 token = {token}
 device_id = {device_id}
 upnp_locations = {upnp_locations}
+key_interval = {key_interval}
+key_rate = {key_rate}
+key_burst = {key_burst}
 '''
 
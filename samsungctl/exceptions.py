@@ -21,13 +21,25 @@ class ConnectionClosed(SamsungTVError):
 
 
 class UnhandledResponse(SamsungTVError):
-    """Received unknown response."""
+    """Received unknown response: %r."""
 
 
 class NoTVFound(SamsungTVError):
     """Unable to locate a TV."""
 
 
+class ResponseTimeout(SamsungTVError):
+    """Timed out waiting for %s."""
+
+
+class UnknownKey(SamsungTVError):
+    """Unknown key: %s."""
+
+
+class CalibrationNotSupported(SamsungTVError):
+    """Calibration is not supported by the %s method."""
+
+
 class ConfigError(SamsungTVError):
     """Base class for config exceptions."""
 
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Keep-alive HTTP sessions for the REST api of the TV's.
+
+There is one requests.Session per TV, so repeated requests to the same TV
+reuse the connection instead of opening a new one every time.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (2.0, 5.0)
+POOL_SIZE = 8
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def get_session(host):
+    with _lock:
+        session = _sessions.get(host, None)
+
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+
+        return session
+
+
+def get(host, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return get_session(host).get(url, timeout=timeout, **kwargs)
+
+
+def close(host=None):
+    """Closes the session for host or the sessions for all TV's."""
+    with _lock:
+        if host is None:
+            sessions = list(_sessions.values())
+            _sessions.clear()
+        else:
+            sessions = [_sessions.pop(host)] if host in _sessions else []
+
+    for session in sessions:
+        session.close()
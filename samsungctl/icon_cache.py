@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent storage for application icons.
+
+All of the icon data is kept in a single append only pack file that is read
+through mmap. The index that goes along with it maps (tv, icon path) to the
+sha1 digest of the image data and the digest to the location of the data in
+the pack file, so identical icons are only stored once. The index is kept in
+least recently used order and once the stored data goes over max_size the
+least recently used icons are dropped. When the data that is no longer
+referenced outgrows the data that is, the pack file gets rewritten.
+
+The index is written by flush and close, not every time an icon is added.
+Icons that were added after the last flush are lost if the program does not
+get that far, the data in the pack file stays valid either way.
+
+The cache is safe to use from multiple threads. It is not safe to share the
+same directory between processes.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('samsungctl')
+
+PACK_FILE = 'icons.pack'
+INDEX_FILE = 'icons.index'
+INDEX_VERSION = 1
+
+
+def default_path():
+    if sys.platform.startswith('win'):
+        path = os.getenv('LOCALAPPDATA') or os.getenv('APPDATA')
+    else:
+        path = os.getenv('XDG_CACHE_HOME')
+        if not path:
+            path = os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(path, 'samsungctl')
+
+
+def _replace(src, dst):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class IconCache(object):
+
+    def __init__(self, path=None, max_size=64 * 1024 * 1024):
+        if path is None:
+            path = default_path()
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._pack_path = os.path.join(path, PACK_FILE)
+        self._index_path = os.path.join(path, INDEX_FILE)
+        self._lock = threading.RLock()
+        # (tv, icon path) -> digest, least recently used first
+        self._keys = OrderedDict()
+        # digest -> [offset, length, reference count]
+        self._blobs = {}
+        self._live_size = 0
+        self._map = None
+        self._pack = open(self._pack_path, 'a+b')
+        # True when the index on disk is out of date
+        self._dirty = False
+
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._index_path, 'r') as f:
+                index = json.load(f)
+
+            if index['version'] != INDEX_VERSION:
+                raise ValueError
+
+            pack_size = os.path.getsize(self._pack_path)
+
+            for digest, (offset, length) in index['blobs'].items():
+                if offset + length > pack_size:
+                    raise ValueError
+
+                self._blobs[digest] = [offset, length, 0]
+                self._live_size += length
+
+            for tv, icon_path, digest in index['keys']:
+                self._blobs[digest][2] += 1
+                self._keys[(tv, icon_path)] = digest
+
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            if os.path.exists(self._index_path):
+                logger.debug('icon cache index is invalid, starting over')
+
+            self._keys.clear()
+            self._blobs.clear()
+            self._live_size = 0
+            self._pack.truncate(0)
+
+    def _save(self):
+        index = dict(
+            version=INDEX_VERSION,
+            keys=list(
+                [tv, icon_path, digest]
+                for (tv, icon_path), digest in self._keys.items()
+            ),
+            blobs=dict(
+                (digest, [offset, length])
+                for digest, (offset, length, _) in self._blobs.items()
+            )
+        )
+
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+
+        _replace(tmp_path, self._index_path)
+        self._dirty = False
+
+    def _mapped(self, end):
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+
+            self._map = mmap.mmap(
+                self._pack.fileno(),
+                0,
+                access=mmap.ACCESS_READ
+            )
+
+        return self._map
+
+    def _read(self, offset, length):
+        if length == 0:
+            # an empty pack file can't be mapped
+            return b''
+
+        return self._mapped(offset + length)[offset:offset + length]
+
+    def _release(self, digest):
+        blob = self._blobs[digest]
+        blob[2] -= 1
+
+        if blob[2] == 0:
+            del self._blobs[digest]
+            self._live_size -= blob[1]
+
+    def _evict(self):
+        while self._live_size > self.max_size and len(self._keys) > 1:
+            key = next(iter(self._keys))
+            self._release(self._keys.pop(key))
+
+    def _compact(self):
+        pack_size = os.path.getsize(self._pack_path)
+        if pack_size - self._live_size <= max(self._live_size, 1024 * 1024):
+            return
+
+        tmp_path = self._pack_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for blob in sorted(self._blobs.values()):
+                offset, length, _ = blob
+                f.write(self._read(offset, length))
+                blob[0] = f.tell() - length
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        self._pack.close()
+        _replace(tmp_path, self._pack_path)
+        self._pack = open(self._pack_path, 'a+b')
+        # the offsets have changed, the old index no longer fits the pack
+        self._save()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item):
+        return tuple(item) in self._keys
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(
+                icons=len(self._keys),
+                blobs=len(self._blobs),
+                size=self._live_size,
+                pack_size=os.path.getsize(self._pack_path),
+                hits=self.hits,
+                misses=self.misses
+            )
+
+    def get(self, tv, icon_path):
+        """
+        :return: the stored image data or None if it is not in the cache.
+        """
+        key = (tv, icon_path)
+
+        with self._lock:
+            digest = self._keys.pop(key, None)
+
+            if digest is None:
+                self.misses += 1
+                return None
+
+            self._keys[key] = digest
+            self.hits += 1
+            # the least recently used order changed
+            self._dirty = True
+
+            offset, length, _ = self._blobs[digest]
+            return self._read(offset, length)
+
+    def put(self, tv, icon_path, data):
+        key = (tv, icon_path)
+        digest = hashlib.sha1(data).hexdigest()
+
+        with self._lock:
+            old_digest = self._keys.pop(key, None)
+
+            blob = self._blobs.get(digest, None)
+            if blob is None:
+                self._pack.seek(0, os.SEEK_END)
+                offset = self._pack.tell()
+                self._pack.write(data)
+                self._pack.flush()
+
+                blob = self._blobs[digest] = [offset, len(data), 0]
+                self._live_size += len(data)
+
+            blob[2] += 1
+            self._keys[key] = digest
+
+            if old_digest is not None:
+                self._release(old_digest)
+
+            self._evict()
+            self._dirty = True
+            self._compact()
+
+    def remove(self, tv, icon_path):
+        with self._lock:
+            digest = self._keys.pop((tv, icon_path), None)
+
+            if digest is not None:
+                self._release(digest)
+                self._dirty = True
+
+    def flush(self):
+        """Writes the index to disk if it changed since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def close(self):
+        with self._lock:
+            self._save()
+
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+            self._pack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
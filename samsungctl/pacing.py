@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    monotonic = time.time
+
+logger = logging.getLogger('samsungctl')
+
+
+class KeyPacer(object):
+    """
+    Spaces out the commands that are sent to a TV.
+
+    The pacer remembers when the last command went out and only makes the
+    caller wait for whatever is left of the interval. Time spent doing I/O
+    counts towards the interval. Threads that call wait at the same time are
+    handed consecutive time slots.
+
+    The gap that has to follow a command can be given when its slot is
+    reserved, commands that need more time before the next one (or none at
+    all) share the same pacer as the rest.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_send = 0.0
+
+    def reserve(self, interval=None):
+        """
+        Reserves the next time slot.
+
+        :param interval: seconds that have to pass before the command after
+            this one can be sent, the interval of the pacer if None.
+        :return: monotonic time the command is allowed to be sent at.
+        """
+        if interval is None:
+            interval = self.interval
+
+        with self._lock:
+            send_at = max(monotonic(), self._next_send)
+            self._next_send = send_at + interval
+
+        return send_at
+
+    def delay(self, interval=None):
+        """
+        Reserves the next time slot without blocking.
+
+        Used where the waiting is done some other way, asyncio.sleep for
+        instance.
+
+        :param interval: see reserve.
+        :return: seconds until the command is allowed to be sent.
+        """
+        return max(0.0, self.reserve(interval) - monotonic())
+
+    def wait(self, interval=None):
+        """
+        Blocks until the next command is allowed to be sent.
+
+        :param interval: see reserve.
+        :return: monotonic time the command is allowed to be sent at.
+        """
+        send_at = self.reserve(interval)
+        delay = send_at - monotonic()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return send_at
+
+    def reset(self):
+        with self._lock:
+            self._next_send = 0.0
+
+
+# offset is when the key was sent in seconds from the start of the batch,
+# duration is how long sending it took and error the exception if it failed.
+KeyTiming = namedtuple('KeyTiming', ['key', 'offset', 'duration', 'error'])
+
+
+def run_batch(send, keys, interval, pacer=None):
+    """
+    Calls send(key) for each key, spaced interval seconds apart.
+
+    The batch stops at the first key that fails.
+
+    :param interval: None if send spaces the keys out itself, send then
+        returns the monotonic time the key went out at.
+    :param pacer: KeyPacer of the connection so the batch also keeps its
+        distance from commands sent before it.
+    :return: list of KeyTiming, one for every key that was sent.
+    """
+    if pacer is None and interval is not None:
+        pacer = KeyPacer(interval)
+
+    start = monotonic()
+    timings = []
+
+    for key in keys:
+        if pacer is not None:
+            pacer.wait(interval)
+
+        sent = monotonic()
+
+        try:
+            sent_at = send(key)
+            error = None
+        except Exception as err:
+            sent_at = None
+            error = err
+
+        if pacer is None and sent_at is not None:
+            sent = sent_at
+
+        timings += [KeyTiming(key, sent - start, monotonic() - sent, error)]
+
+        if error is not None:
+            logger.error('Sending ' + key + ' failed: ' + str(error))
+            break
+
+    return timings
+
+
+class TokenBucket(object):
+    """
+    Limits the number of keys a TV is sent to rate per second.
+
+    Up to burst keys can go out right away after the TV has had a rest.
+    Callers that arrive when the bucket is empty are handed consecutive
+    slots, so any number of threads can share one bucket.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.acquired_count = 0
+        self.throttled_count = 0
+        self.throttled_time = 0.0
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = monotonic()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(
+                rate=self.rate,
+                burst=self.burst,
+                acquired=self.acquired_count,
+                throttled=self.throttled_count,
+                throttled_time=self.throttled_time
+            )
+
+    def reserve(self):
+        """
+        Takes a token without blocking.
+
+        :return: seconds the caller has to wait before it may send.
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            self.acquired_count += 1
+
+            if self._tokens >= 0:
+                return 0.0
+
+            delay = -self._tokens / self.rate
+            self.throttled_count += 1
+            self.throttled_time += delay
+
+        return delay
+
+    def acquire(self):
+        """
+        Blocks until a key may be sent.
+
+        :return: seconds that were waited.
+        """
+        delay = self.reserve()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return delay
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def host_bucket(host, rate, burst=None):
+    """
+    :return: the TokenBucket that is shared by everything in this process
+        that sends keys to host. An existing bucket is switched to the
+        given rate and burst.
+    """
+    if burst is None:
+        burst = 1
+
+    with _buckets_lock:
+        bucket = _buckets.get(host, None)
+
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+        else:
+            with bucket._lock:
+                bucket.rate = rate
+                bucket.burst = burst
+
+        return bucket
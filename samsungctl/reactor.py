@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+A single thread that reads from any number of websocket connections.
+
+Normally every RemoteWebsocket has a thread of its own that sits in
+sock.recv(). When a Reactor is used instead, the sockets of all of the
+remotes that use it are watched with selectors from one thread. A remote
+uses a reactor when one is set before the connection is opened.
+
+    remote.reactor = reactor.shared()
+
+The sockets of the remotes have a short timeout (remote_websocket.
+READ_TIMEOUT), a TV that stops sending halfway through a message does not
+hold up the others. What was read of the message is kept until the rest
+arrives.
+
+The incoming messages are handed to the remotes from the reactor thread.
+Receive callbacks that run on the reactor must not block waiting for
+another message from a TV, because that message can only be read once the
+callback returns.
+
+This module requires Python 3.4+.
+"""
+
+import sys
+
+if sys.version_info[:2] < (3, 4):
+    raise ImportError
+
+import logging # NOQA
+import selectors # NOQA
+import socket # NOQA
+import threading # NOQA
+from collections import deque # NOQA
+
+logger = logging.getLogger('samsungctl')
+
+
+class Reactor(object):
+
+    def __init__(self, name='samsungctl reactor'):
+        self.name = name
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._changes = deque()
+        self._thread = None
+        # sock -> file descriptor
+        self._fds = {}
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ)
+
+    def __len__(self):
+        return len(self._fds)
+
+    @property
+    def thread(self):
+        return self._thread
+
+    def _wakeup(self):
+        try:
+            self._wakeup_send.send(b'\x00')
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def register(self, remote, sock):
+        """
+        Starts reading sock for remote.
+
+        remote._receive(sock) is called every time there is data and
+        remote._connection_closed(sock) once the connection is gone or
+        unregister is called.
+        """
+        with self._lock:
+            self._changes.append((True, remote, sock))
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=self.name
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+        self._wakeup()
+
+    def unregister(self, remote, sock):
+        with self._lock:
+            self._changes.append((False, remote, sock))
+
+        self._wakeup()
+
+    def _apply_changes(self):
+        try:
+            while self._wakeup_recv.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        while True:
+            with self._lock:
+                if not self._changes:
+                    return
+
+                add, remote, sock = self._changes.popleft()
+
+            if add:
+                try:
+                    fd = sock.fileno()
+                    self._selector.register(
+                        fd,
+                        selectors.EVENT_READ,
+                        (remote, sock)
+                    )
+                    self._fds[sock] = fd
+                except (ValueError, KeyError, OSError):
+                    logger.debug('unable to watch socket', exc_info=True)
+                    remote._connection_closed(sock)
+            else:
+                self._remove(remote, sock)
+
+    def _remove(self, remote, sock):
+        fd = self._fds.pop(sock, None)
+        if fd is None:
+            return
+
+        try:
+            self._selector.unregister(fd)
+        except (ValueError, KeyError, OSError):
+            pass
+
+        remote._connection_closed(sock)
+
+    @staticmethod
+    def _pending(sock):
+        # data that has already been decrypted by the ssl layer does not
+        # make the socket show up as readable.
+        raw_sock = getattr(sock, 'sock', None)
+        pending = getattr(raw_sock, 'pending', None)
+
+        if pending is None:
+            return False
+
+        try:
+            return pending() > 0
+        except (ValueError, OSError):
+            return False
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fileobj is self._wakeup_recv:
+                    self._apply_changes()
+                    continue
+
+                remote, sock = key.data
+                if sock not in self._fds:
+                    continue
+
+                try:
+                    while True:
+                        if not remote._receive(sock):
+                            self._remove(remote, sock)
+                            break
+
+                        if not self._pending(sock):
+                            break
+                except Exception:
+                    logger.exception('error in websocket reactor')
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """
+    :return: the Reactor that is shared by the whole process.
+    """
+    global _shared
+
+    with _shared_lock:
+        if _shared is None:
+            _shared = Reactor()
+
+        return _shared
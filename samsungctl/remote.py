@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import threading
+import time
+from collections import namedtuple
+from concurrent import futures
+
 from . import exceptions
+from . import pacing
 from .remote_legacy import RemoteLegacy
 from .remote_websocket import RemoteWebsocket
 from .key_mappings import KEYS
@@ -11,6 +17,13 @@ try:
 except ImportError:
     RemoteEncrypted = None
 
+# What control_async resolves with. sent_at is the time.time() the key was
+# sent at, error is the exception if sending the key failed.
+ControlResult = namedtuple(
+    'ControlResult',
+    ['key', 'sent_at', 'transport', 'error']
+)
+
 
 class Remote(object):
     def __init__(self, config):
@@ -33,6 +46,17 @@ class Remote(object):
             raise exceptions.ConfigUnknownMethod()
 
         self.config = config
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        if config.key_rate:
+            self._bucket = pacing.host_bucket(
+                config.host,
+                config.key_rate,
+                config.key_burst
+            )
+        else:
+            self._bucket = None
 
     def __enter__(self):
         self.open()
@@ -45,11 +69,123 @@ class Remote(object):
         self.remote.open()
 
     def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
         return self.remote.close()
 
+    @property
+    def throttle_stats(self):
+        """
+        Counters of the key rate limit of the TV, None if there is no limit.
+
+        throttled is the number of keys that had to wait and throttled_time
+        the total number of seconds they waited.
+        """
+        if self._bucket is None:
+            return None
+
+        return self._bucket.stats
+
+    def _throttle(self):
+        if self._bucket is not None:
+            self._bucket.acquire()
+
     def control(self, key):
+        self._throttle()
         return self.remote.control(key)
 
+    def control_many(self, keys, interval=None):
+        """
+        Sends a number of keys, one after the other.
+
+        The keys are checked before anything is sent. They are spaced
+        interval seconds apart, measured from when the previous key was
+        sent. When interval is None the key_interval config setting or the
+        default of the connection method is used. Sending stops at the
+        first key that fails.
+
+        :raises exceptions.UnknownKey: if any of the keys is not known.
+        :return: list of pacing.KeyTiming
+        """
+        keys = list(keys)
+        unknown = list(key for key in keys if key not in KEYS)
+
+        if unknown:
+            raise exceptions.UnknownKey(', '.join(unknown))
+
+        if self._bucket is not None:
+            # the connections go through the keys one at a time, a token is
+            # taken right before each key is handed out.
+            def throttled(keys):
+                for key in keys:
+                    self._throttle()
+                    yield key
+
+            return self.remote.control_many(throttled(keys), interval)
+
+        return self.remote.control_many(keys, interval)
+
+    def control_async(self, key):
+        """
+        Sends a key without waiting for it to be sent.
+
+        :return: concurrent.futures.Future that resolves with a
+            ControlResult once the key has been sent or sending it failed.
+        """
+        result = futures.Future()
+        transport = self.config.method
+
+        def done(error=None, sent=None):
+            if error is not None:
+                sent_at = None
+            elif isinstance(sent, float):
+                # the connections return the monotonic time the key was
+                # written to the socket at
+                sent_at = time.time() - (pacing.monotonic() - sent)
+            else:
+                sent_at = time.time()
+
+            result.set_result(ControlResult(key, sent_at, transport, error))
+
+        if isinstance(self.remote, RemoteWebsocket) and self._bucket is None:
+            def sent(future):
+                if future.cancelled():
+                    done(futures.CancelledError())
+                elif future.exception() is not None:
+                    done(future.exception())
+                else:
+                    done(sent=future.result())
+
+            try:
+                self.remote.control(key, wait=False).add_done_callback(sent)
+            except Exception as err:
+                done(err)
+
+            return result
+
+        # the other connection methods block and waiting for the rate limit
+        # does too, they get a thread that sends the keys one at a time.
+        def run():
+            try:
+                sent = self.control(key)
+                if sent is False:
+                    raise exceptions.ConnectionClosed()
+            except Exception as err:
+                done(err)
+            else:
+                done(sent=sent)
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(max_workers=1)
+
+            self._executor.submit(run)
+
+        return result
+
     def __getattr__(self, item):
         if item in self.__dict__:
             return self.__dict__[item]
@@ -64,7 +200,13 @@ class Remote(object):
             return wrapper
 
     def __setattr__(self, key, value):
-        if key in ('remote', 'config'):
+        if key in (
+            'remote',
+            'config',
+            '_executor',
+            '_executor_lock',
+            '_bucket'
+        ):
             object.__setattr__(self, key, value)
             return
 
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio counterpart of samsungctl.Remote.
+
+Only the websocket connection method is supported.
+"""
+
+import sys
+
+if sys.version_info[:2] < (3, 5):
+    raise ImportError
+
+from . import exceptions # NOQA
+from .remote_websocket_async import AsyncRemoteWebsocket # NOQA
+from .key_mappings import KEYS # NOQA
+from .config import Config # NOQA
+
+
+class AsyncRemote(object):
+    def __init__(self, config):
+        if isinstance(config, dict):
+            config = Config(**config)
+
+        if config.method == "websocket":
+            self.remote = AsyncRemoteWebsocket(config)
+        else:
+            raise exceptions.ConfigUnknownMethod()
+
+        self.config = config
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def open(self):
+        await self.remote.open()
+
+    async def close(self):
+        return await self.remote.close()
+
+    async def control(self, key):
+        return await self.remote.control(key)
+
+    def __getattr__(self, item):
+        if item in self.__dict__:
+            return self.__dict__[item]
+
+        if hasattr(self.remote, item):
+            return getattr(self.remote, item)
+
+        if item.isupper() and item in KEYS:
+            def wrapper():
+                return self.control(item)
+
+            return wrapper
+
+        raise AttributeError(item)
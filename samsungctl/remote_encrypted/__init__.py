@@ -20,7 +20,9 @@ from . import crypto # NOQA
 import re # NOQA
 from .command_encryption import AESCipher # NOQA
 from ..utils import LogIt, LogItWithReturn # NOQA
+from .. import exceptions # NOQA
 from .. import wake_on_lan # NOQA
+from ..pacing import KeyPacer, monotonic, run_batch # NOQA
 import requests # NOQA
 import time # NOQA
 import websocket # NOQA
@@ -54,6 +56,7 @@ class RemoteEncrypted(object):
         self._running = False
         self._mac_address = None
         self._power_event = threading.Event()
+        self._pacer = KeyPacer(config.key_interval or self._key_interval)
 
     @property
     @LogItWithReturn
@@ -154,7 +157,7 @@ class RemoteEncrypted(object):
                 if output:
 
                     self.ctx = output['ctx'].hex()
-                    self.sk_prime = output['sk_prime']
+                    self.sk_prime = output['SKPrime']
                     logger.debug("ctx: " + self.ctx)
                     logger.info("Pin accepted :)\n")
                 else:
@@ -197,7 +200,8 @@ class RemoteEncrypted(object):
 
         self.aes_lib = AESCipher(self.ctx.upper(), self.current_session_id)
         self.sock = websocket.create_connection(websocket_url)
-        time.sleep(0.35)
+        # the TV needs a moment before the first command
+        self._pacer.reserve()
 
     @LogItWithReturn
     def get_full_url(self, url_path):
@@ -345,14 +349,51 @@ class RemoteEncrypted(object):
                 return
         try:
 
-            # need sleeps cuz if you send commands to quick it fails
+            # need pacing cuz if you send commands to quick it fails
+            self._pacer.wait()
             self.sock.send('1::/com.samsung.companion')
             # pairs to this app with this command.
-            time.sleep(0.35)
-
+            self._pacer.wait()
+            sent = monotonic()
             self.sock.send(self.aes_lib.generate_command(key))
-            time.sleep(0.35)
-            return True
+            return sent
         except:
             self.sock = None
             return False
+
+    _key_interval = 0.35
+
+    @LogItWithReturn
+    def control_many(self, keys, interval=None):
+        """
+        Sends a number of keys, interval seconds apart.
+
+        The TV only has to be told once that keys are coming.
+
+        :return: list of pacing.KeyTiming
+        """
+        if self.sock is None:
+            if not self._running:
+                self.open()
+
+            if self.sock is None:
+                raise exceptions.ConnectionClosed()
+
+        if interval is None:
+            interval = self.config.key_interval or self._key_interval
+
+        def send(key):
+            try:
+                self.sock.send(self.aes_lib.generate_command(key))
+            except:
+                self.sock = None
+                raise exceptions.ConnectionClosed()
+
+        try:
+            self._pacer.wait(interval)
+            self.sock.send('1::/com.samsung.companion')
+        except:
+            self.sock = None
+            raise exceptions.ConnectionClosed()
+
+        return run_batch(send, keys, interval, self._pacer)
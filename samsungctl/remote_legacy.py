@@ -3,10 +3,10 @@
 import base64
 import logging
 import socket
-import time
 import codecs
 import sys
 from . import exceptions
+from .pacing import KeyPacer, monotonic, run_batch
 from .utils import LogIt, LogItWithReturn
 
 logger = logging.getLogger('samsungctl')
@@ -21,6 +21,7 @@ class RemoteLegacy(object):
 
         self.config = config
         self.connection = None
+        self._pacer = KeyPacer(config.key_interval or self._key_interval)
 
     @LogIt
     def open(self):
@@ -30,7 +31,7 @@ class RemoteLegacy(object):
         if self.config.timeout:
             self.connection.settimeout(self.config.timeout)
 
-        self.connection.connect((config.host, config.port))
+        self.connection.connect((self.config.host, self.config.port))
 
         payload = (
             b"\x64\x00" +
@@ -58,13 +59,33 @@ class RemoteLegacy(object):
         if not self.connection:
             raise exceptions.ConnectionClosed()
 
+        self._pacer.wait()
+        return self._send_key(key)
+
+    @LogItWithReturn
+    def control_many(self, keys, interval=None):
+        """
+        Sends a number of keys, interval seconds apart.
+
+        :return: list of pacing.KeyTiming
+        """
+        if not self.connection:
+            raise exceptions.ConnectionClosed()
+
+        if interval is None:
+            interval = self.config.key_interval or self._key_interval
+
+        return run_batch(self._send_key, keys, interval, self._pacer)
+
+    def _send_key(self, key):
         payload = b"\x00\x00\x00" + self._serialize_string(key)
         packet = b"\x00\x00\x00" + self._serialize_string(payload, True)
 
         logger.info("Sending control command: %s", key)
+        sent = monotonic()
         self.connection.send(packet)
         self._read_response()
-        time.sleep(self._key_interval)
+        return sent
 
     _key_interval = 0.2
 
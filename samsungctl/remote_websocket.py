@@ -2,17 +2,24 @@
 
 from __future__ import absolute_import
 import base64
-import json
+import functools
 import logging
 import threading
 import ssl
+from concurrent import futures
 import websocket
 import requests
 import time
+from . import codec
 from . import exceptions
 from . import application
+from . import http_session
 from . import wake_on_lan
+from .callbacks import CallbackRegistry, MessageDispatcher
+from .key_mappings import KEYS
+from .pacing import monotonic, run_batch
 from .utils import LogIt, LogItWithReturn
+from .writer import Writer
 
 logger = logging.getLogger('samsungctl')
 
@@ -20,23 +27,140 @@ logger = logging.getLogger('samsungctl')
 URL_FORMAT = "ws://{}:{}/api/v2/channels/samsung.remote.control?name={}"
 SSL_URL_FORMAT = "wss://{}:{}/api/v2/channels/samsung.remote.control?name={}"
 
+CONTROL_COMMANDS = ('Click', 'Press', 'Release')
+
+# seconds to wait for the TV when config.timeout is not set. Also how long
+# the receive thread of a connection waits for data before it checks
+# whether it has to stop.
+CONNECT_TIMEOUT = 10.0
+# seconds a reactor waits for the rest of a message that has only partly
+# arrived before it moves on to the other connections. The part that was
+# read is kept and the rest is read once it arrives.
+READ_TIMEOUT = 0.05
+
+# (key, cmd) -> serialized ms.remote.control message
+_control_payloads = {}
+
+
+def control_payload(key, cmd='Click'):
+    """
+    Returns the serialized ms.remote.control message for a key.
+
+    The messages for the keys in key_mappings.KEYS are built the first time
+    they are needed and kept after that.
+    """
+    try:
+        return _control_payloads[(key, cmd)]
+    except KeyError:
+        pass
+
+    payload = codec.dumps(
+        dict(
+            method='ms.remote.control',
+            params=dict(
+                Cmd=cmd,
+                DataOfCmd=key,
+                Option="false",
+                TypeOfRemote="SendRemoteKey"
+            )
+        )
+    )
+
+    if key in KEYS and cmd in CONTROL_COMMANDS:
+        _control_payloads[(key, cmd)] = payload
 
-class RemoteWebsocket(object):
+    return payload
+
+
+class RemoteWebsocket(MessageDispatcher):
     """Object for remote control connection."""
 
+    # reactor.Reactor used by new instances, see the reactor property
+    default_reactor = None
+
     @LogIt
     def __init__(self, config):
         self.config = config
 
         self._loop_event = threading.Event()
         self.receive_lock = threading.Lock()
+        self._send_lock = threading.Lock()
         self._power_event = threading.Event()
         self.send_event = threading.Event()
-        self._registered_callbacks = []
+        self._registered_callbacks = CallbackRegistry()
+        # events that are always decoded, the last message received for
+        # each of them is kept in event_states
+        self.tracked_events = set()
+        self.event_states = {}
         self._thread = None
         self._mac_address = None
         self.sock = None
         self._running = False
+        self._pipelined = False
+        self._catalog = application.ApplicationCatalog(self)
+        self._icon_cache = None
+        self._reactor = self.default_reactor
+        # the keys of a burst keep the same distance as any other keys,
+        # which is the pipelined interval in pipelined mode
+        self._writer = Writer(self._write, burst_interval=None)
+
+    @property
+    def reactor(self):
+        """
+        reactor.Reactor that reads the incoming messages.
+
+        None (the default) means the connection has a thread of its own.
+        Changes take effect the next time the connection is opened.
+        """
+        return self._reactor
+
+    @reactor.setter
+    def reactor(self, value):
+        self._reactor = value
+
+    @property
+    def queue_stats(self):
+        """
+        Number of commands waiting to be sent and the number of commands
+        that have been dropped or merged into other commands.
+        """
+        return self._writer.stats
+
+    @property
+    def icon_cache(self):
+        """
+        icon_cache.IconCache used for the application icons.
+
+        None (the default) means the icons are always fetched from the TV.
+        """
+        return self._icon_cache
+
+    @icon_cache.setter
+    def icon_cache(self, value):
+        self._icon_cache = value
+
+    @property
+    @LogItWithReturn
+    def pipelined(self):
+        """
+        Pipelined send mode.
+
+        Keys are written as fast as the pacing interval allows
+        (config.key_interval, 0.1 seconds by default instead of
+        _key_interval) and send does not wait after a message.
+        """
+        return self._pipelined
+
+    @pipelined.setter
+    @LogIt
+    def pipelined(self, value):
+        self._pipelined = bool(value)
+
+    @property
+    def _pipelined_interval(self):
+        if self.config.key_interval is not None:
+            return self.config.key_interval
+        return 0.1
 
     @property
     @LogItWithReturn
@@ -87,7 +211,7 @@ class RemoteWebsocket(object):
                 try:
                     self.open()
                 except:
-                    while not self._power_event.isSet() and count < 6:
+                    while not self._power_event.is_set() and count < 6:
                         wake_on_lan.send_wol(self.mac_address)
                         self._power_event.wait(2)
                         try:
@@ -103,45 +227,56 @@ class RemoteWebsocket(object):
                         )
 
         elif not value and self.sock is not None:
-            self.control('KEY_POWER')
+            self._send_control('KEY_POWER', 'Click', wait=True)
             self._power_event.wait(2.0)
 
-            if not self._power_event.isSet():
+            if not self._power_event.is_set():
                 logger.info(
                     'unable to power off TV using command KEY_POWER. '
                     'Trying command KEY_POWEROFF'
                 )
-                with self.receive_lock:
-                    params = dict(
-                        Cmd='Click',
-                        DataOfCmd='KEY_POWEROFF',
-                        Option="false",
-                        TypeOfRemote="SendRemoteKey"
-                    )
-
-                    logger.info("Sending control command: " + str(params))
-                    self.send("ms.remote.control", **params)
-
+                self._send_control('KEY_POWEROFF', 'Click', wait=True)
                 self._power_event.wait(2.0)
 
-            if not self._power_event.isSet():
+            if not self._power_event.is_set():
                 logger.error('Unable to power off the TV')
 
     def loop(self):
+        sock = self.sock
 
-        while not self._loop_event.isSet():
-            try:
-                data = self.sock.recv()
-                if data:
-                    self.on_message(data)
-            except:
+        while not self._loop_event.is_set():
+            if not self._receive(sock):
                 self._loop_event.set()
 
+        self._connection_closed(sock)
+
+    def _receive(self, sock):
+        """
+        Reads and handles a single message.
+
+        :return: False if the connection is gone.
+        """
+        try:
+            data = sock.recv()
+            if data:
+                self.on_message(data)
+            return True
+        except websocket.WebSocketTimeoutException:
+            # nothing or only part of a message has arrived yet
+            return True
+        except:
+            return False
+
+    def _connection_closed(self, sock):
         self._power_event.set()
-        self.sock = None
+
+        # open could have made a new connection already
+        if self.sock is sock:
+            self.sock = None
+
         logger.info('Websocket closed')
         self._loop_event.clear()
-        del self._registered_callbacks[:]
+        self._registered_callbacks.clear()
         self._thread = None
 
     @LogIt
@@ -174,10 +309,19 @@ class RemoteWebsocket(object):
                 )
 
             try:
-                self.sock = websocket.create_connection(url, sslopt=sslopt)
+                self.sock = websocket.create_connection(
+                    url,
+                    sslopt=sslopt,
+                    timeout=self.config.timeout or CONNECT_TIMEOUT
+                )
             except:
                 raise RuntimeError('Unable to connect to the TV')
 
+            if self._reactor is not None:
+                # a TV that stops halfway through a message must not hold
+                # up the other connections of the reactor
+                self.sock.settimeout(READ_TIMEOUT)
+
             auth_event = threading.Event()
 
             def unauthorized_callback(_):
@@ -194,7 +338,13 @@ class RemoteWebsocket(object):
                         "Websocket connection failed. Trying ssl connection"
                     )
                     self.config.port = 8002
-                    self.open()
+
+                    if self._reactor is None:
+                        self.open()
+                    else:
+                        # the reactor thread has to be free to read the
+                        # reply to the new connection
+                        threading.Thread(target=self.open).start()
                 else:
                     self.close()
                     raise RuntimeError('Authentication denied')
@@ -220,20 +370,25 @@ class RemoteWebsocket(object):
             self.register_receive_callback(
                 auth_callback,
                 'event',
-                'ms.channel.connect'
+                'ms.channel.connect',
+                timeout=30.0
             )
 
             self.register_receive_callback(
                 unauthorized_callback,
                 'event',
-                'ms.channel.unauthorized'
+                'ms.channel.unauthorized',
+                timeout=30.0
             )
 
-            self._thread = threading.Thread(target=self.loop)
-            self._thread.start()
+            if self._reactor is None:
+                self._thread = threading.Thread(target=self.loop)
+                self._thread.start()
+            else:
+                self._reactor.register(self, self.sock)
 
             auth_event.wait(30.0)
-            if not auth_event.isSet():
+            if not auth_event.is_set():
                 self.close()
                 raise RuntimeError('Auth Failure')
 
@@ -248,41 +403,180 @@ class RemoteWebsocket(object):
     @LogIt
     def close(self):
         """Close the connection."""
-        if self.sock is not None:
-            self._loop_event.set()
-            self.sock.close()
+        if self._icon_cache is not None:
+            self._icon_cache.flush()
+
+        sock = self.sock
+        if sock is not None:
+            self._writer.clear()
+
+            if self._reactor is None:
+                self._loop_event.set()
+            else:
+                self._reactor.unregister(self, sock)
+
+            sock.close()
 
     @LogIt
     def send(self, method, **params):
+        """
+        Sends a message and waits until it has been written.
+
+        Messages are written by the writer thread of the connection.
+        """
+        if self._pipelined:
+            delay = 0.0
+        else:
+            delay = 0.2
+
+        future = self._send_message(method, params, delay)
+        if future is not None:
+            future.result()
+
+    def _send_message(self, method, params, delay=0.0):
+        payload = dict(
+            method=method,
+            params=params
+        )
+        return self._send_payload(method, codec.dumps(payload), delay)
+
+    def _send_payload(self, method, payload, delay=0.0, key=None):
+        """
+        Queues a serialized message on the writer.
+
+        :return: concurrent.futures.Future that resolves once the message has
+            been written or None if there is no connection.
+        """
         if self.sock is None:
             if method != 'ms.remote.control':
                 if not self._running:
                     try:
                         self.open()
-                        return self.send(method, **params)
                     except RuntimeError:
                         pass
 
-            logger.info('Is the TV on???')
-            return
+            if self.sock is None:
+                logger.info('Is the TV on???')
+                return None
 
-        payload = dict(
-            method=method,
-            params=params
+        return self._writer.write(payload, delay, key)
+
+    @LogIt
+    def request(
+        self,
+        method,
+        expect_event,
+        timeout=2.0,
+        match=None,
+        **params
+    ):
+        """
+        Sends a message and returns a concurrent.futures.Future for the reply.
+
+        The future is resolved with the first incoming message whose event is
+        expect_event and, if given, for which match(message) is True. If no
+        such message arrives within timeout seconds the future raises
+        exceptions.ResponseTimeout. The call does not wait, so any number of
+        requests can be in flight at the same time. Requests for the same
+        event need a match to tell their replies apart.
+        """
+        future = futures.Future()
+        deadline = monotonic() + timeout
+
+        def callback(response):
+            if match is not None and not match(response):
+                # the reply to another request for the same event
+                self.register_receive_callback(
+                    callback,
+                    'event',
+                    expect_event,
+                    timeout=max(0.0, deadline - monotonic()),
+                    on_timeout=on_timeout
+                )
+                return
+
+            if not future.done():
+                future.set_result(response)
+
+        def on_timeout():
+            if not future.done():
+                future.set_exception(
+                    exceptions.ResponseTimeout(expect_event)
+                )
+
+        self.register_receive_callback(
+            callback,
+            'event',
+            expect_event,
+            timeout=timeout,
+            on_timeout=on_timeout
         )
-        self.sock.send(json.dumps(payload))
-        self.send_event.wait(0.2)
+
+        def failed():
+            self.unregister_receive_callback(callback, 'event', expect_event)
+            on_timeout()
+
+        def written(write_future):
+            if write_future.cancelled():
+                failed()
+            elif write_future.exception() is not None:
+                logger.debug(
+                    'request ' + expect_event + ' failed: ' +
+                    str(write_future.exception())
+                )
+                failed()
+
+        try:
+            write_future = self._send_message(method, params)
+        except Exception as err:
+            write_future = None
+            logger.debug('request ' + expect_event + ' failed: ' + str(err))
+
+        if write_future is None:
+            failed()
+        else:
+            write_future.add_done_callback(written)
+
+        return future
+
+    def _write(self, payload):
+        sock = self.sock
+        if sock is None:
+            raise exceptions.ConnectionClosed()
+
+        with self._send_lock:
+            sent = monotonic()
+            sock.send(payload)
+
+        return sent
 
     @LogIt
-    def control(self, key, cmd='Click'):
+    def control(self, key, cmd='Click', wait=True):
         """
         Send a control command.
         cmd can be one of the following
         'Click'
         'Press'
         'Release'
+
+        If wait is False the command is handed to the writer thread of the
+        connection and a concurrent.futures.Future is returned right away.
+
+        :return: the monotonic time the key was sent at (None for the power
+            keys) or, if wait is False, a future for it.
+        :raises exceptions.ConnectionClosed: if the key could not be sent.
         """
+        if not wait:
+            if self._running and key not in ('KEY_POWER', 'KEY_POWERON'):
+                future = self._send_control(key, cmd)
+                if future is not None:
+                    return future
 
+            return self._writer.submit(self._control, key, cmd, key=key)
+
+        return self._control(key, cmd)
+
+    def _control(self, key, cmd):
         if not self._running:
             try:
                 self.open()
@@ -304,202 +598,211 @@ class RemoteWebsocket(object):
             self.power = True
             return
 
-        with self.receive_lock:
-            event = threading.Event()
-            params = dict(
-                Cmd=cmd,
-                DataOfCmd=key,
-                Option="false",
-                TypeOfRemote="SendRemoteKey"
-            )
-
-            logger.info("Sending control command: " + str(params))
-            self.send("ms.remote.control", **params)
-            event.wait(0.15)
+        future = self._send_control(key, cmd)
+        if future is None:
+            raise exceptions.ConnectionClosed()
 
-    _key_interval = 0.5
+        return future.result()
 
     @LogItWithReturn
-    def get_application(self, pattern):
-        for app in self.applications:
-            if pattern in (app.app_id, app.name):
-                return app
+    def control_many(self, keys, interval=None):
+        """
+        Sends a number of keys, interval seconds apart.
 
-    @property
-    @LogItWithReturn
-    def applications(self):
-        eden_event = threading.Event()
-        installed_event = threading.Event()
-
-        eden_data = []
-        installed_data = []
-
-        @LogIt
-        def eden_app_get(data):
-            logger.debug('eden apps: ' + str(data))
-            if 'data' in data:
-                eden_data.extend(data['data']['data'])
-            eden_event.set()
-
-        @LogIt
-        def installed_app_get(data):
-            logger.debug('installed apps: ' + str(data))
-            if 'data' in data:
-                installed_data.extend(data['data']['data'])
-            installed_event.set()
+        The default interval is the key_interval config setting or
+        _key_interval.
 
-        self.register_receive_callback(
-            eden_app_get,
-            'event',
-            'ed.edenApp.get'
-        )
-        self.register_receive_callback(
-            installed_app_get,
-            'event',
-            'ed.installedApp.get'
-        )
+        :return: list of pacing.KeyTiming
+        """
+        if not self._running:
+            self.open()
 
-        for event in ['ed.edenApp.get', 'ed.installedApp.get']:
+        if interval is None:
+            interval = self.config.key_interval or self._key_interval
 
-            params = dict(
-                data='',
-                event=event,
-                to='host'
-            )
+        # the writer spaces the keys out, it also keeps the commands that
+        # are sent after the batch interval seconds away from the last key
+        return run_batch(
+            functools.partial(self._send_key, interval=interval),
+            keys,
+            None
+        )
 
-            self.send('ms.channel.emit', **params)
+    def _send_key(self, key, interval):
+        if key in ('KEY_POWER', 'KEY_POWERON'):
+            self._control(key, 'Click')
+            return
 
-        eden_event.wait(2.0)
-        installed_event.wait(2.0)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Sending control command: " + key + ' Click')
 
-        if not eden_event.isSet():
+        future = self._send_payload(
+            'ms.remote.control',
+            control_payload(key, 'Click'),
+            delay=interval,
+            key=key
+        )
+        if future is None:
+            raise exceptions.ConnectionClosed()
 
-            self.unregister_receive_callback(
-                eden_app_get,
-                'event',
-                'ed.edenApp.get'
-            )
-            logger.debug('ed.edenApp.get timed out')
+        return future.result()
 
-        if not installed_event.isSet():
-            self.unregister_receive_callback(
-                installed_app_get,
-                'data',
-                None
-            )
-            logger.debug('ed.installedApp.get timed out')
-
-        if eden_data and installed_data:
-            updated_apps = []
-
-            for eden_app in eden_data[:]:
-                for installed_app in installed_data[:]:
-                    if eden_app['appId'] == installed_app['appId']:
-                        installed_data.remove(installed_app)
-                        eden_data.remove(eden_app)
-                        eden_app.update(installed_app)
-                        updated_apps += [eden_app]
-                        break
+    def _send_control(self, key, cmd, wait=False):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Sending control command: " + key + ' ' + cmd)
+
+        if self._pipelined:
+            delay = self._pipelined_interval
         else:
-            updated_apps = []
+            delay = self.config.key_interval or self._key_interval
 
-        updated_apps += eden_data + installed_data
+        future = self._send_payload(
+            'ms.remote.control',
+            control_payload(key, cmd),
+            delay=delay,
+            key=key
+        )
 
-        for app in updated_apps[:]:
-            updated_apps.remove(app)
-            updated_apps += [application.Application(self, **app)]
+        if wait and future is not None:
+            future.result()
 
-        logger.debug('applications returned: ' + str(updated_apps))
+        return future
 
-        return updated_apps
+    # seconds between keys when not pipelined
+    _key_interval = 0.35
 
-    @LogIt
-    def register_receive_callback(self, callback, key, data):
-        self._registered_callbacks += [[callback, key, data]]
+    @property
+    def catalog(self):
+        """
+        application.ApplicationCatalog for this TV.
 
-    @LogIt
-    def unregister_receive_callback(self, callback, key, data):
-        if [callback, key, data] in self._registered_callbacks:
-            self._registered_callbacks.remove([callback, key, data])
+        The catalog caches the application list for catalog.ttl seconds,
+        call catalog.refresh() to force an update.
+        """
+        return self._catalog
 
-    @LogIt
-    def on_message(self, message):
-        response = json.loads(message)
-        logger.debug('incoming message: ' + message)
+    @LogItWithReturn
+    def get_application(self, pattern):
+        return self._catalog.get(pattern)
 
-        for callback, key, data in self._registered_callbacks[:]:
-            if key in response and (data is None or response[key] == data):
-                callback(response)
-                self._registered_callbacks.remove([callback, key, data])
+    @property
+    @LogItWithReturn
+    def applications(self):
+        return self._catalog.applications
 
-    @LogIt
-    def start_voice_recognition(self):
-        """Activates voice recognition."""
-        with self.receive_lock:
-            event = threading.Event()
+    def iter_applications(self):
+        """
+        Yields the applications as soon as the TV sends them.
 
-            def voice_callback(_):
-                event.set()
+        See application.ApplicationCatalog.iter_applications.
+        """
+        return self._catalog.iter_applications()
 
-            self.register_receive_callback(
-                voice_callback,
-                'event',
-                'ms.voiceApp.standby'
-            )
+    @LogItWithReturn
+    def app_statuses(
+        self,
+        apps=None,
+        concurrency=http_session.POOL_SIZE,
+        max_age=None
+    ):
+        """
+        Fetches the status of a number of applications at the same time.
 
-            params = dict(
-                Cmd='Press',
-                DataOfCmd='KEY_BT_VOICE',
-                Option="false",
-                TypeOfRemote="SendRemoteKey"
+        :param apps: the applications to check, all of them if None.
+        :param concurrency: the maximum number of requests made at once.
+        :param max_age: see application.Application.status.
+        :return: dict of app id -> application.Application.status()
+        """
+        if apps is None:
+            apps = self.applications
+
+        apps = list(apps)
+        if not apps:
+            return {}
+
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max(1, min(concurrency, len(apps)))
+        )
+
+        try:
+            statuses = executor.map(lambda app: app.status(max_age), apps)
+            return dict(
+                (app.app_id, status) for app, status in zip(apps, statuses)
             )
+        finally:
+            executor.shutdown(wait=False)
 
-            logger.info("Sending control command: " + str(params))
-            self.send("ms.remote.control", **params)
+    @LogIt
+    def register_receive_callback(
+        self,
+        callback,
+        key,
+        data,
+        timeout=None,
+        on_timeout=None
+    ):
+        """
+        Registers a one shot callback for incoming messages.
 
-            event.wait(2.0)
-            if not event.isSet():
-                self.unregister_receive_callback(
-                    voice_callback,
-                    'event',
-                    'ms.voiceApp.standby'
-                )
-                logger.debug('ms.voiceApp.standby timed out')
+        If a timeout is given the callback is removed once it expires and
+        on_timeout is called.
+        """
+        self._registered_callbacks.register(
+            callback,
+            key,
+            data,
+            timeout,
+            on_timeout
+        )
 
     @LogIt
-    def stop_voice_recognition(self):
-        """Activates voice recognition."""
+    def unregister_receive_callback(self, callback, key, data):
+        self._registered_callbacks.unregister(callback, key, data)
 
-        with self.receive_lock:
-            event = threading.Event()
+    @property
+    def pending_callbacks(self):
+        """Number of receive callbacks that are still waiting."""
+        self._registered_callbacks.reap()
+        return len(self._registered_callbacks)
 
-            def voice_callback(_):
-                event.set()
+    @LogIt
+    def start_voice_recognition(self, wait=True):
+        """
+        Activates voice recognition.
 
-            self.register_receive_callback(
-                voice_callback,
-                'event',
-                'ms.voiceApp.hide'
-            )
+        If wait is False the future for the reply of the TV is returned
+        instead of waiting for it.
+        """
+        return self._voice_recognition('Press', 'ms.voiceApp.standby', wait)
 
-            params = dict(
-                Cmd='Release',
-                DataOfCmd='KEY_BT_VOICE',
-                Option="false",
-                TypeOfRemote="SendRemoteKey"
-            )
+    @LogIt
+    def stop_voice_recognition(self, wait=True):
+        """Deactivates voice recognition."""
+        return self._voice_recognition('Release', 'ms.voiceApp.hide', wait)
+
+    def _voice_recognition(self, cmd, expect_event, wait):
+        params = dict(
+            Cmd=cmd,
+            DataOfCmd='KEY_BT_VOICE',
+            Option="false",
+            TypeOfRemote="SendRemoteKey"
+        )
 
-            logger.info("Sending control command: " + str(params))
-            self.send("ms.remote.control", **params)
+        logger.info("Sending control command: " + str(params))
+        future = self.request(
+            "ms.remote.control",
+            expect_event,
+            timeout=2.0,
+            **params
+        )
 
-            event.wait(2.0)
-            if not event.isSet():
-                self.unregister_receive_callback(
-                    voice_callback,
-                    'event',
-                    'ms.voiceApp.hide'
-                )
-                logger.debug('ms.voiceApp.hide timed out')
+        if not wait:
+            return future
+
+        try:
+            future.result()
+        except exceptions.ResponseTimeout as err:
+            logger.debug(str(err))
 
     @staticmethod
     def _serialize_string(string):
@@ -540,7 +843,7 @@ class Mouse(object):
     def _send(self, cmd, **kwargs):
         """Send a control command."""
 
-        if not self._remote.connection:
+        if self._remote.sock is None:
             raise exceptions.ConnectionClosed()
 
         if not self.is_running:
@@ -550,7 +853,7 @@ class Mouse(object):
             }
             params.update(kwargs)
 
-            payload = json.dumps({
+            payload = codec.dumps({
                 "method": "ms.remote.control",
                 "params": params
             })
@@ -589,7 +892,16 @@ class Mouse(object):
             self._touch_enable_event.set()
 
     @LogIt
-    def run(self):
+    def run(self, wait=True):
+        """
+        Sends the queued mouse commands.
+
+        If wait is False the commands are sent by the writer thread of the
+        connection and a concurrent.futures.Future is returned right away.
+        """
+        if not wait:
+            return self._remote._writer.submit(self.run)
+
         if self._remote.sock is None:
             logger.error('Is the TV on??')
             return
@@ -603,6 +915,11 @@ class Mouse(object):
             self._is_running = True
 
             with self._remote.receive_lock:
+                # the wait periods plus the 3 event waits below
+                timeout = sum(
+                    payload for payload in self._commands
+                    if isinstance(payload, (float, int))
+                ) + len(self._commands) * 3
 
                 @LogIt
                 def ime_start(_):
@@ -619,32 +936,35 @@ class Mouse(object):
                 self._remote.register_receive_callback(
                     ime_start,
                     'event',
-                    'ms.remote.imeStart'
+                    'ms.remote.imeStart',
+                    timeout=timeout
                 )
 
                 self._remote.register_receive_callback(
                     ime_update,
                     'event',
-                    'ms.remote.imeUpdate'
+                    'ms.remote.imeUpdate',
+                    timeout=timeout
                 )
 
                 self._remote.register_receive_callback(
                     touch_enable,
                     'event',
-                    'ms.remote.touchEnable'
+                    'ms.remote.touchEnable',
+                    timeout=timeout
                 )
 
                 for payload in self._commands:
                     if isinstance(payload, (float, int)):
                         self._send_event.wait(payload)
-                        if self._send_event.isSet():
+                        if self._send_event.is_set():
                             self._is_running = False
                             return
                     else:
                         logger.info(
                             "Sending mouse control command: " + str(payload)
                         )
-                        self._remote.sock.send(payload)
+                        self._remote._writer.write(payload).result()
 
                 self._ime_start_event.wait(len(self._commands))
                 self._ime_update_event.wait(len(self._commands))
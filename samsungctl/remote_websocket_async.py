@@ -0,0 +1,618 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio version of the websocket connection.
+
+Every AsyncRemoteWebsocket instance lives on the event loop it was opened
+on. There is no receive thread per connection, the incoming data is read by
+a task on that loop. This allows a single thread to drive any number of
+TV's.
+
+This module requires Python 3.5+ and the websockets library.
+"""
+
+from __future__ import absolute_import
+import sys
+
+if sys.version_info[:2] < (3, 5):
+    raise ImportError
+
+import asyncio # NOQA
+import base64 # NOQA
+import functools # NOQA
+import logging # NOQA
+import ssl # NOQA
+import websockets # NOQA
+from . import application # NOQA
+from . import codec # NOQA
+from . import exceptions # NOQA
+from . import wake_on_lan # NOQA
+from .callbacks import CallbackRegistry, MessageDispatcher # NOQA
+from .pacing import KeyPacer, monotonic # NOQA
+from .remote_websocket import ( # NOQA
+    URL_FORMAT,
+    SSL_URL_FORMAT,
+    control_payload
+)
+from .utils import LogIt # NOQA
+
+logger = logging.getLogger('samsungctl')
+
+
+async def get_icon(remote, icon_path):
+    """
+    Coroutine version of application.get_icon.
+
+    :return: the decoded image data or None if the TV did not reply.
+    """
+    if not icon_path:
+        return None
+
+    cache = getattr(remote, 'icon_cache', None)
+
+    if cache is not None:
+        data = cache.get(remote.config.host, icon_path)
+        if data is not None:
+            return data
+
+    future = await remote.request(
+        "ms.channel.emit",
+        "ed.apps.icon",
+        timeout=3.0,
+        match=functools.partial(application.is_icon_reply, icon_path),
+        event="ed.apps.icon",
+        to="host",
+        data=dict(iconPath=icon_path)
+    )
+
+    try:
+        response = await future
+    except exceptions.ResponseTimeout as err:
+        logger.debug(str(err))
+        return None
+
+    return application.store_icon(remote, icon_path, response)
+
+
+class AsyncApplication(application.Application):
+    """
+    Application of an AsyncRemoteWebsocket.
+
+    Everything that talks to the TV has to be awaited: status(), version,
+    is_visible, is_running, icon and run(). The REST request of status() is
+    made on a thread of the default executor so the event loop is not
+    blocked.
+    """
+
+    async def status(self, max_age=None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(application.Application.status, self, max_age)
+        )
+
+    async def _status_value(self, key, default=None):
+        status = await self.status()
+        return status.get(key, default)
+
+    @property
+    def version(self):
+        return self._status_value('version', 'Unknown')
+
+    @property
+    def is_visible(self):
+        return self._status_value('visible')
+
+    @property
+    def is_running(self):
+        return self._status_value('running')
+
+    @property
+    def icon(self):
+        return get_icon(self._remote, self._icon)
+
+    def create_app_data(self, **data):
+        return AsyncAppData(self, **data)
+
+
+class AsyncAppData(application.AppData):
+    """AppData of an AsyncApplication, icon and run() have to be awaited."""
+
+    async def run(self):
+        result = application.AppData.run(self)
+        if result is not None:
+            return await result
+
+    @property
+    def icon(self):
+        return get_icon(self.application._remote, self._icon)
+
+
+class AsyncRemoteWebsocket(MessageDispatcher):
+    """asyncio object for remote control connection."""
+
+    _key_interval = 0.35
+
+    @LogIt
+    def __init__(self, config):
+        self.config = config
+
+        self._registered_callbacks = CallbackRegistry()
+        # events that are always decoded, the last message received for
+        # each of them is kept in event_states
+        self.tracked_events = set()
+        self.event_states = {}
+        self._reader = None
+        self._send_lock = None
+        self._power_event = None
+        self._mac_address = None
+        self.sock = None
+        self._running = False
+        self._pacer = KeyPacer(config.key_interval or self._key_interval)
+
+    @LogIt
+    async def mac_address(self):
+        if self._mac_address is None:
+            loop = asyncio.get_event_loop()
+            _mac_address = await loop.run_in_executor(
+                None,
+                wake_on_lan.get_mac_address,
+                self.config.host
+            )
+            if _mac_address is None:
+                _mac_address = ''
+
+            self._mac_address = _mac_address
+
+        return self._mac_address
+
+    @LogIt
+    async def power(self, value=None):
+        """
+        Gets or sets the power state of the TV.
+
+        await remote.power() returns the current state,
+        await remote.power(True) turns the TV on and
+        await remote.power(False) turns the TV off.
+        """
+        if value is None:
+            return await self._get_power()
+
+        if not self._running:
+            try:
+                await self.open()
+            except RuntimeError:
+                pass
+
+        if value and self.sock is None:
+            mac_address = await self.mac_address()
+            if mac_address:
+                count = 0
+                wake_on_lan.send_wol(mac_address)
+                await asyncio.sleep(10)
+
+                try:
+                    await self.open()
+                except RuntimeError:
+                    while self.sock is None and count < 6:
+                        wake_on_lan.send_wol(mac_address)
+                        await asyncio.sleep(2)
+                        try:
+                            await self.open()
+                            break
+                        except RuntimeError:
+                            count += 1
+
+                    if count == 6:
+                        logger.error(
+                            'Unable to power on the TV, '
+                            'check network connectivity'
+                        )
+
+        elif not value and self.sock is not None:
+            power_event = self._power_event
+            await self._send_key('KEY_POWER', 'Click')
+
+            if not await self._wait_event(power_event, 2.0):
+                logger.info(
+                    'unable to power off TV using command KEY_POWER. '
+                    'Trying command KEY_POWEROFF'
+                )
+                await self._send_key('KEY_POWEROFF', 'Click')
+
+                if not await self._wait_event(power_event, 2.0):
+                    logger.error('Unable to power off the TV')
+
+    async def _get_power(self):
+        if not self._running:
+            try:
+                await self.open()
+                return True
+            except RuntimeError:
+                return False
+
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.config.host, 8001),
+                2.0
+            )
+            writer.close()
+            return True
+        except (asyncio.TimeoutError, OSError):
+            return False
+
+    @staticmethod
+    async def _wait_event(event, timeout):
+        if event is None:
+            return True
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def loop(self):
+        try:
+            while True:
+                data = await self.sock.recv()
+                if data:
+                    self.on_message(data)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.debug('Websocket receive loop stopped', exc_info=True)
+
+        self._power_event.set()
+        self.sock = None
+        self._running = False
+        logger.info('Websocket closed')
+        self._registered_callbacks.clear()
+        self._reader = None
+
+    @LogIt
+    async def open(self):
+        if self.sock is not None:
+            await self.close()
+
+        if self._send_lock is None:
+            self._send_lock = asyncio.Lock()
+
+        if self.config.port == 8002:
+            if self.config.token:
+                logger.debug('using saved token: ' + self.config.token)
+                token = "&token=" + self.config.token
+            else:
+                token = ''
+
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+
+            kwargs = dict(ssl=ssl_context)
+            url = SSL_URL_FORMAT.format(
+                self.config.host,
+                self.config.port,
+                self._serialize_string(self.config.name)
+            ) + token
+
+        else:
+            self.config.port = 8001
+            kwargs = dict()
+            url = URL_FORMAT.format(
+                self.config.host,
+                self.config.port,
+                self._serialize_string(self.config.name)
+            )
+
+        try:
+            self.sock = await websockets.connect(
+                url,
+                max_size=None,
+                ping_interval=None,
+                compression=None,
+                **kwargs
+            )
+        except Exception:
+            raise RuntimeError('Unable to connect to the TV')
+
+        loop = asyncio.get_event_loop()
+        auth_future = loop.create_future()
+
+        def unauthorized_callback(_):
+            self.unregister_receive_callback(
+                auth_callback,
+                'event',
+                'ms.channel.connect'
+            )
+            if not auth_future.done():
+                auth_future.set_result(False)
+
+        def auth_callback(data):
+            if 'data' in data and 'token' in data["data"]:
+                self.config.token = data['data']["token"]
+
+                logger.debug('new token: ' + self.config.token)
+                if self.config.path:
+                    self.config.save()
+
+            logger.debug("Access granted.")
+
+            self.unregister_receive_callback(
+                unauthorized_callback,
+                'event',
+                'ms.channel.unauthorized'
+            )
+            if not auth_future.done():
+                auth_future.set_result(True)
+
+        self.register_receive_callback(
+            auth_callback,
+            'event',
+            'ms.channel.connect',
+            timeout=30.0
+        )
+
+        self.register_receive_callback(
+            unauthorized_callback,
+            'event',
+            'ms.channel.unauthorized',
+            timeout=30.0
+        )
+
+        self._power_event = asyncio.Event()
+        self._reader = loop.create_task(self.loop())
+
+        try:
+            authorized = await asyncio.wait_for(auth_future, 30.0)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RuntimeError('Auth Failure')
+
+        if not authorized:
+            await self.close()
+
+            if self.config.port == 8001:
+                logger.debug(
+                    "Websocket connection failed. Trying ssl connection"
+                )
+                self.config.port = 8002
+                return await self.open()
+
+            raise RuntimeError('Authentication denied')
+
+        self._running = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @LogIt
+    async def close(self):
+        """Close the connection."""
+        sock = self.sock
+        reader = self._reader
+
+        if sock is not None:
+            await sock.close()
+
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+
+    @LogIt
+    async def send(self, method, **params):
+        payload = dict(
+            method=method,
+            params=params
+        )
+        await self._send_payload(method, codec.dumps(payload))
+
+    async def _send_payload(self, method, payload):
+        if self.sock is None:
+            if method != 'ms.remote.control':
+                if not self._running:
+                    try:
+                        await self.open()
+                        return await self._send_payload(method, payload)
+                    except RuntimeError:
+                        pass
+
+            logger.info('Is the TV on???')
+            return
+
+        await self.sock.send(payload)
+
+    @LogIt
+    async def control(self, key, cmd='Click'):
+        """
+        Send a control command.
+        cmd can be one of the following
+        'Click'
+        'Press'
+        'Release'
+        """
+
+        if not self._running:
+            try:
+                await self.open()
+            except RuntimeError:
+                if key in ('KEY_POWERON', 'KEY_POWER'):
+                    await self.power(True)
+                    return
+                else:
+                    raise
+
+        if key == 'KEY_POWER':
+            await self.power(not await self.power())
+            return
+
+        if key == 'KEY_POWERON':
+            await self.power(True)
+            return
+
+        await self._send_key(key, cmd)
+
+    async def _send_key(self, key, cmd):
+        async with self._send_lock:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Sending control command: " + key + ' ' + cmd)
+
+            delay = self._pacer.delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            await self._send_payload(
+                'ms.remote.control',
+                control_payload(key, cmd)
+            )
+
+    @LogIt
+    async def get_application(self, pattern):
+        for app in await self.applications():
+            if pattern in (app.app_id, app.name):
+                return app
+
+    @LogIt
+    async def request(
+        self,
+        method,
+        expect_event,
+        timeout=2.0,
+        match=None,
+        **params
+    ):
+        """
+        Sends a message and returns an asyncio future for the reply.
+
+        The future is resolved with the first incoming message whose event is
+        expect_event and, if given, for which match(message) is True. It
+        raises exceptions.ResponseTimeout if no such message arrives within
+        timeout seconds.
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        deadline = monotonic() + timeout
+
+        def callback(response):
+            if match is not None and not match(response):
+                # the reply to another request for the same event
+                self.register_receive_callback(
+                    callback,
+                    'event',
+                    expect_event,
+                    timeout=max(0.0, deadline - monotonic()),
+                    on_timeout=on_timeout
+                )
+                return
+
+            if not future.done():
+                future.set_result(response)
+
+        def set_timeout():
+            if not future.done():
+                future.set_exception(
+                    exceptions.ResponseTimeout(expect_event)
+                )
+
+        def on_timeout():
+            # called from the callback reaper thread
+            loop.call_soon_threadsafe(set_timeout)
+
+        self.register_receive_callback(
+            callback,
+            'event',
+            expect_event,
+            timeout=timeout,
+            on_timeout=on_timeout
+        )
+
+        try:
+            await self.send(method, **params)
+        except Exception as err:
+            logger.debug('request ' + expect_event + ' failed: ' + str(err))
+
+        if self.sock is None:
+            self.unregister_receive_callback(callback, 'event', expect_event)
+            set_timeout()
+
+        return future
+
+    @LogIt
+    async def applications(self):
+        pending = []
+
+        for event in ('ed.edenApp.get', 'ed.installedApp.get'):
+            pending += [
+                await self.request(
+                    'ms.channel.emit',
+                    event,
+                    timeout=2.0,
+                    data='',
+                    event=event,
+                    to='host'
+                )
+            ]
+
+        eden_data = []
+        installed_data = []
+
+        for data, future in zip((eden_data, installed_data), pending):
+            try:
+                response = await future
+            except exceptions.ResponseTimeout as err:
+                logger.debug(str(err))
+                continue
+
+            logger.debug('{0}: {1}'.format(response['event'], response))
+            if 'data' in response:
+                data.extend(response['data']['data'])
+
+        updated_apps = application.merge_applications(
+            self,
+            eden_data,
+            installed_data,
+            AsyncApplication
+        )
+
+        logger.debug('applications returned: ' + str(updated_apps))
+
+        return updated_apps
+
+    @LogIt
+    def register_receive_callback(
+        self,
+        callback,
+        key,
+        data,
+        timeout=None,
+        on_timeout=None
+    ):
+        self._registered_callbacks.register(
+            callback,
+            key,
+            data,
+            timeout,
+            on_timeout
+        )
+
+    @LogIt
+    def unregister_receive_callback(self, callback, key, data):
+        self._registered_callbacks.unregister(callback, key, data)
+
+    @property
+    def pending_callbacks(self):
+        """Number of receive callbacks that are still waiting."""
+        self._registered_callbacks.reap()
+        return len(self._registered_callbacks)
+
+    @staticmethod
+    def _serialize_string(string):
+        if isinstance(string, str):
+            string = str.encode(string)
+
+        return base64.b64encode(string).decode("utf-8")
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Fake TV's for testing and benchmarking without a real TV.
+
+Every fake runs real servers on the local machine that speak the protocol
+of one of the connection methods, so the remotes are used exactly as they
+are with a TV.
+
+    from samsungctl.testing import FakeWebsocketTV
+
+    with FakeWebsocketTV(latency=0.02, drop_rate=0.01) as tv:
+        config = samsungctl.Config(host=tv.host, method='websocket')
+        with samsungctl.Remote(config) as remote:
+            remote.control('KEY_MENU')
+
+        print(tv.keys)
+
+FakeEncryptedTV is only available if the encrypted connection method is
+(Python 3 and pycryptodome).
+
+This package requires Python 3.
+"""
+
+import sys
+
+if sys.version_info[0] < 3:
+    raise ImportError
+
+from .server import FakeTV # NOQA
+from .legacy import FakeLegacyTV # NOQA
+from .websocket import FakeWebsocketTV # NOQA
+
+try:
+    from .encrypted import FakeEncryptedTV # NOQA
+except ImportError:
+    FakeEncryptedTV = None
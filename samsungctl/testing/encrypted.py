@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Fake 2014 & 2015 (H and J) TV, the one RemoteEncrypted talks to.
+
+The TV side of the pairing is built from the same keys RemoteEncrypted
+uses, so a remote that enters the right pin ends up with a working token.
+"""
+
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+
+from Crypto.Cipher import AES
+
+from ..remote_encrypted import crypto, keys
+from ..remote_encrypted.command_encryption import unpad
+from .server import FakeTV, ThreadingHTTPServer
+
+logger = logging.getLogger('samsungctl')
+
+_PAIRING_RE = re.compile(r'^/ws/pairing\?step=(\d+)')
+_SERVER_HELLO_RE = re.compile(r'GeneratorServerHello"\s*:\s*"([0-9a-fA-F]+)"')
+_SERVER_ACK_RE = re.compile(r'ServerAckMsg"\s*:\s*"([0-9a-fA-F]+)"')
+_COMMAND_RE = re.compile(r'^5::/com\.samsung\.companion:(.*)$', re.DOTALL)
+
+GX_SIZE = 0x80
+
+
+def _secret(gx):
+    # the same conversion crypto.parseClientHello does
+    secret = pow(
+        int(gx.hex(), 16),
+        int(keys.privateKey, 16),
+        int(keys.prime, 16)
+    )
+    return bytes.fromhex(hex(secret).rstrip('L').lstrip('0x'))
+
+
+class FakeEncryptedTV(FakeTV):
+    """
+    Fake TV that speaks the encrypted protocol.
+
+    The pairing pages are served on port, the port RemoteEncrypted is
+    configured with (8080 by default), and the socket.io connection on
+    socket_io_port. RemoteEncrypted always connects to socket.io on port
+    8000.
+
+    A remote that already has a token does not have to pair, create_token
+    makes one the TV knows.
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=8080,
+        socket_io_port=8000,
+        pin='1234',
+        tv_id='fake-tv',
+        **kwargs
+    ):
+        FakeTV.__init__(self, host, **kwargs)
+        self.port = port
+        self.socket_io_port = socket_io_port
+        self.pin = pin
+        self.tv_id = tv_id
+        self.pin_page_running = False
+
+        # session id -> AES key of the paired remotes
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pairing = None
+
+    def _create_servers(self):
+        return [
+            ThreadingHTTPServer(self, (self.host, self.port)),
+            ThreadingHTTPServer(self, (self.host, self.socket_io_port))
+        ]
+
+    def _add_session(self, ctx):
+        with self._lock:
+            # RemoteEncrypted only reads the first digit of the session id
+            session_id = len(self._sessions) % 9 + 1
+            self._sessions[session_id] = ctx
+
+        return session_id
+
+    def create_token(self):
+        """:return: token for config.token that needs no pairing."""
+        ctx = os.urandom(16)
+        session_id = self._add_session(ctx)
+        return ctx.hex() + ':' + str(session_id)
+
+    def http(self, handler, method, path, body):
+        body = body.decode('utf-8', 'replace')
+
+        if path.startswith('/ws/apps/CloudPINPage'):
+            if method == 'POST':
+                self.pin_page_running = True
+                return 201, 'text/plain', ''
+
+            if method == 'DELETE':
+                self.pin_page_running = False
+                return 200, 'text/plain', ''
+
+            state = 'running' if self.pin_page_running else 'stopped'
+            return 200, 'application/xml', (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<service><name>CloudPINPage</name>'
+                '<state>' + state + '</state></service>'
+            )
+
+        match = _PAIRING_RE.match(path)
+        if match is not None:
+            return self._pairing_step(int(match.group(1)), body)
+
+        if path.startswith('/socket.io/1/websocket'):
+            return 400, 'text/plain', 'websocket expected'
+
+        if path.startswith('/socket.io/1/'):
+            return 200, 'text/plain', (
+                binascii.hexlify(os.urandom(8)).decode('utf-8') +
+                ':60:60:websocket,flashsocket'
+            )
+
+        return 404, 'text/plain', 'Not Found'
+
+    def _client_hello(self, server_hello):
+        # the id of the remote is in the server hello
+        user_id_length = struct.unpack('>I', server_hello[11:15])[0]
+        remote_id = server_hello[15:15 + user_id_length]
+
+        aes_key = hashlib.sha1(self.pin.encode('utf-8')).digest()[:16]
+        tv_id = self.tv_id.encode('utf-8')
+
+        while True:
+            gx = os.urandom(GX_SIZE)
+            try:
+                secret = _secret(gx)
+                break
+            except ValueError:
+                # an odd number of hex digits, the remote can't read it
+                continue
+
+        cipher = AES.new(aes_key, AES.MODE_CBC, b'\x00' * 16)
+        enc_gx = crypto.EncryptParameterDataWithAES(cipher.encrypt(gx))
+
+        data = (
+            struct.pack('>I', len(tv_id)) +
+            tv_id +
+            enc_gx +
+            hashlib.sha1(tv_id + secret).digest() +
+            b'\x00' +
+            struct.pack('>I', 0)
+        )
+        client_hello = (
+            b'\x01\x01' + b'\x00' * 5 +
+            struct.pack('>I', len(tv_id) + 132) +
+            data +
+            b'\x00' * 5
+        )
+
+        sk_prime = hashlib.sha1(
+            tv_id +
+            remote_id +
+            gx +
+            bytes.fromhex(keys.publicKey) +
+            secret
+        ).digest()
+
+        return client_hello, sk_prime
+
+    def _pairing_step(self, step, body):
+        if step == 0:
+            return 200, 'application/json', dict(
+                auth_data=dict(auth_type='SPC', request_id='0')
+            )
+
+        if step == 1:
+            match = _SERVER_HELLO_RE.search(body)
+            if match is None:
+                return 400, 'application/json', dict(error='no hello')
+
+            client_hello, sk_prime = self._client_hello(
+                bytes.fromhex(match.group(1))
+            )
+            self._pairing = sk_prime
+
+            auth_data = json.dumps(
+                dict(
+                    auth_type='SPC',
+                    request_id='0',
+                    GeneratorClientHello=client_hello.hex().upper()
+                )
+            )
+            return 200, 'application/json', dict(auth_data=auth_data)
+
+        if step == 2:
+            match = _SERVER_ACK_RE.search(body)
+            sk_prime = self._pairing
+
+            if (
+                match is None or
+                sk_prime is None or
+                match.group(1) != crypto.generateServerAcknowledge(sk_prime)
+            ):
+                return 400, 'application/json', dict(error='bad ack')
+
+            sk_prime_hash = hashlib.sha1(sk_prime + b'\x00').digest()
+            ctx = crypto.applySamyGOKeyTransform(sk_prime_hash[:16])
+            session_id = self._add_session(ctx)
+            self._pairing = None
+
+            client_ack = (
+                '0104000000000000000014' +
+                hashlib.sha1(sk_prime + b'\x02').hexdigest().upper() +
+                '0000000000'
+            )
+            auth_data = json.dumps(
+                dict(
+                    auth_type='SPC',
+                    request_id='0',
+                    ClientAckMsg=client_ack,
+                    session_id=str(session_id)
+                )
+            )
+            return 200, 'application/json', dict(auth_data=auth_data)
+
+        return 404, 'application/json', dict(error='unknown step')
+
+    def _decrypt(self, session_id, body):
+        with self._lock:
+            ctx = self._sessions.get(session_id)
+
+        if ctx is None:
+            return None
+
+        data = bytes(int(value) for value in body.strip('[]').split(','))
+        cipher = AES.new(ctx, AES.MODE_ECB)
+        return json.loads(unpad(cipher.decrypt(data)).decode('utf-8'))
+
+    def websocket(self, session, path):
+        # socket.io connect
+        self.delay()
+        session.send('1::')
+
+        while True:
+            message = session.recv()
+            if message is None:
+                return
+
+            if message.startswith('2::'):
+                # heartbeat
+                session.send('2::')
+                continue
+
+            match = _COMMAND_RE.match(message)
+            if match is None:
+                continue
+
+            try:
+                args = json.loads(match.group(1))['args'][0]
+                command = self._decrypt(
+                    int(args['Session_Id']),
+                    args['body']
+                )
+            except (ValueError, KeyError, IndexError, TypeError):
+                logger.debug('fake encrypted tv: bad command ' + message)
+                continue
+
+            if command is None:
+                logger.debug('fake encrypted tv: unknown session')
+                continue
+
+            self.press(command['body']['param3'])
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Fake pre 2014 TV, the one RemoteLegacy talks to on port 55000.
+"""
+
+import base64
+import logging
+import socket
+import socketserver
+import struct
+
+from .server import FakeTV
+
+logger = logging.getLogger('samsungctl')
+
+ACCESS_GRANTED = b'\x64\x00\x01\x00'
+ACCESS_DENIED = b'\x64\x00\x00\x00'
+CONTROL_ACCEPTED = b'\x00\x00\x00\x00'
+# what a dropped key is answered with, anything other than
+# CONTROL_ACCEPTED makes RemoteLegacy raise exceptions.UnhandledResponse
+CONTROL_IGNORED = b'\x00\x00\x00\x01'
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, tv, address):
+        self.tv = tv
+        self.connections = set()
+        socketserver.ThreadingTCPServer.__init__(self, address, _Handler)
+
+    def close_sessions(self):
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except (IOError, OSError):
+                pass
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def _read(self, count):
+        data = b''
+        while len(data) < count:
+            chunk = self.request.recv(count - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+
+        return data
+
+    def _read_packet(self):
+        # 0x00, the length of the app name, the app name, the length of the
+        # payload and the payload. The lengths are little endian.
+        self._read(1)
+        name_length = struct.unpack('<H', self._read(2))[0]
+        self._read(name_length)
+        payload_length = struct.unpack('<H', self._read(2))[0]
+        return self._read(payload_length)
+
+    def _send(self, response):
+        tv = self.server.tv
+        name = tv.name.encode('utf-8')
+
+        # the lengths are written in the byte order RemoteLegacy reads them
+        packet = (
+            b'\x00' +
+            struct.pack('>H', len(name)) +
+            name +
+            struct.pack('>H', len(response)) +
+            response
+        )
+        tv.delay()
+        self.request.sendall(packet)
+
+    @staticmethod
+    def _strings(payload):
+        strings = []
+        while payload:
+            length = struct.unpack('<H', payload[:2])[0]
+            strings.append(base64.b64decode(payload[2:2 + length]))
+            payload = payload[2 + length:]
+
+        return strings
+
+    def handle(self):
+        tv = self.server.tv
+        self.server.connections.add(self.request)
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        try:
+            while True:
+                payload = self._read_packet()
+
+                if payload[:2] == b'\x64\x00':
+                    description, remote_id, name = (
+                        s.decode('utf-8') for s in self._strings(payload[2:])
+                    )
+                    tv.remotes.append((name, description, remote_id))
+
+                    if tv.authorized:
+                        self._send(ACCESS_GRANTED)
+                    else:
+                        self._send(ACCESS_DENIED)
+                        return
+
+                elif payload[:3] == b'\x00\x00\x00':
+                    key = self._strings(payload[3:])[0].decode('utf-8')
+
+                    if tv.press(key):
+                        self._send(CONTROL_ACCEPTED)
+                    else:
+                        self._send(CONTROL_IGNORED)
+                else:
+                    logger.debug('fake legacy tv: unknown packet')
+        except (EOFError, IOError, OSError, struct.error):
+            pass
+        finally:
+            self.server.connections.discard(self.request)
+
+
+class FakeLegacyTV(FakeTV):
+    """
+    Fake TV that speaks the protocol of the pre 2014 models.
+
+    Every connection is handed the access granted reply after the handshake
+    unless authorized is False. Keys are acknowledged, dropped keys get a
+    reply RemoteLegacy does not know, so they show up as errors.
+
+    Pass port=0 to get a free port, see server_port.
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=55000,
+        name='Samsung TV',
+        authorized=True,
+        **kwargs
+    ):
+        FakeTV.__init__(self, host, **kwargs)
+        self.port = port
+        self.name = name
+        self.authorized = authorized
+        # (name, description, id) of every remote that connected
+        self.remotes = []
+
+    def _create_servers(self):
+        return [_Server(self, (self.host, self.port))]
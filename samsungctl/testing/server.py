@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+The pieces the fake TV's are built from: the common settings, a threaded
+HTTP server and just enough of the websocket protocol (RFC 6455) to talk to
+websocket-client.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import random
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from ..pacing import monotonic
+
+logger = logging.getLogger('samsungctl')
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+class FakeTV(object):
+    """
+    What all of the fake TV's have in common.
+
+    :param host: address the servers listen on. Every address in 127.0.0.0/8
+        can be used on Linux, so a number of TV's can run side by side on
+        the ports a real TV uses.
+    :param latency: seconds the TV waits before it answers anything.
+    :param drop_rate: chance (0.0 - 1.0) that a key is ignored.
+    :param min_interval: keys that arrive sooner than this many seconds
+        after the previous key are ignored, like a TV whose firmware can
+        not keep up.
+    :param seed: seed for the random numbers used for drop_rate.
+
+    Every key that is accepted is added to keys, the ignored ones to
+    dropped.
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        latency=0.0,
+        drop_rate=0.0,
+        min_interval=0.0,
+        seed=None
+    ):
+        self.host = host
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.min_interval = min_interval
+        self.keys = []
+        self.dropped = []
+
+        self._random = random.Random(seed)
+        self._condition = threading.Condition()
+        self._last_key = None
+        self._servers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _create_servers(self):
+        """:return: list of socketserver servers to run."""
+        raise NotImplementedError
+
+    def start(self):
+        self._servers = self._create_servers()
+
+        for server in self._servers:
+            thread = threading.Thread(
+                target=server.serve_forever,
+                name='samsungctl fake tv ' + str(server.server_address)
+            )
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            close_sessions = getattr(server, 'close_sessions', None)
+            if close_sessions is not None:
+                close_sessions()
+
+        self._servers = []
+
+    def server_port(self, index=0):
+        """:return: port the server at index listens on."""
+        return self._servers[index].server_address[1]
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def press(self, key):
+        """
+        Called for every key the TV receives.
+
+        :return: True if the key is accepted, False if it is dropped.
+        """
+        with self._condition:
+            now = monotonic()
+            too_soon = (
+                self._last_key is not None and
+                now - self._last_key < self.min_interval
+            )
+            self._last_key = now
+
+            if too_soon or self._random.random() < self.drop_rate:
+                logger.debug('fake tv dropped ' + key)
+                self.dropped.append(key)
+                accepted = False
+            else:
+                self.keys.append(key)
+                accepted = True
+
+            self._condition.notify_all()
+
+        return accepted
+
+    def wait_for_keys(self, count, timeout=5.0):
+        """
+        Waits until count keys have been received, accepted or not.
+
+        :return: True if they were.
+        """
+        end = monotonic() + timeout
+
+        with self._condition:
+            while len(self.keys) + len(self.dropped) < count:
+                remaining = end - monotonic()
+                if remaining <= 0:
+                    return False
+
+                self._condition.wait(remaining)
+
+        return True
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, tv, address, certfile=None):
+        self.tv = tv
+        self.secure = certfile is not None
+        self.sessions = set()
+        self.sessions_lock = threading.Lock()
+        HTTPServer.__init__(self, address, RequestHandler)
+
+        if certfile is not None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    def close_sessions(self):
+        with self.sessions_lock:
+            sessions = list(self.sessions)
+
+        for session in sessions:
+            session.close()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Hands the requests to the fake TV.
+
+    Plain requests go to tv.http(handler, method, path, body), which
+    returns (status, content type, body). Websocket upgrades go to
+    tv.websocket(session, path) once the handshake is done.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug('fake tv: ' + (format % args))
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # the replies are small, waiting to fill a packet only adds latency
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _handle(self, method):
+        if self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._upgrade()
+            return
+
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        body = self.rfile.read(length) if length else b''
+
+        status, content_type, data = self.server.tv.http(
+            self,
+            method,
+            self.path,
+            body
+        )
+
+        if not isinstance(data, bytes):
+            if not isinstance(data, str):
+                data = json.dumps(data)
+            data = data.encode('utf-8')
+
+        self.server.tv.delay()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _upgrade(self):
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode('utf-8')).digest()
+        ).decode('utf-8')
+
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        session = WebSocketSession(
+            self.connection,
+            self.rfile,
+            self.server.secure
+        )
+
+        with self.server.sessions_lock:
+            self.server.sessions.add(session)
+
+        try:
+            self.server.tv.websocket(session, self.path)
+        except (IOError, OSError):
+            pass
+        finally:
+            with self.server.sessions_lock:
+                self.server.sessions.discard(session)
+
+            session.close()
+            self.close_connection = True
+
+
+class WebSocketSession(object):
+    """
+    The server end of a websocket connection.
+
+    secure is True if the connection uses TLS.
+    """
+
+    def __init__(self, connection, rfile, secure=False):
+        self.secure = secure
+        self._connection = connection
+        self._rfile = rfile
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    def _read(self, count):
+        data = self._rfile.read(count)
+        if len(data) < count:
+            raise EOFError
+
+        return data
+
+    def _read_frame(self):
+        first, second = struct.unpack('!BB', self._read(2))
+        fin = first & 0x80
+        opcode = first & 0x0F
+        length = second & 0x7F
+
+        if length == 126:
+            length = struct.unpack('!H', self._read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self._read(8))[0]
+
+        if second & 0x80:
+            mask = self._read(4)
+            payload = self._read(length)
+            # xor the whole payload at once, a loop over the bytes is slow
+            # enough to hold up the remote on large messages
+            mask = (mask * (length // 4 + 1))[:length]
+            payload = (
+                int.from_bytes(payload, 'big') ^ int.from_bytes(mask, 'big')
+            ).to_bytes(length, 'big')
+        else:
+            payload = self._read(length)
+
+        return fin, opcode, payload
+
+    def recv(self):
+        """
+        :return: the next text message or None once the connection is gone.
+        """
+        fragments = []
+
+        while not self.closed:
+            try:
+                fin, opcode, payload = self._read_frame()
+            except (EOFError, IOError, OSError, ValueError, struct.error):
+                self.closed = True
+                return None
+
+            if opcode == OPCODE_CLOSE:
+                self.close()
+                return None
+
+            if opcode == OPCODE_PING:
+                self._send_frame(OPCODE_PONG, payload)
+                continue
+
+            if opcode == OPCODE_PONG:
+                continue
+
+            fragments.append(payload)
+            if fin:
+                return b''.join(fragments).decode('utf-8')
+
+        return None
+
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+        with self._send_lock:
+            self._connection.sendall(header + payload)
+
+    def send(self, message):
+        if not isinstance(message, str):
+            message = json.dumps(message)
+
+        try:
+            self._send_frame(OPCODE_TEXT, message.encode('utf-8'))
+        except (IOError, OSError):
+            self.closed = True
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+
+        try:
+            self._send_frame(OPCODE_CLOSE, struct.pack('!H', 1000))
+        except (IOError, OSError):
+            pass
+
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Fake 2016+ TV, the one RemoteWebsocket and AsyncRemoteWebsocket talk to.
+"""
+
+import base64
+import json
+import logging
+import re
+import threading
+import uuid
+
+from .server import FakeTV, ThreadingHTTPServer
+
+logger = logging.getLogger('samsungctl')
+
+ICON_PATH = '/opt/share/webappservice/apps_icon/FirstScreen/{0}/250x250.png'
+
+
+def _app(app_id, name, app_type=2):
+    return dict(
+        appId=app_id,
+        icon=ICON_PATH.format(app_id),
+        name=name,
+        is_lock=0,
+        app_type=app_type
+    )
+
+
+INSTALLED_APPS = [
+    _app('111299001912', 'YouTube'),
+    _app('11101200001', 'Netflix'),
+    _app('org.tizen.browser', 'Internet', 4),
+]
+
+EDEN_APPS = [
+    dict(
+        appId='111299001912',
+        name='YouTube',
+        icon=ICON_PATH.format('111299001912'),
+        action_type=None,
+        appType='web_app',
+        accelerators=[],
+        mbrIndex=None,
+        mbrSource=None,
+        sourceTypeNum=0
+    ),
+]
+
+_APPLICATION_RE = re.compile(r'^/api/v2/applications/([^/?]+)')
+
+
+class FakeWebsocketTV(FakeTV):
+    """
+    Fake TV that speaks the v2 websocket api.
+
+    * ms.remote.control keys are accepted. Pressing and releasing
+      KEY_BT_VOICE is answered with the ms.voiceApp.standby and
+      ms.voiceApp.hide events. KEY_POWER and KEY_POWEROFF close all of the
+      connections as if the TV was turned off.
+    * the ed.installedApp.get, ed.edenApp.get, ed.apps.icon and
+      ed.apps.launch events are answered from installed_apps, eden_apps and
+      icons (icon path -> image data, made up when missing).
+    * the REST api on the same port answers /api/v2/ and
+      /api/v2/applications/<app id>.
+
+    Connections get ms.channel.unauthorized if authorized is False. When a
+    certfile is given the TV also listens on ssl_port with TLS and hands out
+    token in the ms.channel.connect event.
+
+    RemoteWebsocket always connects to port 8001, a different port only
+    works with AsyncRemoteWebsocket.
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=8001,
+        ssl_port=8002,
+        certfile=None,
+        authorized=True,
+        token='12345678',
+        installed_apps=None,
+        eden_apps=None,
+        icons=None,
+        **kwargs
+    ):
+        FakeTV.__init__(self, host, **kwargs)
+        self.port = port
+        self.ssl_port = ssl_port
+        self.certfile = certfile
+        self.authorized = authorized
+        self.token = token
+        self.power = True
+
+        if installed_apps is None:
+            installed_apps = INSTALLED_APPS
+        if eden_apps is None:
+            eden_apps = EDEN_APPS
+        if icons is None:
+            icons = {}
+
+        self.installed_apps = list(installed_apps)
+        self.eden_apps = list(eden_apps)
+        self.icons = dict(icons)
+        self.running_apps = set()
+        # every message the TV received, decoded
+        self.messages = []
+        self._messages_lock = threading.Lock()
+
+    def _create_servers(self):
+        servers = [ThreadingHTTPServer(self, (self.host, self.port))]
+
+        if self.certfile is not None:
+            servers += [
+                ThreadingHTTPServer(
+                    self,
+                    (self.host, self.ssl_port),
+                    self.certfile
+                )
+            ]
+
+        return servers
+
+    def _find_app(self, app_id):
+        for app in self.installed_apps + self.eden_apps:
+            if app.get('appId') == app_id:
+                return app
+
+        return None
+
+    def icon(self, icon_path):
+        """:return: image data for icon_path."""
+        if icon_path not in self.icons:
+            self.icons[icon_path] = b'\x89PNG\r\n\x1a\n' + icon_path.encode()
+
+        return self.icons[icon_path]
+
+    def http(self, handler, method, path, body):
+        if path.rstrip('/') == '/api/v2':
+            return 200, 'application/json', dict(
+                id='uuid:' + str(uuid.uuid5(uuid.NAMESPACE_DNS, self.host)),
+                name='[TV] Samsung',
+                type='Samsung SmartTV',
+                uri='http://{0}:{1}/api/v2/'.format(self.host, self.port),
+                device=dict(PowerState='on' if self.power else 'standby')
+            )
+
+        match = _APPLICATION_RE.match(path)
+        if match is not None:
+            app_id = match.group(1)
+            app = self._find_app(app_id)
+
+            if app is None:
+                return 404, 'application/json', dict(message='Not Found')
+
+            if method == 'POST':
+                self.running_apps.add(app_id)
+            elif method == 'DELETE':
+                self.running_apps.discard(app_id)
+
+            return 200, 'application/json', dict(
+                id=app_id,
+                name=app.get('name'),
+                running=app_id in self.running_apps,
+                version='1.0.0',
+                visible=app_id in self.running_apps
+            )
+
+        return 404, 'text/plain', 'Not Found'
+
+    def websocket(self, session, path):
+        if not self.authorized:
+            self.delay()
+            session.send(dict(event='ms.channel.unauthorized'))
+            return
+
+        data = dict(clients=[], id=str(uuid.uuid4()))
+        if session.secure and 'token=' not in path:
+            data['token'] = self.token
+
+        self.power = True
+        self.delay()
+        session.send(dict(event='ms.channel.connect', data=data))
+
+        while True:
+            message = session.recv()
+            if message is None:
+                return
+
+            try:
+                message = json.loads(message)
+            except ValueError:
+                logger.debug('fake websocket tv: bad message ' + message)
+                continue
+
+            with self._messages_lock:
+                self.messages.append(message)
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'ms.remote.control':
+                self._remote_control(session, params)
+            elif method == 'ms.channel.emit':
+                self._emit(session, params)
+
+    def _reply(self, session, event, data):
+        self.delay()
+        session.send(dict(event=event, data=data))
+
+    def _remote_control(self, session, params):
+        if params.get('TypeOfRemote') != 'SendRemoteKey':
+            return
+
+        key = params.get('DataOfCmd')
+        cmd = params.get('Cmd')
+
+        if cmd == 'Release' and key != 'KEY_BT_VOICE':
+            return
+
+        if not self.press(key):
+            return
+
+        if key == 'KEY_BT_VOICE':
+            if cmd == 'Press':
+                self._reply(session, 'ms.voiceApp.standby', {})
+            elif cmd == 'Release':
+                self._reply(session, 'ms.voiceApp.hide', {})
+
+        elif key in ('KEY_POWER', 'KEY_POWEROFF'):
+            self.power = False
+            for server in self._servers:
+                server.close_sessions()
+
+    def _emit(self, session, params):
+        event = params.get('event')
+        data = params.get('data')
+
+        if event == 'ed.installedApp.get':
+            self._reply(session, event, dict(data=self.installed_apps))
+
+        elif event == 'ed.edenApp.get':
+            self._reply(session, event, dict(data=self.eden_apps))
+
+        elif event == 'ed.apps.icon':
+            icon_path = data.get('iconPath')
+            self._reply(
+                session,
+                event,
+                dict(
+                    iconPath=icon_path,
+                    imageBase64=base64.b64encode(
+                        self.icon(icon_path)
+                    ).decode('utf-8')
+                )
+            )
+
+        elif event == 'ed.apps.launch':
+            self.running_apps.add(data.get('appId'))
+            self._reply(session, event, 200)
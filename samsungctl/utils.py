@@ -1,16 +1,160 @@
+import json
 import logging
 import inspect
+import os
 import sys
+import threading
+from collections import OrderedDict
 from functools import update_wrapper
 
+from .pacing import monotonic
+
 PY3 = sys.version_info[0] > 2
 logger = logging.getLogger('samsungctl')
 
+# Setting the SAMSUNGCTL_STRIP_LOGGING environment variable before
+# samsungctl is imported makes LogIt and LogItWithReturn hand back the
+# undecorated functions. This also means the functions can not be timed.
+STRIP_LOGGING = os.environ.get(
+    'SAMSUNGCTL_STRIP_LOGGING',
+    ''
+).lower() in ('1', 'true', 'yes', 'on')
 
-def LogIt(func):
+# Setting the SAMSUNGCTL_TIMING environment variable turns on the timing of
+# the decorated functions from the start, see enable_timing.
+_timing_enabled = os.environ.get(
+    'SAMSUNGCTL_TIMING',
+    ''
+).lower() in ('1', 'true', 'yes', 'on')
+_timing_lock = threading.Lock()
+_timings = {}
+
+
+class FunctionTiming(object):
+    __slots__ = ('calls', 'total', 'max', 'errors')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def as_dict(self):
+        return dict(
+            calls=self.calls,
+            total=self.total,
+            max=self.max,
+            mean=self.total / self.calls if self.calls else 0.0,
+            errors=self.errors
+        )
+
+
+def enable_timing(enabled=True):
     """
-    Logs the function call, if debugging log level is set.
+    Turns the timing of the functions decorated with LogIt and
+    LogItWithReturn on or off.
+
+    For every function the number of calls, the total and the longest time
+    a call took and the number of calls that raised an exception are kept.
+    coroutine functions are not timed.
+    """
+    global _timing_enabled
+    _timing_enabled = enabled
+
+
+def reset_timing():
+    with _timing_lock:
+        _timings.clear()
+
+
+def timing_stats():
+    """
+    :return: OrderedDict of function name -> timing data, the function that
+        took the most time first.
+    """
+    with _timing_lock:
+        stats = list(
+            (name, timing.as_dict()) for name, timing in _timings.items()
+        )
+
+    stats.sort(key=lambda item: item[1]['total'], reverse=True)
+    return OrderedDict(stats)
+
+
+def dump_timing(fmt='table'):
     """
+    :param fmt: 'table' or 'json'
+    :return: the timing data as a string.
+    """
+    stats = timing_stats()
+
+    if fmt == 'json':
+        return json.dumps(stats, indent=4)
+    if fmt != 'table':
+        raise ValueError('unknown format: ' + repr(fmt))
+
+    width = max([len('function')] + list(len(name) for name in stats))
+    line = '{0:<' + str(width) + '} {1:>8} {2:>10} {3:>10} {4:>10} {5:>7}'
+
+    lines = [
+        line.format('function', 'calls', 'total', 'mean', 'max', 'errors')
+    ]
+    for name, timing in stats.items():
+        lines += [
+            line.format(
+                name,
+                timing['calls'],
+                '{0:.6f}'.format(timing['total']),
+                '{0:.6f}'.format(timing['mean']),
+                '{0:.6f}'.format(timing['max']),
+                timing['errors']
+            )
+        ]
+
+    return '\n'.join(lines)
+
+
+def _timed(name, func, args, kwargs):
+    error = False
+    start = monotonic()
+
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        error = True
+        raise
+    finally:
+        duration = monotonic() - start
+
+        with _timing_lock:
+            timing = _timings.get(name, None)
+            if timing is None:
+                timing = _timings[name] = FunctionTiming()
+
+            timing.calls += 1
+            timing.total += duration
+            if duration > timing.max:
+                timing.max = duration
+            if error:
+                timing.errors += 1
+
+
+def _call(_, func, args, kwargs):
+    return func(*args, **kwargs)
+
+
+def _func_name(func):
+    return func.__module__ + '.' + getattr(func, '__qualname__', func.__name__)
+
+
+def _is_coroutine_function(func):
+    if PY3:
+        return bool(func.__code__.co_flags & 0x80)
+
+    return False
+
+
+def _check_func(func):
     if PY3:
         if func.__code__.co_flags & 0x20:
             raise TypeError("Can't wrap generator function")
@@ -18,9 +162,40 @@ def LogIt(func):
         if func.func_code.co_flags & 0x20:
             raise TypeError("Can't wrap generator function")
 
+
+def _arg_names(func):
+    if PY3:
+        return inspect.getfullargspec(func)[0]
+    else:
+        return inspect.getargspec(func)[0]
+
+
+def LogIt(func):
+    """
+    Logs the function call, if debugging log level is set.
+    """
+    _check_func(func)
+
+    if STRIP_LOGGING:
+        return func
+
+    arg_names = _arg_names(func)
+    name = _func_name(func)
+    timed = not _is_coroutine_function(func)
+
     def wrapper(*args, **kwargs):
-        func_name, arg_string = func_arg_string(func, args, kwargs)
-        logging.debug(func_name + arg_string)
+        if logger.isEnabledFor(logging.DEBUG):
+            func_name, arg_string = func_arg_string(
+                func,
+                args,
+                kwargs,
+                arg_names
+            )
+            logger.debug(func_name + arg_string)
+
+        if _timing_enabled and timed:
+            return _timed(name, func, args, kwargs)
+
         return func(*args, **kwargs)
 
     return update_wrapper(wrapper, func)
@@ -30,30 +205,38 @@ def LogItWithReturn(func):
     """
     Logs the function call and return, if debugging log level is set.
     """
+    _check_func(func)
 
-    if PY3:
-        if func.__code__.co_flags & 0x20:
-            raise TypeError("Can't wrap generator function")
-    else:
-        if func.func_code.co_flags & 0x20:
-            raise TypeError("Can't wrap generator function")
+    if STRIP_LOGGING:
+        return func
+
+    arg_names = _arg_names(func)
+    name = _func_name(func)
+    timed = not _is_coroutine_function(func)
 
     def wrapper(*args, **kwargs):
-        func_name, arg_string = func_arg_string(func, args, kwargs)
-        logging.debug(func_name + arg_string)
-        result = func(*args, **kwargs)
-        logging.debug(func_name + " => " + repr(result))
+        if _timing_enabled and timed:
+            call = _timed
+        else:
+            call = _call
+
+        if not logger.isEnabledFor(logging.DEBUG):
+            return call(name, func, args, kwargs)
+
+        func_name, arg_string = func_arg_string(func, args, kwargs, arg_names)
+        logger.debug(func_name + arg_string)
+        result = call(name, func, args, kwargs)
+        logger.debug(func_name + " => " + repr(result))
         return result
 
     return update_wrapper(wrapper, func)
 
 
-def func_arg_string(func, args, kwargs):
+def func_arg_string(func, args, kwargs, arg_names=None):
     class_name = ""
-    if PY3:
-        arg_names = inspect.getfullargspec(func)[0]
-    else:
-        arg_names = inspect.getargspec(func)[0]
+    if arg_names is None:
+        arg_names = _arg_names(func)
+
     start = 0
     if arg_names:
         if arg_names[0] == "self":
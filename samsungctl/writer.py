@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from concurrent import futures
+
+from .command_queue import Command, CommandQueue
+from .pacing import KeyPacer
+
+logger = logging.getLogger('samsungctl')
+
+
+class Writer(object):
+    """
+    Sends the outgoing messages of a connection from a thread of its own.
+
+    Everything that is queued is handled by the writer thread in the order
+    command_queue.CommandQueue puts it in. If a delay is given with an item
+    the next item is not sent until that many seconds after this one went
+    out, the caller does not have to wait. Time spent sending counts towards
+    the delay. Every item gets a concurrent.futures.Future so the caller can
+    wait for it if it wants to.
+
+    Repeated keys that have been merged into a burst are sent burst_interval
+    seconds apart, the delay only applies after the last one. A
+    burst_interval of None spaces the keys of a burst by their delay.
+
+    The thread is started when something gets queued and stops after it
+    has been idle for idle_timeout seconds. Items that are queued from the
+    writer thread itself are run right away.
+    """
+
+    def __init__(
+        self,
+        write,
+        name='samsungctl writer',
+        idle_timeout=5.0,
+        burst_interval=0.1,
+        max_depth=100
+    ):
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.burst_interval = burst_interval
+
+        self._write = write
+        self._pacer = KeyPacer(0.0)
+        self._condition = threading.Condition()
+        self._queue = CommandQueue(max_depth)
+        self._thread = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def stats(self):
+        with self._condition:
+            return self._queue.stats
+
+    @property
+    def in_writer(self):
+        """True when called from the writer thread."""
+        return threading.current_thread() is self._thread
+
+    def write(self, payload, delay=0.0, key=None):
+        """
+        Queues a message.
+
+        :param payload: the serialized message.
+        :param delay: seconds that have to pass after the message has been
+            sent before the next one is sent.
+        :param key: the key the message is for, if it is a key press.
+        :return: concurrent.futures.Future that is resolved once the message
+            has been sent.
+        """
+        return self._put(self._write, (payload,), delay, key)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues a function call.
+
+        :param key: keyword only, the key the call is for, if any.
+        :return: concurrent.futures.Future for the return value of func.
+        """
+        return self._put(func, args, 0.0, kwargs.get('key', None))
+
+    def _put(self, func, args, delay, key):
+        future = futures.Future()
+        command = Command(future, func, args, delay, key)
+
+        if self.in_writer:
+            self._run_command(command)
+            return future
+
+        with self._condition:
+            dropped = self._queue.push(command)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=self.name
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+            self._condition.notify()
+
+        self._cancel(dropped)
+        return future
+
+    @staticmethod
+    def _cancel(commands):
+        for command in commands:
+            for future in command.futures:
+                future.cancel()
+
+    def clear(self):
+        """Cancels everything that has not been sent yet."""
+        with self._condition:
+            commands = self._queue.clear()
+
+        self._cancel(commands)
+
+    def _run_command(self, command):
+        pending = list(
+            future for future in command.futures
+            if future.set_running_or_notify_cancel()
+        )
+        if not pending:
+            return
+
+        if command.count > 1:
+            # a burst, one call for every press that was not cancelled
+            count = command.count - (len(command.futures) - len(pending))
+        else:
+            count = 1
+
+        for i in range(count):
+            if i == count - 1 or self.burst_interval is None:
+                self._pacer.wait(command.delay)
+            else:
+                self._pacer.wait(min(command.delay, self.burst_interval))
+
+            try:
+                result = command.func(*command.args)
+            except Exception as err:
+                for future in pending:
+                    future.set_exception(err)
+                break
+        else:
+            for future in pending:
+                future.set_result(result)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._condition.wait(self.idle_timeout)
+
+                command = self._queue.pop()
+                if command is None:
+                    self._thread = None
+                    return
+
+            try:
+                self._run_command(command)
+            except Exception:
+                logger.exception('error in websocket writer')
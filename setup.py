@@ -20,10 +20,22 @@ setuptools.setup(
     entry_points={
         "console_scripts": ["samsungctl=samsungctl.__main__:main"]
     },
-    packages=["samsungctl"],
-    install_requires=["websocket-client", "requests", 'pycryptodome'],
+    packages=[
+        "samsungctl",
+        "samsungctl.remote_encrypted",
+        "samsungctl.remote_encrypted.py3rijndael",
+        "samsungctl.testing"
+    ],
+    install_requires=[
+        "websocket-client",
+        "requests",
+        'pycryptodome',
+        'futures; python_version < "3"'
+    ],
     extras_require={
         "interactive_ui": ["curses"],
+        "async": ["websockets"],
+        "fast_json": ['orjson; python_version >= "3"', "ujson"],
     },
     classifiers=[
         "Development Status :: 4 - Beta",
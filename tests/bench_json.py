@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the json codecs on application list sized websocket messages.
+
+python tests/bench_json.py [number of runs]
+"""
+from __future__ import print_function
+import os
+import sys
+import timeit
+
+try:
+    import responses
+except ImportError:
+    from . import responses
+
+
+def payloads():
+    installed = responses.INSTALLED_APP_RESPONSE
+    eden = responses.EDEN_APP_RESPONSE
+
+    # a TV with a lot of applications installed
+    large = dict(installed)
+    large['data'] = dict(
+        installed['data'],
+        data=installed['data']['data'] * 10
+    )
+
+    return [
+        ('ed.installedApp.get', installed),
+        ('ed.edenApp.get', eden),
+        ('ed.installedApp.get x10', large)
+    ]
+
+
+def run(number=200):
+    from samsungctl import codec
+
+    codecs = []
+    for name in ('json', 'ujson', 'orjson'):
+        try:
+            codecs += [codec.get_codec(name)]
+        except ImportError:
+            print(name, 'is not installed')
+
+    print()
+    print(
+        '{0:<25} {1:<8} {2:>10} {3:>12} {4:>12}'.format(
+            'payload',
+            'codec',
+            'size',
+            'dumps (us)',
+            'loads (us)'
+        )
+    )
+
+    for payload_name, payload in payloads():
+        for c in codecs:
+            message = c.dumps(payload)
+
+            dumps_time = timeit.timeit(
+                lambda: c.dumps(payload),
+                number=number
+            )
+            loads_time = timeit.timeit(
+                lambda: c.loads(message),
+                number=number
+            )
+
+            print(
+                '{0:<25} {1:<8} {2:>10} {3:>12.1f} {4:>12.1f}'.format(
+                    payload_name,
+                    c.name,
+                    len(message),
+                    dumps_time / number * 1000000,
+                    loads_time / number * 1000000
+                )
+            )
+
+
+if __name__ == '__main__':
+    sys.path.insert(
+        0,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    )
+
+    if len(sys.argv) > 1:
+        run(int(sys.argv[1]))
+    else:
+        run()
@@ -13,12 +13,20 @@ import time
 import uuid
 import logging
 import socket
+import struct
+import shutil
+import tempfile
 
 try:
     import responses
 except ImportError:
     from . import responses
 
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 
 VERBOSE = 0
 
@@ -97,17 +105,20 @@ class FakeWebsocketClient(object):
         self.url = None
         self.sslopt = None
         self.enable_multithread = None
+        self.timeout = None
         self.handler = handler
         self.callback = None
         self.return_data = []
         self.on_connect = None
         self.on_message = None
         self.on_close = None
+        self.closed = False
         self.recv_event = threading.Event()
 
-    def __call__(self, url, sslopt, enable_multithread=False):
+    def __call__(self, url, sslopt, enable_multithread=False, timeout=None):
         self.url = url
         self.sslopt = sslopt
+        self.timeout = timeout
         if 'token' in url:
             token = url.split('token=')[-1]
         else:
@@ -127,16 +138,71 @@ class FakeWebsocketClient(object):
             self.return_data += [return_data]
             self.recv_event.set()
 
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
     def recv(self):
-        self.recv_event.wait()
-        self.recv_event.clear()
+        while not self.return_data and not self.closed:
+            self.recv_event.wait()
+            self.recv_event.clear()
+
+        if self.closed:
+            raise socket.error
+
         response = json.dumps(self.return_data.pop(0))
         return response
 
     def close(self):
+        self.closed = True
+        self.recv_event.set()
         self.on_close()
 
 
+class SelectableFakeWebsocketClient(FakeWebsocketClient):
+    """
+    FakeWebsocketClient that has a file descriptor which is readable while
+    there are messages waiting to be received.
+    """
+
+    def __init__(self, handler):
+        FakeWebsocketClient.__init__(self, handler)
+        self._reader, self._writer = socket.socketpair()
+
+    def __call__(self, url, sslopt, enable_multithread=False, timeout=None):
+        FakeWebsocketClient.__call__(
+            self,
+            url,
+            sslopt,
+            enable_multithread,
+            timeout
+        )
+        self._writer.send(b'\x00')
+        return self
+
+    def send(self, data):
+        count = len(self.return_data)
+        FakeWebsocketClient.send(self, data)
+
+        if len(self.return_data) > count:
+            self._writer.send(b'\x00')
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def recv(self):
+        if not self._reader.recv(1):
+            raise socket.error
+
+        return FakeWebsocketClient.recv(self)
+
+    def close(self):
+        if not self.closed:
+            self._writer.close()
+
+        FakeWebsocketClient.close(self)
+        self._reader.close()
+
+
 class WebSocketTest(unittest.TestCase):
     remote = None
     client = None
@@ -2316,6 +2382,1984 @@ class WebSocketSSLTest(unittest.TestCase):
         return payload
 
 
+class RemoteWebsocketTestCase(unittest.TestCase):
+    """
+    Base class for tests that need an open RemoteWebsocket connected to a
+    FakeWebsocketClient.
+    """
+
+    config = dict(
+        name="samsungctl",
+        description="PC",
+        id="",
+        method="websocket",
+        host='127.0.0.1',
+        port=8001,
+        timeout=0
+    )
+
+    def setUp(self):
+        self.client = FakeWebsocketClient(self)
+        self.client.on_connect = self.on_connect
+        self.client.on_close = lambda: None
+
+        self.remote_websocket = sys.modules['samsungctl.remote_websocket']
+        self._create_connection = (
+            self.remote_websocket.websocket.create_connection
+        )
+        self.remote_websocket.websocket.create_connection = self.client
+
+        self.remote = self.remote_websocket.RemoteWebsocket(
+            samsungctl.Config(**self.config)
+        )
+        self.remote.open()
+
+    def tearDown(self):
+        self.remote.close()
+        self.remote_websocket.websocket.create_connection = (
+            self._create_connection
+        )
+
+    def on_connect(self, _):
+        payload = dict(
+            data=dict(clients=[], id=str(uuid.uuid4())),
+            event='ms.channel.connect'
+        )
+        return payload
+
+
+class PipelinedWebSocketTest(RemoteWebsocketTestCase):
+    config = dict(RemoteWebsocketTestCase.config, key_interval=0.01)
+
+    def test_001_PIPELINED_CONTROL(self):
+        keys = list('KEY_' + str(i) for i in range(10)) * 2
+        messages = []
+        self.client.on_message = messages.append
+
+        self.remote.pipelined = True
+        start = time.time()
+        for key in keys:
+            self.remote.control(key)
+        duration = time.time() - start
+
+        self.assertEqual(
+            keys,
+            list(message['params']['DataOfCmd'] for message in messages)
+        )
+        self.assertTrue(duration >= 0.01 * (len(keys) - 1))
+        self.assertTrue(duration < 0.35 * len(keys) / 2)
+
+    def test_002_PACER(self):
+        pacer = samsungctl.pacing.KeyPacer(0.05)
+        times = list(pacer.wait() for _ in range(5))
+
+        for first, second in zip(times, times[1:]):
+            self.assertAlmostEqual(0.05, second - first, places=5)
+
+    def test_003_PACER_INTERVAL(self):
+        pacer = samsungctl.pacing.KeyPacer(0.05)
+        first = pacer.reserve(0.2)
+        self.assertAlmostEqual(0.2, pacer.reserve() - first, places=5)
+        self.assertTrue(pacer.delay() > 0.2)
+
+    def test_004_WRITER_DEADLINES(self):
+        sent = []
+
+        def write(payload):
+            # slow I/O counts towards the delay
+            time.sleep(0.1)
+            sent.append(samsungctl.pacing.monotonic())
+
+        writer = samsungctl.writer.Writer(write)
+        pending = list(writer.write('KEY_' + str(i), 0.15) for i in range(3))
+        samsungctl.remote_websocket.futures.wait(pending, 2.0)
+
+        for first, second in zip(sent, sent[1:]):
+            self.assertTrue(0.14 <= second - first < 0.24)
+
+
+class ControlPayloadWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_CACHED_PAYLOAD(self):
+        control_payload = self.remote_websocket.control_payload
+
+        payload = control_payload('KEY_MENU', 'Press')
+        self.assertTrue(payload is control_payload('KEY_MENU', 'Press'))
+        self.assertEqual(
+            dict(
+                method='ms.remote.control',
+                params=dict(
+                    Cmd='Press',
+                    DataOfCmd='KEY_MENU',
+                    Option='false',
+                    TypeOfRemote='SendRemoteKey'
+                )
+            ),
+            json.loads(payload)
+        )
+
+        # unknown keys still work but are not kept
+        control_payload('KEY_NOT_A_KEY')
+        self.assertFalse(
+            ('KEY_NOT_A_KEY', 'Click') in
+            self.remote_websocket._control_payloads
+        )
+
+    def test_002_CONTROL(self):
+        messages = []
+        self.client.on_message = messages.append
+
+        self.remote.control('KEY_MENU')
+        self.assertEqual(
+            [json.loads(self.remote_websocket.control_payload('KEY_MENU'))],
+            messages
+        )
+
+
+class CodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = samsungctl.codec.current_codec()
+
+    def tearDown(self):
+        samsungctl.codec.set_codec(self.codec)
+
+    def test_001_ROUND_TRIP(self):
+        for name in ('json', 'ujson', 'orjson'):
+            try:
+                samsungctl.codec.set_codec(name)
+            except ImportError:
+                continue
+
+            message = samsungctl.codec.dumps(responses.EDEN_APP_RESPONSE)
+            self.assertTrue(isinstance(message, str))
+            self.assertEqual(
+                responses.EDEN_APP_RESPONSE,
+                samsungctl.codec.loads(message)
+            )
+            self.assertEqual(
+                responses.EDEN_APP_RESPONSE,
+                json.loads(message)
+            )
+
+    def test_002_UNKNOWN(self):
+        self.assertRaises(ValueError, samsungctl.codec.set_codec, 'yaml')
+        self.assertTrue(samsungctl.codec.current_codec() is self.codec)
+
+
+class WriterWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_NON_BLOCKING_CONTROL(self):
+        messages = []
+        self.client.on_message = messages.append
+
+        keys = ['KEY_UP', 'KEY_DOWN', 'KEY_ENTER']
+        start = time.time()
+        pending = list(self.remote.control(key, wait=False) for key in keys)
+        self.assertTrue(time.time() - start < 0.1)
+
+        samsungctl.remote_websocket.futures.wait(pending, 3.0)
+        self.assertTrue(all(future.done() for future in pending))
+        self.assertEqual(
+            keys,
+            list(message['params']['DataOfCmd'] for message in messages)
+        )
+
+    def test_002_CLOSED(self):
+        writer = samsungctl.writer.Writer(self.client.send)
+        future = writer.write('{"method": "test"}')
+        self.assertEqual(None, future.result(1.0))
+
+        def write(_):
+            raise samsungctl.exceptions.ConnectionClosed()
+
+        writer = samsungctl.writer.Writer(write)
+        future = writer.write('{"method": "test"}')
+        self.assertRaises(
+            samsungctl.exceptions.ConnectionClosed,
+            future.result,
+            1.0
+        )
+
+
+class CommandQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.writer = samsungctl.writer.Writer(
+            self.sent.append,
+            burst_interval=0.0
+        )
+        # keeps the writer busy while the test queues up commands
+        self.blocker = threading.Event()
+        self.writer.submit(self.blocker.wait, 5.0)
+
+        while len(self.writer):
+            time.sleep(0.001)
+
+    def tearDown(self):
+        self.blocker.set()
+
+    def write(self, key):
+        return self.writer.write(key, key=key)
+
+    def test_001_PRIORITY(self):
+        pending = list(self.write(key) for key in ('KEY_MENU', 'KEY_ENTER'))
+        pending += [self.write('KEY_POWEROFF')]
+
+        self.blocker.set()
+        samsungctl.remote_websocket.futures.wait(pending, 2.0)
+        self.assertEqual(['KEY_POWEROFF', 'KEY_MENU', 'KEY_ENTER'], self.sent)
+
+    def test_002_COALESCE(self):
+        pending = list(self.write('KEY_VOLUP') for _ in range(20))
+        pending += [self.write('KEY_HOME') for _ in range(3)]
+        pending += [self.write('KEY_VOLUP')]
+
+        self.assertEqual(3, len(self.writer))
+        self.assertEqual(21, self.writer.stats['coalesced'])
+
+        self.blocker.set()
+        samsungctl.remote_websocket.futures.wait(pending, 2.0)
+        self.assertTrue(all(future.done() for future in pending))
+        self.assertEqual(
+            ['KEY_VOLUP'] * 20 + ['KEY_HOME'] + ['KEY_VOLUP'],
+            self.sent
+        )
+
+    def test_003_IDEMPOTENT_IN_ORDER(self):
+        keys = ['KEY_HOME', 'KEY_RIGHT', 'KEY_ENTER', 'KEY_HOME', 'KEY_HOME']
+        pending = list(self.write(key) for key in keys)
+
+        # only the HOME right after HOME is merged
+        self.assertEqual(4, len(self.writer))
+
+        self.blocker.set()
+        samsungctl.remote_websocket.futures.wait(pending, 2.0)
+        self.assertTrue(all(future.done() for future in pending))
+        self.assertEqual(
+            ['KEY_HOME', 'KEY_RIGHT', 'KEY_ENTER', 'KEY_HOME'],
+            self.sent
+        )
+
+    def test_004_MAX_DEPTH(self):
+        self.writer._queue.max_depth = 5
+        pending = list(self.write('KEY_' + str(i)) for i in range(8))
+
+        self.assertEqual(5, len(self.writer))
+        self.assertEqual(3, self.writer.stats['dropped'])
+        self.assertTrue(all(future.cancelled() for future in pending[:3]))
+
+        self.blocker.set()
+        samsungctl.remote_websocket.futures.wait(pending[3:], 2.0)
+        self.assertEqual(
+            list('KEY_' + str(i) for i in range(3, 8)),
+            self.sent
+        )
+
+
+class BurstWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_DEFAULT_INTERVAL(self):
+        sent = []
+        self.client.on_message = lambda _: sent.append(time.time())
+
+        blocker = threading.Event()
+        self.remote._writer.submit(blocker.wait, 5.0)
+        pending = list(
+            self.remote.control('KEY_VOLUP', wait=False) for _ in range(3)
+        )
+        self.assertEqual(2, self.remote.queue_stats['coalesced'])
+
+        blocker.set()
+        samsungctl.remote_websocket.futures.wait(pending, 3.0)
+        self.assertEqual(3, len(sent))
+
+        for previous, current in zip(sent, sent[1:]):
+            self.assertTrue(current - previous >= 0.3)
+
+
+class ControlAsyncTest(RemoteWebsocketTestCase):
+
+    class BlockingRemote(object):
+        def __init__(self):
+            self.keys = []
+
+        def control(self, key):
+            time.sleep(0.05)
+            if key == 'KEY_FAIL':
+                raise samsungctl.exceptions.ConnectionClosed()
+
+            self.keys.append(key)
+            return key != 'KEY_FALSE'
+
+        def close(self):
+            pass
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.tv = samsungctl.Remote(samsungctl.Config(**self.config))
+        self.tv.remote = self.remote
+
+    def test_001_WEBSOCKET(self):
+        messages = []
+        self.client.on_message = messages.append
+
+        start = time.time()
+        future = self.tv.control_async('KEY_MENU')
+        self.assertTrue(time.time() - start < 0.1)
+
+        result = future.result(2.0)
+        self.assertEqual('KEY_MENU', result.key)
+        self.assertEqual('websocket', result.transport)
+        self.assertEqual(None, result.error)
+        self.assertTrue(result.sent_at >= start)
+        self.assertEqual('KEY_MENU', messages[0]['params']['DataOfCmd'])
+
+    def test_002_BLOCKING_TRANSPORT(self):
+        blocking_remote = self.BlockingRemote()
+        self.tv.remote = blocking_remote
+
+        start = time.time()
+        pending = list(
+            self.tv.control_async(key)
+            for key in ('KEY_1', 'KEY_FAIL', 'KEY_FALSE', 'KEY_2')
+        )
+        self.assertTrue(time.time() - start < 0.1)
+
+        results = list(future.result(2.0) for future in pending)
+        self.assertEqual(None, results[0].error)
+        self.assertTrue(
+            isinstance(
+                results[1].error,
+                samsungctl.exceptions.ConnectionClosed
+            )
+        )
+        self.assertEqual(None, results[1].sent_at)
+        self.assertTrue(
+            isinstance(
+                results[2].error,
+                samsungctl.exceptions.ConnectionClosed
+            )
+        )
+        self.assertEqual(['KEY_1', 'KEY_FALSE', 'KEY_2'], blocking_remote.keys)
+        self.tv.close()
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_001_BURST_THEN_RATE(self):
+        bucket = samsungctl.pacing.TokenBucket(20, 3)
+        start = samsungctl.pacing.monotonic()
+
+        for _ in range(6):
+            bucket.acquire()
+
+        duration = samsungctl.pacing.monotonic() - start
+        self.assertTrue(0.14 <= duration < 0.3)
+
+        stats = bucket.stats
+        self.assertEqual(6, stats['acquired'])
+        self.assertEqual(3, stats['throttled'])
+
+    def test_002_SHARED_PER_HOST(self):
+        first = samsungctl.pacing.host_bucket('10.0.0.1', 5)
+        second = samsungctl.pacing.host_bucket('10.0.0.1', 10, 2)
+
+        self.assertTrue(first is second)
+        self.assertEqual(10, first.rate)
+        self.assertEqual(2, first.burst)
+        self.assertFalse(
+            first is samsungctl.pacing.host_bucket('10.0.0.2', 10)
+        )
+
+
+class CalibrateWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.tv = samsungctl.Remote(samsungctl.Config(**self.config))
+        self.tv.remote = self.remote
+
+    def test_001_CALIBRATE(self):
+        last = [0.0]
+
+        # a TV that ignores anything that arrives within 30ms of the
+        # previous message
+        def on_message(message):
+            now = samsungctl.pacing.monotonic()
+            gap = now - last[0]
+            last[0] = now
+
+            if gap < 0.03:
+                return None
+
+            if message['params']['Cmd'] == 'Press':
+                return dict(event='ms.voiceApp.standby')
+
+            return dict(event='ms.voiceApp.hide')
+
+        self.client.on_message = on_message
+
+        interval = samsungctl.calibrate.calibrate(
+            self.tv,
+            intervals=(0.08, 0.04, 0.01),
+            length=4,
+            rounds=1
+        )
+        self.assertEqual(0.04, interval)
+        self.assertEqual(0.04, self.tv.config.key_interval)
+
+    def test_003_ENCRYPTED(self):
+        messages = []
+        self.client.on_message = messages.append
+        self.tv.config.method = 'encrypted'
+
+        self.assertRaises(
+            samsungctl.exceptions.CalibrationNotSupported,
+            samsungctl.calibrate.calibrate,
+            self.tv
+        )
+        self.assertEqual(None, self.tv.config.key_interval)
+        self.assertEqual([], messages)
+
+    def test_002_CONFIG_FILE(self):
+        path = os.path.join(tempfile.mkdtemp(), 'tv.config')
+        try:
+            config = samsungctl.Config(**self.config)
+            config.key_interval = 0.15
+            config.save(path)
+
+            loaded = samsungctl.Config.load(path)
+            self.assertEqual(0.15, loaded.key_interval)
+            self.assertEqual(config.host, loaded.host)
+            self.assertEqual(path, loaded.path)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+
+
+class ControlManyWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.tv = samsungctl.Remote(samsungctl.Config(**self.config))
+        self.tv.remote = self.remote
+
+    def test_001_UNKNOWN_KEY(self):
+        messages = []
+        self.client.on_message = messages.append
+
+        self.assertRaises(
+            samsungctl.exceptions.UnknownKey,
+            self.tv.control_many,
+            ['KEY_MENU', 'KEY_NOPE']
+        )
+        time.sleep(0.1)
+        self.assertEqual([], messages)
+
+    def test_002_TIMINGS(self):
+        messages = []
+        self.client.on_message = messages.append
+
+        keys = ['KEY_1', 'KEY_2', 'KEY_3', 'KEY_MENU']
+        timings = self.tv.control_many(keys, interval=0.05)
+
+        self.assertEqual(keys, list(timing.key for timing in timings))
+        self.assertEqual(
+            keys,
+            list(message['params']['DataOfCmd'] for message in messages)
+        )
+
+        for previous, timing in zip(timings, timings[1:]):
+            self.assertEqual(None, timing.error)
+            self.assertTrue(timing.offset - previous.offset >= 0.045)
+
+    def test_003_KEY_RATE(self):
+        config = dict(self.config, host='127.0.0.2', key_rate=20)
+        tv = samsungctl.Remote(samsungctl.Config(**config))
+        tv.remote = self.remote
+
+        keys = ['KEY_1', 'KEY_2', 'KEY_3', 'KEY_4']
+        timings = tv.control_many(keys, interval=0.0)
+
+        self.assertEqual(keys, list(timing.key for timing in timings))
+        self.assertTrue(timings[-1].offset >= 0.14)
+        self.assertEqual(3, tv.throttle_stats['throttled'])
+
+    def test_004_STOPS_ON_ERROR(self):
+        def on_message(message):
+            if message['params']['DataOfCmd'] == 'KEY_2':
+                raise RuntimeError('send failed')
+
+        self.client.on_message = on_message
+
+        timings = self.remote.control_many(
+            ['KEY_1', 'KEY_2', 'KEY_3'],
+            interval=0.01
+        )
+        self.assertEqual(['KEY_1', 'KEY_2'], list(t.key for t in timings))
+        self.assertTrue(isinstance(timings[1].error, RuntimeError))
+
+
+class LogItTest(unittest.TestCase):
+
+    class Counter(object):
+        def __init__(self):
+            self.count = 0
+
+        def __repr__(self):
+            self.count += 1
+            return 'Counter'
+
+    def setUp(self):
+        self.logger = logging.getLogger('samsungctl')
+        self.level = self.logger.level
+
+    def tearDown(self):
+        self.logger.setLevel(self.level)
+
+    def test_001_NO_FORMATTING(self):
+        if samsungctl.utils.STRIP_LOGGING:
+            self.skipTest('logging wrappers are stripped')
+
+        @samsungctl.utils.LogItWithReturn
+        def func(value):
+            return value
+
+        counter = self.Counter()
+        self.logger.setLevel(logging.ERROR)
+        self.assertTrue(func(counter) is counter)
+        self.assertEqual(0, counter.count)
+
+        self.logger.setLevel(logging.DEBUG)
+        func(counter)
+        self.assertEqual(2, counter.count)
+
+    def test_002_STRIP(self):
+        def func():
+            pass
+
+        strip_logging = samsungctl.utils.STRIP_LOGGING
+        samsungctl.utils.STRIP_LOGGING = True
+        try:
+            self.assertTrue(samsungctl.utils.LogIt(func) is func)
+            self.assertTrue(samsungctl.utils.LogItWithReturn(func) is func)
+        finally:
+            samsungctl.utils.STRIP_LOGGING = strip_logging
+
+
+class TimingTest(unittest.TestCase):
+
+    def setUp(self):
+        if samsungctl.utils.STRIP_LOGGING:
+            self.skipTest('logging wrappers are stripped')
+
+        samsungctl.utils.reset_timing()
+        samsungctl.utils.enable_timing()
+
+    def tearDown(self):
+        samsungctl.utils.enable_timing(False)
+        samsungctl.utils.reset_timing()
+
+    def test_001_TIMING(self):
+        @samsungctl.utils.LogIt
+        def func(fail=False):
+            time.sleep(0.01)
+            if fail:
+                raise ValueError
+
+        func()
+        self.assertRaises(ValueError, func, True)
+
+        samsungctl.utils.enable_timing(False)
+        func()
+
+        name = func.__module__ + '.' + getattr(
+            func,
+            '__qualname__',
+            func.__name__
+        )
+        timing = samsungctl.utils.timing_stats()[name]
+        self.assertEqual(2, timing['calls'])
+        self.assertEqual(1, timing['errors'])
+        self.assertTrue(timing['max'] >= 0.01)
+        self.assertTrue(timing['total'] >= 0.02)
+
+        self.assertEqual(
+            timing,
+            json.loads(samsungctl.utils.dump_timing('json'))[name]
+        )
+        self.assertTrue(name in samsungctl.utils.dump_timing())
+
+
+class CallbackRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = samsungctl.callbacks.CallbackRegistry()
+        self.called = []
+
+    def callback(self, name):
+        def wrapper(response):
+            self.called.append(name)
+
+        return wrapper
+
+    def test_001_DISPATCH(self):
+        connect = self.callback('connect')
+        wildcard = self.callback('wildcard')
+        icon = self.callback('icon')
+
+        self.registry.register(connect, 'event', 'ms.channel.connect')
+        self.registry.register(wildcard, 'event', None)
+        self.registry.register(icon, 'event', 'ed.apps.icon')
+        self.assertEqual(3, len(self.registry))
+
+        count = self.registry.dispatch(dict(event='ms.channel.connect'))
+        self.assertEqual(2, count)
+        self.assertEqual(['connect', 'wildcard'], self.called)
+
+        # callbacks are one shot
+        self.assertEqual(0, self.registry.dispatch(dict(event='x')))
+        self.assertEqual(1, len(self.registry))
+
+    def test_002_UNREGISTER(self):
+        callback = self.callback('icon')
+        self.registry.register(callback, 'event', 'ed.apps.icon')
+        self.assertTrue(
+            (callback, 'event', 'ed.apps.icon') in self.registry
+        )
+
+        self.assertFalse(
+            self.registry.unregister(callback, 'data', None)
+        )
+        self.assertTrue(
+            self.registry.unregister(callback, 'event', 'ed.apps.icon')
+        )
+        self.assertEqual(0, len(self.registry))
+        self.registry.dispatch(dict(event='ed.apps.icon'))
+        self.assertEqual([], self.called)
+
+    def test_003_MANY_WAITERS(self):
+        for i in range(5000):
+            self.registry.register(
+                self.callback(i),
+                'event',
+                'event_' + str(i)
+            )
+
+        self.registry.dispatch(dict(event='event_4321', data=dict(a=1)))
+        self.assertEqual([4321], self.called)
+        self.assertEqual(4999, len(self.registry))
+
+    def test_004_EXPIRY(self):
+        timed_out = []
+        self.registry.register(
+            self.callback('icon'),
+            'event',
+            'ed.apps.icon',
+            timeout=0.01,
+            on_timeout=lambda: timed_out.append('icon')
+        )
+        self.registry.register(self.callback('connect'), 'event', None)
+        self.assertEqual(2, len(self.registry))
+
+        # reaped by the reaper thread without any other activity
+        time.sleep(0.1)
+        self.assertEqual(0, self.registry.reap())
+        self.assertEqual(['icon'], timed_out)
+        self.assertEqual(1, len(self.registry))
+        self.assertEqual(1, self.registry.stats['expired'])
+
+        self.registry.dispatch(dict(event='ed.apps.icon'))
+        self.assertEqual(['connect'], self.called)
+
+    def test_005_BOUNDED(self):
+        self.registry.max_pending = 10
+
+        for i in range(100):
+            self.registry.register(self.callback(i), 'event', str(i))
+
+        self.assertEqual(10, len(self.registry))
+        self.assertEqual(90, self.registry.stats['evicted'])
+
+        self.registry.dispatch(dict(event='95'))
+        self.assertEqual([95], self.called)
+
+
+class PrefilterWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.decoded = []
+        self._loads = samsungctl.codec.loads
+
+        def loads(message):
+            self.decoded.append(message)
+            return self._loads(message)
+
+        samsungctl.codec.loads = loads
+
+    def tearDown(self):
+        samsungctl.codec.loads = self._loads
+        RemoteWebsocketTestCase.tearDown(self)
+
+    def test_001_EVENT_NAMES(self):
+        event_names = samsungctl.codec.event_names
+        self.assertEqual(
+            ['ms.channel.connect', 'ed.apps.icon'],
+            event_names(
+                '{"event": "ms.channel.connect", '
+                '"data": {"event":"ed.apps.icon"}}'
+            )
+        )
+        self.assertEqual([], event_names('{"data": 1}'))
+        self.assertEqual(None, event_names('{"event": null}'))
+
+    def test_002_SKIP_UNWANTED(self):
+        message = json.dumps(dict(event='ms.channel.clientConnect'))
+        self.remote.on_message(message)
+        self.assertEqual([], self.decoded)
+
+        responses = []
+        self.remote.register_receive_callback(
+            responses.append,
+            'event',
+            'ms.channel.clientConnect'
+        )
+        self.remote.on_message(message)
+        self.assertEqual([message], self.decoded)
+        self.assertEqual(1, len(responses))
+
+    def test_003_OTHER_KEYS(self):
+        responses = []
+        self.remote.register_receive_callback(responses.append, 'id', 1)
+        self.remote.on_message(json.dumps(dict(event='x', id=1)))
+        self.assertEqual(1, len(responses))
+
+    def test_004_TRACKED_EVENTS(self):
+        self.remote.tracked_events.add('ms.channel.clientConnect')
+        self.remote.on_message(
+            json.dumps(dict(event='ms.channel.clientConnect', data=1))
+        )
+        self.assertEqual(
+            dict(event='ms.channel.clientConnect', data=1),
+            self.remote.event_states['ms.channel.clientConnect']
+        )
+
+
+@unittest.skipIf(
+    sys.version_info[:2] < (3, 4),
+    'the reactor requires Python 3.4+'
+)
+class ReactorWebSocketTest(unittest.TestCase):
+
+    def setUp(self):
+        import samsungctl.reactor
+
+        self.reactor = samsungctl.reactor.Reactor()
+        self.remote_websocket = sys.modules['samsungctl.remote_websocket']
+        self.clients = []
+
+        def create_connection(
+            url,
+            sslopt,
+            enable_multithread=False,
+            timeout=None
+        ):
+            client = SelectableFakeWebsocketClient(self)
+            client.on_connect = lambda _: dict(
+                data=dict(clients=[], id=str(uuid.uuid4())),
+                event='ms.channel.connect'
+            )
+            client.on_message = lambda message: dict(
+                event=message['params']['event'],
+                data=dict(client=len(self.clients))
+            )
+            client.on_close = lambda: None
+            self.clients.append(client)
+            return client(url, sslopt, enable_multithread, timeout)
+
+        self._create_connection = (
+            self.remote_websocket.websocket.create_connection
+        )
+        self.remote_websocket.websocket.create_connection = create_connection
+
+    def tearDown(self):
+        self.remote_websocket.websocket.create_connection = (
+            self._create_connection
+        )
+
+    def test_001_SHARED_THREAD(self):
+        threads = threading.active_count()
+        remotes = []
+
+        for i in range(5):
+            remote = self.remote_websocket.RemoteWebsocket(
+                samsungctl.Config(
+                    name="samsungctl",
+                    method="websocket",
+                    host='127.0.0.1',
+                    port=8001
+                )
+            )
+            remote.reactor = self.reactor
+            remote.open()
+            remotes.append(remote)
+
+        self.assertEqual(5, len(self.reactor))
+        self.assertTrue(threading.active_count() - threads <= 2)
+
+        pending = list(
+            remote.request('ms.channel.emit', 'test', event='test')
+            for remote in remotes
+        )
+        samsungctl.remote_websocket.futures.wait(pending, 2.0)
+        self.assertTrue(all(future.done() for future in pending))
+        self.assertEqual('test', pending[0].result()['event'])
+
+        for remote in remotes:
+            remote.close()
+
+        start = time.time()
+        while len(self.reactor) and time.time() - start < 2.0:
+            time.sleep(0.01)
+
+        self.assertEqual(0, len(self.reactor))
+        self.assertTrue(all(remote.sock is None for remote in remotes))
+
+
+class CallbackExpiryWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_APPLICATIONS_TIMEOUT(self):
+        self.client.on_message = lambda _: None
+        self.assertEqual([], self.remote.applications)
+        self.assertEqual(0, self.remote.pending_callbacks)
+
+
+class RequestWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_REQUEST(self):
+        def on_message(message):
+            self.assertEqual('ms.channel.emit', message['method'])
+            return dict(
+                event='ed.apps.icon',
+                data=dict(
+                    iconPath=message['params']['data']['iconPath'],
+                    imageBase64=base64.b64encode(b'PNG').decode('utf-8')
+                )
+            )
+
+        self.client.on_message = on_message
+        future = self.remote.request(
+            'ms.channel.emit',
+            'ed.apps.icon',
+            event='ed.apps.icon',
+            to='host',
+            data=dict(iconPath='/icon.png')
+        )
+        response = future.result(1.0)
+        self.assertEqual('/icon.png', response['data']['iconPath'])
+
+        app = samsungctl.application.Application(
+            self.remote,
+            'Test',
+            icon='/icon.png'
+        )
+        self.assertEqual(b'PNG', app.icon)
+        self.assertEqual(0, self.remote.pending_callbacks)
+
+    def test_002_REQUEST_TIMEOUT(self):
+        self.client.on_message = lambda _: None
+
+        start = time.time()
+        future = self.remote.request(
+            'ms.channel.emit',
+            'ed.apps.icon',
+            timeout=0.1
+        )
+        self.assertRaises(
+            samsungctl.exceptions.ResponseTimeout,
+            future.result,
+            1.0
+        )
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual(0, self.remote.pending_callbacks)
+
+    def test_003_CONCURRENT_REQUESTS(self):
+        self.client.on_message = lambda _: None
+
+        start = time.time()
+        pending = list(
+            self.remote.request('ms.channel.emit', str(i), timeout=0.2)
+            for i in range(10)
+        )
+        samsungctl.remote_websocket.futures.wait(pending)
+        self.assertTrue(time.time() - start < 1.0)
+
+
+class ApplicationStatusTest(unittest.TestCase):
+
+    class FakeResponse(object):
+        def __init__(self, data):
+            self.data = data
+
+        def json(self):
+            if self.data is None:
+                raise ValueError
+            return self.data
+
+    class FakeRemote(object):
+        def __init__(self):
+            self.config = samsungctl.Config(host='127.0.0.1')
+
+    def setUp(self):
+        self.urls = []
+        self.data = dict(version='1.0', visible=True, running=False)
+        self._get = samsungctl.http_session.get
+
+        def get(host, url):
+            self.urls.append(url)
+            return self.FakeResponse(self.data)
+
+        samsungctl.http_session.get = get
+        self.app = samsungctl.application.Application(
+            self.FakeRemote(),
+            name='Netflix',
+            appId='11101200001'
+        )
+
+    def tearDown(self):
+        samsungctl.http_session.get = self._get
+
+    def test_001_SINGLE_REQUEST(self):
+        self.assertEqual('1.0', self.app.version)
+        self.assertEqual(True, self.app.is_visible)
+        self.assertEqual(False, self.app.is_running)
+        self.assertEqual(
+            ['http://127.0.0.1:8001/api/v2/applications/11101200001'],
+            self.urls
+        )
+
+    def test_002_MAX_AGE(self):
+        self.app.status()
+        self.data = dict(running=True)
+        self.assertEqual(False, self.app.is_running)
+        self.assertEqual(True, self.app.status(max_age=0)['running'])
+        self.assertEqual(2, len(self.urls))
+
+    def test_003_BAD_RESPONSE(self):
+        self.data = None
+        self.assertEqual('Unknown', self.app.version)
+        self.assertEqual(None, self.app.is_running)
+
+    def test_004_SESSION(self):
+        session = samsungctl.http_session.get_session('127.0.0.1')
+        self.assertTrue(
+            session is samsungctl.http_session.get_session('127.0.0.1')
+        )
+        samsungctl.http_session.close('127.0.0.1')
+        self.assertFalse(
+            session is samsungctl.http_session.get_session('127.0.0.1')
+        )
+        samsungctl.http_session.close()
+
+
+class AppStatusesWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self._get = samsungctl.http_session.get
+
+        def get(host, url):
+            time.sleep(0.2)
+            return ApplicationStatusTest.FakeResponse(
+                dict(id=url.split('/')[-1], running=True)
+            )
+
+        samsungctl.http_session.get = get
+
+    def tearDown(self):
+        samsungctl.http_session.get = self._get
+        RemoteWebsocketTestCase.tearDown(self)
+
+    def test_001_CONCURRENT(self):
+        apps = list(
+            samsungctl.application.Application(
+                self.remote,
+                name=str(i),
+                appId=str(i)
+            )
+            for i in range(16)
+        )
+
+        start = time.time()
+        statuses = self.remote.app_statuses(apps, concurrency=16)
+        self.assertTrue(time.time() - start < 1.0)
+
+        self.assertEqual(sorted(app.app_id for app in apps), sorted(statuses))
+        for app_id, status in statuses.items():
+            self.assertEqual(dict(id=app_id, running=True), status)
+
+        # the statuses are cached on the applications
+        start = time.time()
+        self.remote.app_statuses(apps)
+        self.assertTrue(time.time() - start < 0.2)
+
+
+class ApplicationCatalogWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.emits = []
+
+        def on_message(message):
+            event = message['params']['event']
+            self.emits.append(event)
+
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+            elif event == 'ed.installedApp.get':
+                return responses.INSTALLED_APP_RESPONSE
+
+        self.client.on_message = on_message
+
+    def test_001_CACHED_LOOKUP(self):
+        app = self.remote.get_application('Netflix')
+        self.assertEqual('11101200001', app.app_id)
+        self.assertEqual(2, len(self.emits))
+
+        self.assertTrue(app is self.remote.get_application('11101200001'))
+        self.assertTrue(app is self.remote.catalog.get_by_name('Netflix'))
+        self.remote.applications
+        self.assertEqual(2, len(self.emits))
+
+    def test_002_REFRESH(self):
+        app = self.remote.get_application('Netflix')
+        self.remote.catalog.refresh()
+        self.assertEqual(4, len(self.emits))
+        self.assertTrue(app is self.remote.get_application('Netflix'))
+
+        self.remote.catalog.ttl = 0
+        time.sleep(0.01)
+        self.remote.applications
+        self.assertEqual(6, len(self.emits))
+
+    def test_003_MERGE(self):
+        app_ids = set(
+            app['appId'] for app in
+            responses.EDEN_APP_RESPONSE['data']['data'] +
+            responses.INSTALLED_APP_RESPONSE['data']['data']
+        )
+
+        applications = self.remote.applications
+        self.assertEqual(
+            sorted(app_ids),
+            sorted(app.app_id for app in applications)
+        )
+
+    def test_004_PARTIAL(self):
+        def on_message(message):
+            event = message['params']['event']
+            self.emits.append(event)
+            # the installed list never arrives
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+
+        self.client.on_message = on_message
+
+        self.assertEqual(
+            sorted(
+                app['appId']
+                for app in responses.EDEN_APP_RESPONSE['data']['data']
+            ),
+            sorted(app.app_id for app in self.remote.applications)
+        )
+        self.assertTrue(self.remote.catalog.is_stale)
+
+        # the partial list is not cached, both lists are asked for again
+        self.remote.applications
+        self.assertEqual(4, len(self.emits))
+
+    def test_005_DUPLICATES(self):
+        installed = responses.INSTALLED_APP_RESPONSE['data']['data']
+        duplicate = dict(installed[0], name='Duplicate')
+        installed_response = dict(
+            event='ed.installedApp.get',
+            data=dict(data=installed + [duplicate])
+        )
+
+        def on_message(message):
+            event = message['params']['event']
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+            elif event == 'ed.installedApp.get':
+                return installed_response
+
+        self.client.on_message = on_message
+
+        expected = samsungctl.application.merge_app_data(
+            responses.EDEN_APP_RESPONSE['data']['data'],
+            installed + [duplicate]
+        )
+        applications = self.remote.applications
+        self.assertEqual(
+            list(data['name'] for data in expected),
+            list(app.name for app in applications)
+        )
+        first = next(
+            app for app in applications
+            if app.app_id == installed[0]['appId']
+        )
+        self.assertTrue(
+            first is self.remote.catalog.get_by_id(installed[0]['appId'])
+        )
+        self.assertEqual(
+            'Duplicate',
+            self.remote.get_application('Duplicate').name
+        )
+
+        self.remote.catalog.invalidate()
+        streamed = list(self.remote.iter_applications())
+        self.assertEqual(
+            sorted(data['name'] for data in expected),
+            sorted(app.name for app in streamed)
+        )
+
+    def test_006_MISS(self):
+        self.assertEqual(None, self.remote.get_application('Nope'))
+        self.assertEqual(2, len(self.emits))
+
+        # the first miss on the cached list refreshes it, the next ones
+        # within miss_interval do not
+        self.assertEqual(None, self.remote.get_application('Nope'))
+        self.assertEqual(None, self.remote.get_application('Nope'))
+        self.assertEqual(4, len(self.emits))
+
+        self.remote.catalog.miss_interval = 0
+        time.sleep(0.01)
+        self.assertEqual(None, self.remote.get_application('Nope'))
+        self.assertEqual(6, len(self.emits))
+
+
+class StreamingApplicationsWebSocketTest(RemoteWebsocketTestCase):
+
+    def test_001_STREAM(self):
+        def on_message(message):
+            event = message['params']['event']
+            # the installed list never arrives
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+
+        self.client.on_message = on_message
+
+        start = time.time()
+        for app in self.remote.iter_applications():
+            if app.name == 'Netflix':
+                break
+        else:
+            app = None
+
+        self.assertEqual('11101200001', app.app_id)
+        self.assertTrue(time.time() - start < 1.0)
+
+    def test_002_MERGE(self):
+        def on_message(message):
+            event = message['params']['event']
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+            elif event == 'ed.installedApp.get':
+                return responses.INSTALLED_APP_RESPONSE
+
+        self.client.on_message = on_message
+
+        apps = list(self.remote.iter_applications())
+        app_ids = list(app.app_id for app in apps)
+        self.assertEqual(len(set(app_ids)), len(app_ids))
+
+        # the catalog is filled with the streamed applications
+        self.assertEqual(
+            sorted(app_ids),
+            sorted(app.app_id for app in self.remote.applications)
+        )
+        netflix = self.remote.get_application('Netflix')
+        self.assertTrue(any(netflix is app for app in apps))
+
+
+class IconCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = samsungctl.icon_cache.IconCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.path)
+
+    def test_001_PERSIST(self):
+        self.assertEqual(None, self.cache.get('tv', '/icon.png'))
+        self.cache.put('tv', '/icon.png', b'icon data')
+        self.assertEqual(b'icon data', self.cache.get('tv', '/icon.png'))
+        self.cache.close()
+
+        self.cache = samsungctl.icon_cache.IconCache(self.path)
+        self.assertEqual(b'icon data', self.cache.get('tv', '/icon.png'))
+        self.assertEqual(None, self.cache.get('other tv', '/icon.png'))
+
+    def test_002_DEDUPLICATE(self):
+        self.cache.put('tv 1', '/icon.png', b'icon data')
+        self.cache.put('tv 2', '/icon.png', b'icon data')
+
+        stats = self.cache.stats
+        self.assertEqual(2, stats['icons'])
+        self.assertEqual(1, stats['blobs'])
+        self.assertEqual(len(b'icon data'), stats['pack_size'])
+
+    def test_003_EVICT(self):
+        self.cache.max_size = 20
+        self.cache.put('tv', '/1.png', b'1' * 10)
+        self.cache.put('tv', '/2.png', b'2' * 10)
+        # makes /2.png the least recently used icon
+        self.cache.get('tv', '/1.png')
+        self.cache.put('tv', '/3.png', b'3' * 10)
+
+        self.assertEqual(b'1' * 10, self.cache.get('tv', '/1.png'))
+        self.assertEqual(None, self.cache.get('tv', '/2.png'))
+        self.assertEqual(b'3' * 10, self.cache.get('tv', '/3.png'))
+
+    def test_004_COMPACT(self):
+        data = b'x' * (1024 * 1024)
+        for i in range(4):
+            self.cache.put('tv', '/icon.png', data + str(i).encode())
+
+        self.assertTrue(self.cache.stats['pack_size'] < 3 * len(data))
+        self.assertEqual(data + b'3', self.cache.get('tv', '/icon.png'))
+
+    def test_005_EMPTY(self):
+        self.cache.put('tv', '/empty.png', b'')
+        self.assertEqual(b'', self.cache.get('tv', '/empty.png'))
+
+    def test_006_INDEX_ON_FLUSH(self):
+        index_path = os.path.join(
+            self.path,
+            samsungctl.icon_cache.INDEX_FILE
+        )
+
+        for i in range(10):
+            self.cache.put('tv', '/' + str(i) + '.png', b'icon data')
+
+        self.assertFalse(os.path.exists(index_path))
+        self.cache.flush()
+        self.assertTrue(os.path.exists(index_path))
+
+        cache = samsungctl.icon_cache.IconCache(self.path)
+        self.assertEqual(b'icon data', cache.get('tv', '/9.png'))
+        cache.close()
+
+
+class IconCacheWebSocketTest(RemoteWebsocketTestCase):
+
+    def setUp(self):
+        RemoteWebsocketTestCase.setUp(self)
+        self.path = tempfile.mkdtemp()
+        self.remote.icon_cache = samsungctl.icon_cache.IconCache(self.path)
+        self.emits = []
+
+        def on_message(message):
+            self.emits.append(message['params']['event'])
+            return dict(
+                event='ed.apps.icon',
+                data=dict(
+                    iconPath=message['params']['data']['iconPath'],
+                    imageBase64=base64.b64encode(b'icon data').decode('utf-8')
+                )
+            )
+
+        self.client.on_message = on_message
+
+    def tearDown(self):
+        self.remote.icon_cache.close()
+        shutil.rmtree(self.path)
+        RemoteWebsocketTestCase.tearDown(self)
+
+    def test_001_CACHED_ICON(self):
+        for _ in range(2):
+            self.assertEqual(
+                b'icon data',
+                samsungctl.application.get_icon(self.remote, '/icon.png')
+            )
+
+        self.assertEqual(['ed.apps.icon'], self.emits)
+        self.assertEqual(1, self.remote.icon_cache.hits)
+
+    def test_002_OTHER_ICON(self):
+        response = dict(
+            event='ed.apps.icon',
+            data=dict(
+                iconPath='/a.png',
+                imageBase64=base64.b64encode(b'icon data').decode('utf-8')
+            )
+        )
+
+        self.assertEqual(
+            None,
+            samsungctl.application.store_icon(self.remote, '/b.png', response)
+        )
+        self.assertEqual(
+            None,
+            self.remote.icon_cache.get(self.remote.config.host, '/b.png')
+        )
+
+
+class FakeAsyncWebsocketClient(object):
+    def __init__(self, loop):
+        self.loop = loop
+        self.url = None
+        self.kwargs = None
+        self.on_connect = None
+        self.on_message = None
+        self.closed = False
+        self.queue = asyncio.Queue()
+
+    def _done(self, result=None):
+        future = self.loop.create_future()
+        future.set_result(result)
+        return future
+
+    def _push(self, data):
+        self.queue.put_nowait(json.dumps(data))
+
+    def connect(self, url, **kwargs):
+        self.url = url
+        self.kwargs = kwargs
+        if 'token' in url:
+            token = url.split('token=')[-1]
+        else:
+            token = None
+
+        self._push(self.on_connect(token))
+        return self._done(self)
+
+    def send(self, data):
+        if self.on_message is not None:
+            return_data = self.on_message(json.loads(data))
+
+            if return_data:
+                self._push(return_data)
+
+        return self._done()
+
+    def recv(self):
+        if self.closed:
+            future = self.loop.create_future()
+            future.set_exception(socket.error())
+            return future
+
+        return self.queue.get()
+
+    def close(self):
+        self.closed = True
+        self.queue.put_nowait('')
+        return self._done()
+
+
+class AsyncWebSocketTest(unittest.TestCase):
+    config = dict(
+        name="samsungctl",
+        description="PC",
+        id="",
+        method="websocket",
+        host='127.0.0.1',
+        port=8001,
+        timeout=0
+    )
+
+    def setUp(self):
+        if asyncio is None or samsungctl.AsyncRemote is None:
+            self.skipTest('asyncio support not available')
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.remote_websocket_async = (
+            sys.modules['samsungctl.remote_websocket_async']
+        )
+        self._connect = self.remote_websocket_async.websockets.connect
+        self.clients = []
+
+        def connect(url, **kwargs):
+            client = FakeAsyncWebsocketClient(self.loop)
+            client.on_connect = self.on_connect
+            self.clients += [client]
+            return client.connect(url, **kwargs)
+
+        self.remote_websocket_async.websockets.connect = connect
+
+    def tearDown(self):
+        self.remote_websocket_async.websockets.connect = self._connect
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def on_connect(self, _):
+        payload = dict(
+            data=dict(clients=[], id=str(uuid.uuid4())),
+            event='ms.channel.connect'
+        )
+        return payload
+
+    def open_remote(self):
+        remote = samsungctl.AsyncRemote(self.config)
+        remote.remote._key_interval = 0
+        self.loop.run_until_complete(remote.__aenter__())
+        return remote
+
+    def test_001_CONNECTION(self):
+        remote = self.open_remote()
+
+        url = URL_FORMAT.format(
+            self.config['host'],
+            self.config['port'],
+            WebSocketTest._serialize_string(self.config['name'])
+        )
+        self.assertEqual(url, self.clients[0].url)
+        self.assertTrue(remote._running)
+
+        self.loop.run_until_complete(remote.__aexit__(None, None, None))
+        self.assertEqual(None, remote.sock)
+
+    def test_002_CONTROL(self):
+        remote = self.open_remote()
+        messages = []
+        self.clients[0].on_message = messages.append
+
+        self.loop.run_until_complete(remote.control('KEY_MENU'))
+        self.loop.run_until_complete(remote.KEY_VOLUP())
+
+        expected = list(
+            dict(
+                method='ms.remote.control',
+                params=dict(
+                    Cmd='Click',
+                    DataOfCmd=key,
+                    Option="false",
+                    TypeOfRemote="SendRemoteKey"
+                )
+            ) for key in ('KEY_MENU', 'KEY_VOLUP')
+        )
+        self.assertEqual(expected, messages)
+        self.loop.run_until_complete(remote.close())
+
+    def test_003_APPLICATIONS(self):
+        remote = self.open_remote()
+
+        def on_message(message):
+            if message['params']['event'] == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+            elif message['params']['event'] == 'ed.installedApp.get':
+                return responses.INSTALLED_APP_RESPONSE
+
+        self.clients[0].on_message = on_message
+        app = self.loop.run_until_complete(remote.get_application('Netflix'))
+        self.assertEqual('11101200001', app.app_id)
+        self.loop.run_until_complete(remote.close())
+
+    def test_004_SINGLE_THREAD(self):
+        thread_count = threading.active_count()
+        remotes = list(self.open_remote() for _ in range(50))
+
+        self.assertEqual(50, len(self.clients))
+        self.assertEqual(thread_count, threading.active_count())
+
+        for remote in remotes:
+            self.loop.run_until_complete(remote.close())
+
+    def test_005_AUTH_TIMEOUT(self):
+        remote = samsungctl.AsyncRemote(self.config)
+        register = remote.remote.register_receive_callback
+        timeouts = []
+
+        def register_receive_callback(callback, key, data, timeout=None,
+                                      on_timeout=None):
+            timeouts.append((data, timeout))
+            register(callback, key, data, timeout, on_timeout)
+
+        remote.remote.register_receive_callback = register_receive_callback
+        self.loop.run_until_complete(remote.__aenter__())
+
+        self.assertEqual(
+            [('ms.channel.connect', 30.0), ('ms.channel.unauthorized', 30.0)],
+            timeouts
+        )
+        self.loop.run_until_complete(remote.close())
+
+    def open_applications(self):
+        remote = self.open_remote()
+
+        def on_message(message):
+            event = message['params']['event']
+            if event == 'ed.edenApp.get':
+                return responses.EDEN_APP_RESPONSE
+            elif event == 'ed.installedApp.get':
+                return responses.INSTALLED_APP_RESPONSE
+            elif event == 'ed.apps.icon':
+                return dict(
+                    event=event,
+                    data=dict(
+                        iconPath=message['params']['data']['iconPath'],
+                        imageBase64=base64.b64encode(b'icon').decode()
+                    )
+                )
+
+        self.clients[0].on_message = on_message
+        app = self.loop.run_until_complete(remote.get_application('Netflix'))
+        return remote, app
+
+    def test_006_ICON(self):
+        remote, app = self.open_applications()
+
+        self.assertEqual(b'icon', self.loop.run_until_complete(app.icon))
+        self.loop.run_until_complete(remote.close())
+
+    def test_007_STATUS(self):
+        remote, app = self.open_applications()
+        http_session = sys.modules['samsungctl.http_session']
+        get = http_session.get
+        threads = []
+
+        class Response(object):
+            @staticmethod
+            def json():
+                return dict(running=True, visible=False, version='2.0')
+
+        def fake_get(host, url, **kwargs):
+            threads.append(threading.current_thread())
+            return Response()
+
+        http_session.get = fake_get
+        try:
+            self.assertTrue(self.loop.run_until_complete(app.is_running))
+            self.assertEqual(
+                '2.0',
+                self.loop.run_until_complete(app.version)
+            )
+        finally:
+            http_session.get = get
+
+        # the request is not made on the thread of the event loop
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+        self.loop.run_until_complete(remote.close())
+
+    def test_008_CONCURRENT_ICONS(self):
+        remote = self.open_remote()
+
+        def on_message(message):
+            icon_path = message['params']['data']['iconPath']
+            return dict(
+                event='ed.apps.icon',
+                data=dict(
+                    iconPath=icon_path,
+                    imageBase64=base64.b64encode(icon_path.encode()).decode()
+                )
+            )
+
+        self.clients[0].on_message = on_message
+        get_icon = self.remote_websocket_async.get_icon
+        icons = self.loop.run_until_complete(
+            asyncio.gather(
+                get_icon(remote, '/a.png'),
+                get_icon(remote, '/b.png')
+            )
+        )
+
+        self.assertEqual([b'/a.png', b'/b.png'], icons)
+        self.loop.run_until_complete(remote.close())
+
+    def test_009_KEY_INTERVAL(self):
+        config = samsungctl.Config(**dict(self.config, key_interval=0.5))
+        remote = self.remote_websocket_async.AsyncRemoteWebsocket(config)
+
+        self.assertEqual(0.5, remote._pacer.interval)
+
+
+class FakeTVTestCase(unittest.TestCase):
+    """
+    Base class for the tests that talk to a fake TV from samsungctl.testing
+    over real connections.
+    """
+
+    def create_tv(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        # other tests leave a fake websocket client behind
+        self.websocket = sys.modules['websocket']
+        self._create_connection = self.websocket.create_connection
+        self.websocket.create_connection = (
+            self.websocket._core.create_connection
+        )
+
+        self.tv = self.create_tv()
+        self.tv.start()
+
+    def tearDown(self):
+        self.tv.stop()
+        self.websocket.create_connection = self._create_connection
+
+
+class FakeLegacyTVTest(FakeTVTestCase):
+
+    def create_tv(self):
+        return samsungctl.testing.FakeLegacyTV(port=0, min_interval=0.05)
+
+    def setUp(self):
+        FakeTVTestCase.setUp(self)
+        self.config = samsungctl.Config(
+            host=self.tv.host,
+            port=self.tv.server_port(),
+            method='legacy',
+            timeout=2
+        )
+
+    def test_001_KEYS(self):
+        with samsungctl.Remote(self.config) as remote:
+            timings = remote.control_many(['KEY_MENU', 'KEY_1'], 0.06)
+
+        self.assertEqual([None, None], list(t.error for t in timings))
+        self.assertEqual(['KEY_MENU', 'KEY_1'], self.tv.keys)
+        self.assertEqual('samsungctl', self.tv.remotes[0][0])
+
+    def test_002_DROPPED(self):
+        with samsungctl.Remote(self.config) as remote:
+            timings = remote.control_many(['KEY_MENU', 'KEY_1'], 0.0)
+
+        self.assertTrue(
+            isinstance(
+                timings[1].error,
+                samsungctl.exceptions.UnhandledResponse
+            )
+        )
+        self.assertEqual(['KEY_1'], self.tv.dropped)
+
+    def test_003_SENT_AT(self):
+        with samsungctl.Remote(self.config) as remote:
+            # the TV takes its time to acknowledge the key
+            self.tv.latency = 0.2
+            result = remote.control_async('KEY_MENU').result(2.0)
+            done = time.time()
+
+        self.assertEqual(None, result.error)
+        self.assertTrue(done - result.sent_at >= 0.15)
+
+    def test_004_CLI_ERROR(self):
+        import samsungctl.__main__
+
+        self.tv.min_interval = 5.0
+        argv = sys.argv
+        sys.argv = [
+            'samsungctl',
+            '--host', self.tv.host,
+            '--port', str(self.tv.server_port()),
+            '--method', 'legacy',
+            'KEY_MENU',
+            'KEY_1'
+        ]
+        try:
+            self.assertRaises(
+                samsungctl.exceptions.UnhandledResponse,
+                samsungctl.__main__.main
+            )
+        finally:
+            sys.argv = argv
+
+        self.assertEqual(['KEY_MENU'], self.tv.keys)
+
+
+class FakeWebsocketTVTest(FakeTVTestCase):
+
+    def create_tv(self):
+        return samsungctl.testing.FakeWebsocketTV(latency=0.01)
+
+    def setUp(self):
+        FakeTVTestCase.setUp(self)
+        self.config = samsungctl.Config(host=self.tv.host, method='websocket')
+
+    def test_001_KEYS(self):
+        with samsungctl.Remote(self.config) as remote:
+            remote.control('KEY_MENU')
+
+        self.assertTrue(self.tv.wait_for_keys(1))
+        self.assertEqual(['KEY_MENU'], self.tv.keys)
+
+    def test_002_APPLICATIONS(self):
+        with samsungctl.Remote(self.config) as remote:
+            apps = remote.applications
+            self.assertEqual(
+                ['YouTube', 'Netflix', 'Internet'],
+                list(app.name for app in apps)
+            )
+
+            youtube = apps[0]
+            self.assertFalse(youtube.is_running)
+            self.assertEqual(
+                self.tv.icon(self.tv.installed_apps[0]['icon']),
+                youtube.icon
+            )
+
+    def test_003_CONCURRENT_ICONS(self):
+        paths = list('/a/' + str(i) + '.png' for i in range(4))
+        icons = {}
+
+        with samsungctl.Remote(self.config) as remote:
+            def get_icon(path):
+                icons[path] = samsungctl.application.get_icon(
+                    remote.remote,
+                    path
+                )
+
+            threads = list(
+                threading.Thread(target=get_icon, args=(path,))
+                for path in paths
+            )
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            list(self.tv.icon(path) for path in paths),
+            list(icons[path] for path in paths)
+        )
+
+
+    def test_004_CONTROL_ASYNC_CLOSED(self):
+        with samsungctl.Remote(self.config) as remote:
+            remote.control('KEY_MENU')
+            self.assertTrue(self.tv.wait_for_keys(1))
+            self.tv.stop()
+
+            end = time.time() + 2.0
+            while remote.remote.sock is not None and time.time() < end:
+                time.sleep(0.01)
+
+            result = remote.control_async('KEY_ENTER').result(2.0)
+
+        self.assertTrue(
+            isinstance(result.error, samsungctl.exceptions.ConnectionClosed)
+        )
+        self.assertEqual(None, result.sent_at)
+        self.assertEqual(['KEY_MENU'], self.tv.keys)
+
+
+class FakeWebsocketTVPacingTest(FakeTVTestCase):
+
+    def create_tv(self):
+        return samsungctl.testing.FakeWebsocketTV(min_interval=0.25)
+
+    def setUp(self):
+        FakeTVTestCase.setUp(self)
+        self.config = samsungctl.Config(host=self.tv.host, method='websocket')
+
+    def test_001_KEY_AFTER_BATCH(self):
+        with samsungctl.Remote(self.config) as remote:
+            timings = remote.control_many(['KEY_MENU', 'KEY_1'], 0.3)
+            remote.control('KEY_ENTER')
+
+            self.assertTrue(self.tv.wait_for_keys(3))
+
+        self.assertEqual([None, None], list(t.error for t in timings))
+        self.assertEqual(['KEY_MENU', 'KEY_1', 'KEY_ENTER'], self.tv.keys)
+        self.assertEqual([], self.tv.dropped)
+
+
+class StallingWebsocketTV(object):
+    """
+    Fake websocket TV that stops halfway through its reply to the stall
+    event until resume is set.
+    """
+
+    def __init__(self, host):
+        self.stalled = threading.Event()
+        self.resume = threading.Event()
+        self.tv = samsungctl.testing.FakeWebsocketTV(host)
+        emit = self.tv._emit
+
+        def _emit(session, params):
+            if params.get('event') != 'stall':
+                return emit(session, params)
+
+            payload = json.dumps(dict(event='stall', data={})).encode()
+            frame = struct.pack('!BB', 0x81, len(payload)) + payload
+
+            session._connection.sendall(frame[:5])
+            self.stalled.set()
+            self.resume.wait(5.0)
+            session._connection.sendall(frame[5:])
+
+        self.tv._emit = _emit
+
+
+class ReactorStallTest(FakeTVTestCase):
+
+    def create_tv(self):
+        self.stalling = StallingWebsocketTV('127.0.0.2')
+        return samsungctl.testing.FakeWebsocketTV('127.0.0.1')
+
+    def setUp(self):
+        import samsungctl.reactor
+
+        FakeTVTestCase.setUp(self)
+        self.stalling.tv.start()
+        self.reactor = samsungctl.reactor.Reactor()
+
+    def tearDown(self):
+        self.stalling.resume.set()
+        self.stalling.tv.stop()
+        FakeTVTestCase.tearDown(self)
+
+    def open_remote(self, host):
+        remote = samsungctl.remote_websocket.RemoteWebsocket(
+            samsungctl.Config(host=host, method='websocket')
+        )
+        remote.reactor = self.reactor
+        remote.open()
+        return remote
+
+    def test_001_PARTIAL_MESSAGE(self):
+        stalled_remote = self.open_remote(self.stalling.tv.host)
+        remote = self.open_remote(self.tv.host)
+
+        stalled = stalled_remote.request(
+            'ms.channel.emit',
+            'stall',
+            timeout=5.0,
+            event='stall',
+            to='host'
+        )
+        self.assertTrue(self.stalling.stalled.wait(2.0))
+
+        # the other TV is still read while the first one is stuck
+        apps = remote.request(
+            'ms.channel.emit',
+            'ed.installedApp.get',
+            timeout=2.0,
+            event='ed.installedApp.get',
+            to='host'
+        )
+        self.assertEqual('ed.installedApp.get', apps.result()['event'])
+        self.assertFalse(stalled.done())
+
+        # the part that was read is not lost
+        self.stalling.resume.set()
+        self.assertEqual('stall', stalled.result()['event'])
+
+        remote.close()
+        stalled_remote.close()
+
+
+class FakeEncryptedTVTest(FakeTVTestCase):
+
+    def create_tv(self):
+        return samsungctl.testing.FakeEncryptedTV(port=0)
+
+    def setUp(self):
+        if samsungctl.testing.FakeEncryptedTV is None:
+            self.skipTest('encrypted method not available')
+
+        FakeTVTestCase.setUp(self)
+        self.config = samsungctl.Config(
+            host=self.tv.host,
+            port=self.tv.server_port(),
+            method='encrypted'
+        )
+
+    def test_001_PAIRING(self):
+        remote_encrypted = sys.modules['samsungctl.remote_encrypted']
+        remote_encrypted.input = lambda _: self.tv.pin
+
+        try:
+            with samsungctl.Remote(self.config) as remote:
+                remote.control('KEY_MENU')
+        finally:
+            del remote_encrypted.input
+
+        self.assertTrue(self.tv.wait_for_keys(1))
+        self.assertEqual(['KEY_MENU'], self.tv.keys)
+        self.assertTrue(self.config.token)
+
+    def test_002_TOKEN(self):
+        self.config.token = self.tv.create_token()
+
+        with samsungctl.Remote(self.config) as remote:
+            remote.control('KEY_1')
+
+        self.assertTrue(self.tv.wait_for_keys(1))
+        self.assertEqual(['KEY_1'], self.tv.keys)
+
+
+class BenchTest(unittest.TestCase):
+
+    def test_001_PERCENTILE(self):
+        percentile = samsungctl.bench.percentile
+        values = list(range(1, 101))
+
+        self.assertEqual(None, percentile([], 50))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(7, percentile([7], 99))
+
+    def test_002_COMPARE(self):
+        baseline = dict(
+            methods=dict(
+                legacy=dict(
+                    connect=0.01,
+                    latency_p50=0.001,
+                    keys_per_second=1000.0,
+                    catalog=None
+                )
+            )
+        )
+        results = dict(
+            methods=dict(
+                legacy=dict(
+                    # better
+                    connect=0.005,
+                    # 3 times slower
+                    latency_p50=0.003,
+                    # half as many
+                    keys_per_second=400.0,
+                    catalog=None
+                ),
+                websocket=dict(connect=1.0)
+            )
+        )
+
+        regressions = samsungctl.bench.compare(results, baseline, 0.5)
+        self.assertEqual(
+            [('legacy', 'latency_p50'), ('legacy', 'keys_per_second')],
+            list((r.method, r.metric) for r in regressions)
+        )
+        self.assertAlmostEqual(2.0, regressions[0].change)
+        self.assertAlmostEqual(0.6, regressions[1].change)
+
+        self.assertEqual([], samsungctl.bench.compare(results, baseline, 3.0))
+
+    def test_003_RUN(self):
+        results = samsungctl.bench.run(['legacy'], 10, 2)
+        legacy = results['methods']['legacy']
+
+        self.assertEqual(None, legacy['catalog'])
+        for metric in samsungctl.bench.METRICS:
+            if metric not in ('catalog', 'pacing_error'):
+                self.assertTrue(legacy[metric] > 0, metric)
+
+        self.assertTrue(
+            0 <= legacy['pacing_error'] < samsungctl.bench.PACED_INTERVAL
+        )
+
+        self.assertTrue(legacy['latency_p50'] <= legacy['latency_p99'])
+        self.assertEqual([], samsungctl.bench.compare(results, results))
+
+
 class LegacySocket(object):
 
     def __init__(self, handler):
@@ -3117,12 +5161,36 @@ if __name__ == '__main__':
     sys.path.insert(0, os.path.join(base_path, '..'))
 
     import samsungctl
+    import samsungctl.pacing
+    import samsungctl.callbacks
+    import samsungctl.application
+    import samsungctl.exceptions
+    import samsungctl.icon_cache
+    import samsungctl.http_session
+    import samsungctl.utils
+    import samsungctl.codec
+    import samsungctl.writer
+    import samsungctl.calibrate
+    import samsungctl.testing
+    import samsungctl.bench
 
     logger = logging.getLogger('samsungctl')
     unittest.main()
 
 else:
     import samsungctl
+    import samsungctl.pacing
+    import samsungctl.callbacks
+    import samsungctl.application
+    import samsungctl.exceptions
+    import samsungctl.icon_cache
+    import samsungctl.http_session
+    import samsungctl.utils
+    import samsungctl.codec
+    import samsungctl.writer
+    import samsungctl.calibrate
+    import samsungctl.testing
+    import samsungctl.bench
 
     logger = logging.getLogger('samsungctl')
 